@@ -3,14 +3,45 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Only async views (the 2Checkout order lookup, the catalog event stream) are
+served by Django's ASGI handler. Every other request goes to the WSGI
+application on a pool of WSGI_THREADS threads (a2wsgi): under the ASGI
+handler sync views would all share one thread per worker, and a sync
+streaming response (the order export) would be read into memory before
+being sent. a2wsgi forwards such responses chunk by chunk with a bounded
+queue instead.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+from functools import lru_cache
 
+from a2wsgi import WSGIMiddleware
+from asgiref.sync import iscoroutinefunction
 from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.urls import Resolver404, resolve
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+asgi_application = get_asgi_application()
+wsgi_application = WSGIMiddleware(
+    get_wsgi_application(), workers=int(os.getenv('WSGI_THREADS', '10'))
+)
+
+
+@lru_cache(maxsize=4096)
+def is_async_path(path):
+    """True if `path` resolves to an async view"""
+    try:
+        return iscoroutinefunction(resolve(path).func)
+    except Resolver404:
+        return False
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and not is_async_path(scope['path']):
+        return await wsgi_application(scope, receive, send)
+    return await asgi_application(scope, receive, send)
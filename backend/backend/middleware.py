@@ -0,0 +1,21 @@
+"""
+WhiteNoise only on the WSGI side.
+
+WhiteNoise is sync-only: left in the ASGI handler's middleware, it makes
+Django run every async view through one thread per worker, so a slow
+payment gateway call holds up the others. Static files never reach the
+ASGI handler (backend.asgi sends every path without an async view to the
+WSGI application), so the async chain leaves WhiteNoise out.
+"""
+
+from asgiref.sync import iscoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+@sync_and_async_middleware
+def StaticFilesMiddleware(get_response):
+    if iscoroutinefunction(get_response):
+        raise MiddlewareNotUsed
+    return WhiteNoiseMiddleware(get_response)
@@ -11,12 +11,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from datetime import timedelta
 import os
 from dotenv import load_dotenv
 import dj_database_url
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,22 +45,23 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
+    'rest_framework_simplejwt.token_blacklist',  # Refresh token revocation list
     'corsheaders',
-    'cloudinary_storage',  # Cloudinary for image storage
-    'cloudinary',          # Cloudinary
+    'cloudinary_storage',  # Cloudinary for image storage (imports cloudinary on first use)
     'gamestore',
 ]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
+    'backend.middleware.StaticFilesMiddleware',  # WhiteNoise for static files (WSGI side)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'gamestore.replicas.ReplicaPinMiddleware',
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -104,11 +103,67 @@ ROOT_URLCONF = 'backend.urls'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        # JWT ("Bearer <access>") needs no database lookup per request
+        'gamestore.authentication.StatelessJWTAuthentication',
+        # Legacy "Token <key>" auth kept for old clients
         'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # Token bucket rate limits, shared by all workers on the host
+    'DEFAULT_THROTTLE_CLASSES': [
+        'gamestore.throttling.AnonBucketThrottle',
+        'gamestore.throttling.UserBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('THROTTLE_ANON_RATE', '120/min'),
+        'user': os.getenv('THROTTLE_USER_RATE', '600/min'),
+        'auth': os.getenv('THROTTLE_AUTH_RATE', '10/min'),
+        'payment': os.getenv('THROTTLE_PAYMENT_RATE', '20/min'),
+        'heartbeat': os.getenv('THROTTLE_HEARTBEAT_RATE', '10/min'),
+    },
+    # Number of proxies in front of the app (Render/Heroku routers), used to
+    # find the client IP in X-Forwarded-For
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '1')),
+}
+
+# SQLite file holding the throttle buckets (defaults to the temp dir)
+THROTTLE_DB_PATH = os.getenv('THROTTLE_DB_PATH')
+
+# Playtime heartbeats: local SQLite buffer (defaults to the temp dir; put it
+# on a persistent disk to keep buffered heartbeats across deploys), flushed
+# to GameLibrary at most HEARTBEAT_FLUSH_INTERVAL seconds after arrival.
+# A heartbeat counts for at most the time since the user's previous one for
+# the game, or HEARTBEAT_MAX_SECONDS after a longer gap
+HEARTBEAT_DB_PATH = os.getenv('HEARTBEAT_DB_PATH')
+HEARTBEAT_FLUSH_INTERVAL = float(os.getenv('HEARTBEAT_FLUSH_INTERVAL', '30'))
+HEARTBEAT_MAX_SECONDS = int(os.getenv('HEARTBEAT_MAX_SECONDS', '300'))
+
+# Live catalog event stream (gamestore/events.py): events kept per worker for
+# resuming clients, keep-alive comment interval, client reconnect delay and
+# how long one stream stays open before the client reconnects and resumes
+CATALOG_EVENTS_BACKLOG = int(os.getenv('CATALOG_EVENTS_BACKLOG', '1000'))
+CATALOG_EVENTS_HEARTBEAT = float(os.getenv('CATALOG_EVENTS_HEARTBEAT', '15'))
+CATALOG_EVENTS_RETRY = float(os.getenv('CATALOG_EVENTS_RETRY', '3'))
+CATALOG_EVENTS_MAX_STREAM_SECONDS = float(os.getenv('CATALOG_EVENTS_MAX_STREAM_SECONDS', '3600'))
+# How often a worker with open streams polls the catalog change log for
+# changes made by any process, how long a change id skipped by a poll (its
+# transaction committed later) is still looked for, and how long after its
+# last stream closed a worker stops polling
+CATALOG_EVENTS_POLL = float(os.getenv('CATALOG_EVENTS_POLL', '2'))
+CATALOG_EVENTS_GAP_WAIT = float(os.getenv('CATALOG_EVENTS_GAP_WAIT', '60'))
+CATALOG_EVENTS_IDLE_AFTER = float(os.getenv('CATALOG_EVENTS_IDLE_AFTER', '60'))
+
+# JWT settings: short-lived access tokens, rotating refresh tokens
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.getenv('JWT_ACCESS_MINUTES', '10'))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=int(os.getenv('JWT_REFRESH_DAYS', '14'))),
+    'ROTATE_REFRESH_TOKENS': True,
+    'BLACKLIST_AFTER_ROTATION': True,
+    'UPDATE_LAST_LOGIN': False,
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_REFRESH_SERIALIZER': 'gamestore.authentication.StoreTokenRefreshSerializer',
 }
 
 MEDIA_URL = '/media/'
@@ -142,10 +197,38 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Use DATABASE_URL from .env file, fallback to SQLite for local dev
 DATABASE_URL = os.getenv('DATABASE_URL')
 
+# Optional read replica for catalog reads (see gamestore/replicas.py).
+# Locally it can be a second SQLite file: REPLICA_DATABASE_URL=sqlite:///replica.sqlite3
+REPLICA_DATABASE_URL = os.getenv('REPLICA_DATABASE_URL')
+
+# Postgres connections come from psycopg's pool (Django 5.1+), checked
+# before each checkout so dropped connections aren't handed to requests.
+# DATABASE_POOL=0 falls back to persistent per-thread connections.
+DATABASE_POOL = os.getenv('DATABASE_POOL', '1') == '1'
+DATABASE_POOL_MIN_SIZE = int(os.getenv('DATABASE_POOL_MIN_SIZE', '2'))
+DATABASE_POOL_MAX_SIZE = int(os.getenv('DATABASE_POOL_MAX_SIZE', '10'))
+
+
+def database_config(url):
+    config = dj_database_url.parse(url, conn_max_age=600, conn_health_checks=True)
+    if config['ENGINE'] == 'django.db.backends.postgresql' and DATABASE_POOL:
+        from psycopg_pool import ConnectionPool
+
+        # The pool owns the connections, persistent connections must be off
+        config['CONN_MAX_AGE'] = 0
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DATABASE_POOL_MIN_SIZE,
+            'max_size': DATABASE_POOL_MAX_SIZE,
+            'timeout': 10,
+            'check': ConnectionPool.check_connection,
+        }
+    return config
+
+
 if DATABASE_URL:
     # Production: Use PostgreSQL from Neon
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600)
+        'default': database_config(DATABASE_URL)
     }
 else:
     # Development fallback: SQLite
@@ -156,6 +239,31 @@ else:
         }
     }
 
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = database_config(REPLICA_DATABASE_URL)
+    # Tests read the primary through the replica alias instead of a second test database
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['gamestore.replicas.ReplicaRouter']
+
+# After a write, a user's catalog reads stay on the primary this long so
+# they see their own changes despite replication lag
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '10'))
+
+
+# Cache - a table in the primary database, so every instance sees the same
+# entries and invalidations (entitlements, replica pins) without running a
+# cache server. Created by `manage.py createcachetable` (see build.sh).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'notsteam_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '100000')),
+        },
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -207,13 +315,9 @@ CLOUDINARY_STORAGE = {
     'STATIC_TAG': False,
 }
 
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET'),
-    secure=True
-)
+# cloudinary itself is configured from CLOUDINARY_STORAGE (secure URLs by
+# default) by cloudinary_storage when media storage is first used, so the
+# SDK isn't imported on startup
 
 # Use Cloudinary for media file storage (images)
 # Django 5.x uses STORAGES instead of DEFAULT_FILE_STORAGE
@@ -231,10 +335,21 @@ STORAGES = {
 # Stripe Configuration
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', 'sk_test_xxx')
 STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY', 'pk_test_xxx')
+# Optional API base override, e.g. `python manage.py mock_gateways` (http://127.0.0.1:8099)
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE', '')
 
 # 2Checkout (Verifone) Configuration (Works in Pakistan)
 TWOCHECKOUT_MERCHANT_CODE = os.getenv('TWOCHECKOUT_MERCHANT_CODE', '')
 TWOCHECKOUT_SECRET_KEY = os.getenv('TWOCHECKOUT_SECRET_KEY', '')
+# Point at `python manage.py mock_gateways` to test against a slow local gateway
+TWOCHECKOUT_API_URL = os.getenv('TWOCHECKOUT_API_URL', 'https://api.2checkout.com/rest/6.0/')
+
+# Outbound gateway calls (see gamestore/gateways.py)
+GATEWAY_TIMEOUT = float(os.getenv('GATEWAY_TIMEOUT', '10'))
+GATEWAY_MAX_CONNECTIONS = int(os.getenv('GATEWAY_MAX_CONNECTIONS', '20'))
+GATEWAY_BREAKER_THRESHOLD = int(os.getenv('GATEWAY_BREAKER_THRESHOLD', '5'))
+GATEWAY_BREAKER_RESET = float(os.getenv('GATEWAY_BREAKER_RESET', '30'))
+GATEWAY_CACHE_TTL = int(os.getenv('GATEWAY_CACHE_TTL', '300'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -13,6 +13,7 @@ def home(request):
             'games': '/api/games/',
             'auth_register': '/api/auth/register/',
             'auth_login': '/api/auth/login/',
+            'auth_token_refresh': '/api/auth/token/refresh/',
             'wishlist': '/api/wishlist/',
             'library': '/api/library/',
             'cart': '/api/cart/',
@@ -0,0 +1,40 @@
+"""
+Preload hot code paths before gunicorn forks its workers.
+
+Called from gunicorn.conf.py when preload_app is on: the URLconf, views,
+serializers and DRF machinery every request needs are imported once in the
+master and shared copy-on-write by the workers. Heavy SDKs used by only a
+few endpoints (stripe, cloudinary, Pillow, NumPy) stay lazy.
+"""
+
+import gc
+import importlib
+
+from django.db import connections
+from django.urls import get_resolver
+
+
+HOT_MODULES = [
+    'rest_framework.renderers',
+    'rest_framework.parsers',
+    'rest_framework.negotiation',
+    'rest_framework.metadata',
+    'rest_framework_simplejwt.tokens',
+    'gamestore.views',
+    'gamestore.serializers',
+    'gamestore.admin',
+]
+
+
+def warm_up():
+    # Importing every urls module pulls in the views they route to
+    get_resolver().url_patterns
+    for module in HOT_MODULES:
+        importlib.import_module(module)
+
+    # Workers must open their own database connections
+    connections.close_all()
+
+    # Keep the preloaded objects out of the GC's generations, so collections
+    # in the workers don't write to (and un-share) their pages
+    gc.freeze()
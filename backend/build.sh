@@ -6,6 +6,7 @@ pip install -r requirements.txt
 
 python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py createcachetable
 
 # Create superuser if it doesn't exist
 python manage.py shell <<EOF
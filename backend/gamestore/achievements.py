@@ -0,0 +1,73 @@
+"""
+Achievement unlocks and XP.
+
+A game client reports every unlock of a session in one call.
+grant_achievements() inserts them with a single bulk_create, adds the XP of
+the newly unlocked ones with one F('xp') + n update and sets the level from
+the precomputed LEVEL_XP curve, all in one transaction. The user's profile
+row is locked for the duration, so concurrent reports of the same unlock
+can't award its XP twice.
+"""
+
+from bisect import bisect_right
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Achievement, UserAchievement, UserProfile
+
+
+MAX_LEVEL = 100
+
+# LEVEL_XP[n - 1] is the total XP needed to reach level n
+LEVEL_XP = tuple(round(100 * (level - 1) ** 1.5) for level in range(1, MAX_LEVEL + 1))
+
+MAX_UNLOCK_BATCH = 500
+
+
+def level_for_xp(xp):
+    return bisect_right(LEVEL_XP, xp)
+
+
+def grant_achievements(user, achievement_ids, owned_game_ids):
+    """
+    Unlock achievements of games the user owns.
+
+    Returns a dict with the newly unlocked and already unlocked ids, ids
+    that don't exist (or belong to a game the user doesn't own), the XP
+    gained, and the profile's new xp and level.
+    """
+    requested = set(achievement_ids)
+    valid = set(
+        Achievement.objects.filter(id__in=requested, game_id__in=owned_game_ids).values_list('id', flat=True)
+    )
+
+    with transaction.atomic():
+        profile, _ = UserProfile.objects.get_or_create(user=user)
+        # Serialises unlock batches of the same user
+        profile = UserProfile.objects.select_for_update().get(pk=profile.pk)
+
+        already = set(
+            UserAchievement.objects.filter(user=user, achievement_id__in=valid).values_list('achievement_id', flat=True)
+        )
+        new = valid - already
+        UserAchievement.objects.bulk_create(
+            [UserAchievement(user=user, achievement_id=achievement_id) for achievement_id in new],
+            ignore_conflicts=True,
+        )
+
+        gained = Achievement.objects.filter(id__in=new).aggregate(xp=Sum('xp_reward'))['xp'] or 0
+        xp = profile.xp + gained
+        level = level_for_xp(xp)
+        if gained:
+            UserProfile.objects.filter(pk=profile.pk).update(xp=F('xp') + gained, level=level)
+
+    return {
+        'unlocked': sorted(new),
+        'already_unlocked': sorted(already),
+        'invalid': sorted(requested - valid),
+        'xp_gained': gained,
+        'xp': xp,
+        'level': level,
+        'level_up': level > profile.level,
+    }
@@ -1,10 +1,137 @@
+import datetime
+import json
+
 from django.contrib import admin
-from django.db.models import Count, Sum, Avg
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.db.models import Count, Sum, Avg, DecimalField, Max, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from .models import (
     Game, Genre, UserProfile, GameLibrary, Wishlist,
-    Review, Achievement, UserAchievement, Order, OrderItem, Tag
+    Review, Achievement, UserAchievement, Order, OrderItem, Tag, Notification,
+    GameDailyStats, PendingGameImage, SaleCampaign
 )
+from .campaigns import apply_active_prices
+from .exports import stream_orders
+
+
+# ============================================
+# Helpers for changelists over large tables
+# ============================================
+
+def estimate_count(queryset):
+    """
+    Row estimate from the PostgreSQL planner, or None on other databases.
+
+    Unfiltered querysets read pg_class.reltuples; filtered ones use the
+    EXPLAIN row estimate. Neither touches the table rows.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 until the table has been analyzed
+            if row and row[0] >= 0:
+                return int(row[0])
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that trusts planner estimates above a threshold.
+
+    Small results still get an exact COUNT(*); large ones skip it, so a
+    changelist over millions of orders renders without a full scan. Page
+    counts for large results are therefore approximate.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_count_threshold:
+            return self.object_list.count()
+        return estimate
+
+
+class BoundedDatesQuerySet(models.QuerySet):
+    """
+    QuerySet for changelists using date_hierarchy.
+
+    The drilldown links normally come from SELECT DISTINCT over every row's
+    date. Here they are derived from one MIN/MAX lookup (an index range
+    scan), listing every period between the first and last row; periods
+    without rows may appear.
+    """
+
+    def dates(self, field_name, kind, order='ASC'):
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        first, last = bounds['first'], bounds['last']
+        if first is None or last is None:
+            return []
+        if isinstance(first, datetime.datetime):
+            first, last = (
+                (timezone.localtime(value) if timezone.is_aware(value) else value).date()
+                for value in (first, last)
+            )
+
+        periods = []
+        if kind == 'year':
+            periods = [datetime.date(year, 1, 1) for year in range(first.year, last.year + 1)]
+        elif kind == 'month':
+            year, month = first.year, first.month
+            while (year, month) <= (last.year, last.month):
+                periods.append(datetime.date(year, month, 1))
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        else:
+            periods = [first + datetime.timedelta(days=n) for n in range((last - first).days + 1)]
+
+        return periods[::-1] if order == 'DESC' else periods
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        return self.dates(field_name, kind, order)
+
+
+class PaymentMethodFilter(admin.SimpleListFilter):
+    """Payment method filter with fixed choices (no DISTINCT over all orders)"""
+    title = 'payment method'
+    parameter_name = 'payment_method'
+
+    def lookups(self, request, model_admin):
+        return [('stripe', 'Stripe'), ('2checkout', '2Checkout')]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(payment_method=self.value())
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables too big to count or scan per request"""
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) shown next to filtered results
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return BoundedDatesQuerySet(model=queryset.model, query=queryset.query, using=queryset.db)
+
 
 @admin.register(Genre)
 class GenreAdmin(admin.ModelAdmin):
@@ -20,27 +147,31 @@ class GenreAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_game_count=Count('games'))
+
     def game_count(self, obj):
-        return obj.games.count()
+        return obj._game_count
     game_count.short_description = 'Number of Games'
+    game_count.admin_order_field = '_game_count'
 
 
 @admin.register(Game)
 class GameAdmin(admin.ModelAdmin):
-    list_display = ['title', 'get_genres', 'price', 'discount_percentage', 'discounted_price',
+    list_display = ['title', 'get_genres', 'price', 'discount_percentage', 'get_discounted_price',
                     'positive_reviews', 'total_sales', 'revenue', 'release_date', 'developer']
     list_filter = ['release_date', 'developer', 'publisher', 'genres']
     search_fields = ['title', 'slug', 'description', 'developer', 'publisher', 'meta_keywords']
     list_editable = ['price', 'discount_percentage', 'positive_reviews']
     prepopulated_fields = {'slug': ('title',)}
     filter_horizontal = ['genres']
-    readonly_fields = ['total_sales', 'revenue', 'review_stats']
+    readonly_fields = ['campaign_discount', 'total_sales', 'revenue', 'review_stats']
     fieldsets = (
         ('Basic Information', {
             'fields': ('title', 'slug', 'genres', 'short_description', 'description')
         }),
         ('Pricing', {
-            'fields': ('price', 'discount_percentage')
+            'fields': ('price', 'discount_percentage', 'campaign_discount')
         }),
         ('Publishing', {
             'fields': ('developer', 'publisher', 'release_date', 'image')
@@ -53,28 +184,46 @@ class GameAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Sales figures and genres for every row in a constant number of queries
+        completed = Q(orderitem__order__status='completed')
+        return super().get_queryset(request).prefetch_related('genres').annotate(
+            _total_sales=Count('orderitem', filter=completed),
+            _revenue=Coalesce(
+                Sum('orderitem__price', filter=completed),
+                Value(0),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
+
     def get_genres(self, obj):
         return ", ".join([genre.name for genre in obj.genres.all()])
     get_genres.short_description = 'Genres'
 
+    def get_discounted_price(self, obj):
+        return obj.effective_price
+    get_discounted_price.short_description = 'Discounted price'
+    get_discounted_price.admin_order_field = 'effective_price'
+
     def total_sales(self, obj):
-        return OrderItem.objects.filter(game=obj, order__status='completed').count()
+        return obj._total_sales
     total_sales.short_description = 'Total Sales'
+    total_sales.admin_order_field = '_total_sales'
 
     def revenue(self, obj):
-        total = OrderItem.objects.filter(
-            game=obj,
-            order__status='completed'
-        ).aggregate(total=Sum('price'))['total'] or 0
-        return f'${total:.2f}'
+        return f'${obj._revenue:.2f}'
     revenue.short_description = 'Total Revenue'
+    revenue.admin_order_field = '_revenue'
 
     def review_stats(self, obj):
-        reviews = Review.objects.filter(game=obj)
-        total = reviews.count()
+        stats = Review.objects.filter(game=obj).aggregate(
+            total=Count('id'),
+            positive=Count('id', filter=Q(rating='positive'))
+        )
+        total = stats['total']
         if total == 0:
             return 'No reviews yet'
-        positive = reviews.filter(rating='positive').count()
+        positive = stats['positive']
         percentage = (positive / total) * 100
         return format_html(
             '<strong>{}/{}</strong> positive ({}%)',
@@ -88,9 +237,13 @@ class TagAdmin(admin.ModelAdmin):
     list_display = ['name', 'game_count']
     search_fields = ['name']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_game_count=Count('games'))
+
     def game_count(self, obj):
-        return obj.games.count()
+        return obj._game_count
     game_count.short_description = 'Number of Games'
+    game_count.admin_order_field = '_game_count'
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -98,17 +251,32 @@ class UserProfileAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'user__email']
     readonly_fields = ['created_at', 'games_owned', 'total_spent']
 
+    def get_queryset(self, request):
+        # Correlated subqueries, so the two aggregates don't multiply each other
+        owned = GameLibrary.objects.filter(user=OuterRef('user')).order_by().values('user').annotate(
+            n=Count('id')
+        ).values('n')
+        spent = Order.objects.filter(user=OuterRef('user'), status='completed').order_by().values('user').annotate(
+            total=Sum('total_amount')
+        ).values('total')
+        return super().get_queryset(request).select_related('user').annotate(
+            _games_owned=Coalesce(Subquery(owned), Value(0)),
+            _total_spent=Coalesce(
+                Subquery(spent),
+                Value(0),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+        )
+
     def games_owned(self, obj):
-        return GameLibrary.objects.filter(user=obj.user).count()
+        return obj._games_owned
     games_owned.short_description = 'Games Owned'
+    games_owned.admin_order_field = '_games_owned'
 
     def total_spent(self, obj):
-        total = Order.objects.filter(
-            user=obj.user,
-            status='completed'
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        return f'${total:.2f}'
+        return f'${obj._total_spent:.2f}'
     total_spent.short_description = 'Total Spent'
+    total_spent.admin_order_field = '_total_spent'
 
 @admin.register(GameLibrary)
 class GameLibraryAdmin(admin.ModelAdmin):
@@ -117,9 +285,14 @@ class GameLibraryAdmin(admin.ModelAdmin):
 
 @admin.register(Wishlist)
 class WishlistAdmin(admin.ModelAdmin):
-    list_display = ['user', 'game', 'added_date']
+    list_display = ['user', 'game', 'added_date', 'price_when_added']
     list_filter = ['added_date']
 
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['user', 'notification_type', 'game', 'is_read', 'created_at']
+    list_filter = ['notification_type', 'is_read', 'created_at']
+
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ['user', 'game', 'rating', 'created_at']
@@ -134,13 +307,60 @@ class UserAchievementAdmin(admin.ModelAdmin):
     list_display = ['user', 'achievement', 'unlocked_date']
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdmin):
     list_display = ['id', 'user', 'total_amount', 'status', 'payment_method', 'created_at', 'completed_at']
-    list_filter = ['status', 'payment_method', 'created_at']
+    list_filter = ['status', PaymentMethodFilter, 'created_at']
     search_fields = ['user__username', 'user__email', 'stripe_payment_id']
     readonly_fields = ['stripe_payment_id', 'created_at', 'completed_at']
     date_hierarchy = 'created_at'
+    actions = ['export_csv', 'export_ndjson']
+
+    def export_csv(self, request, queryset):
+        return stream_orders(queryset, 'csv')
+    export_csv.short_description = 'Export selected orders as CSV'
+
+    def export_ndjson(self, request, queryset):
+        return stream_orders(queryset, 'ndjson')
+    export_ndjson.short_description = 'Export selected orders as NDJSON'
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
-    list_display = ['order', 'game', 'price', 'discount_applied']
\ No newline at end of file
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ['order', 'game', 'price', 'discount_applied']
+    list_select_related = ['order__user', 'game']
+
+@admin.register(GameDailyStats)
+class GameDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['game', 'date', 'units_sold', 'gross_revenue', 'discount_given',
+                    'positive_reviews', 'negative_reviews']
+    list_filter = ['date']
+    search_fields = ['game__title']
+    date_hierarchy = 'date'
+
+@admin.register(PendingGameImage)
+class PendingGameImageAdmin(admin.ModelAdmin):
+    list_display = ['game', 'source_url', 'status', 'updated_at']
+    list_filter = ['status']
+    list_select_related = ['game']
+
+
+@admin.register(SaleCampaign)
+class SaleCampaignAdmin(admin.ModelAdmin):
+    list_display = ['name', 'discount_percentage', 'starts_at', 'ends_at', 'is_running']
+    list_filter = ['starts_at']
+    search_fields = ['name', 'publishers']
+    filter_horizontal = ['genres', 'tags', 'games']
+    actions = ['apply_now']
+
+    def is_running(self, obj):
+        now = timezone.now()
+        return obj.starts_at <= now < obj.ends_at
+    is_running.short_description = 'Running'
+    is_running.boolean = True
+
+    def apply_now(self, request, queryset):
+        discounted, changed = apply_active_prices()
+        self.message_user(
+            request,
+            f'Active prices {"swapped" if changed else "unchanged"}: {discounted} games on sale'
+        )
+    apply_now.short_description = 'Apply running campaigns to prices now'
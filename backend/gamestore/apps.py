@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GamestoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gamestore'
+
+    def ready(self):
+        from . import signals  # noqa: F401 - registers signal handlers
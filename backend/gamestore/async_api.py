@@ -0,0 +1,60 @@
+"""
+Async function views with DRF authentication, permissions and throttling.
+
+DRF 3.16 views are sync-only, so `async_api_view` runs DRF's usual checks
+(which touch the database and the throttle store) in a thread via
+sync_to_async, then awaits the view itself on the event loop. Views receive
+the DRF Request and return a Response, like @api_view views.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.views import APIView
+
+
+def async_api_view(http_method_names, permission_classes=None, throttle_classes=None):
+    def decorator(func):
+        class CheckView(APIView):
+            pass
+
+        CheckView.http_method_names = [method.lower() for method in http_method_names]
+        if permission_classes is not None:
+            CheckView.permission_classes = permission_classes
+        if throttle_classes is not None:
+            CheckView.throttle_classes = throttle_classes
+
+        def check(django_request, args, kwargs):
+            """Authenticate, check permissions and throttles; returns (view, request, denial)"""
+            view = CheckView()
+            view.args, view.kwargs = args, kwargs
+            request = view.initialize_request(django_request, *args, **kwargs)
+            view.request = request
+            view.headers = view.default_response_headers
+            try:
+                if request.method.lower() not in view.http_method_names:
+                    view.http_method_not_allowed(request)
+                view.initial(request, *args, **kwargs)
+            except Exception as exc:
+                return view, request, render(view, request, view.handle_exception(exc))
+            return view, request, None
+
+        def render(view, request, response):
+            response = view.finalize_response(request, response, *view.args, **view.kwargs)
+            return response.render()
+
+        @csrf_exempt
+        @wraps(func)
+        async def wrapper(django_request, *args, **kwargs):
+            view, request, denial = await sync_to_async(check)(django_request, args, kwargs)
+            if denial is not None:
+                return denial
+            try:
+                response = await func(request, *args, **kwargs)
+            except Exception as exc:
+                response = await sync_to_async(view.handle_exception)(exc)
+            return render(view, request, response)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,89 @@
+from django.contrib.auth.models import User
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+# User fields copied into every token so requests can be served without
+# looking the user up again
+USER_CLAIMS = ['username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser']
+
+
+class StoreRefreshToken(RefreshToken):
+    """Refresh token carrying the user claims needed by the API"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class StoreTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Rotate a refresh token, re-reading the user so that deactivation or
+    permission changes reach the next access token.
+    """
+    token_class = StoreRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+
+        try:
+            user = User.objects.get(id=refresh[api_settings.USER_ID_CLAIM])
+        except (KeyError, User.DoesNotExist):
+            raise AuthenticationFailed('No active account found for the given token.')
+        if not user.is_active:
+            raise AuthenticationFailed('No active account found for the given token.')
+
+        # Revoke the old refresh token, then reissue it with current claims
+        refresh.blacklist()
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        for claim in USER_CLAIMS:
+            refresh[claim] = getattr(user, claim)
+        refresh.outstand()
+
+        return {
+            'access': str(refresh.access_token),
+            'refresh': str(refresh),
+        }
+
+
+def issue_tokens(user):
+    """Return a fresh access/refresh pair for the given user"""
+    refresh = StoreRefreshToken.for_user(user)
+    return {
+        'access': str(refresh.access_token),
+        'refresh': str(refresh),
+    }
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds the user from the token claims.
+
+    Access tokens are short-lived, so trusting their claims avoids the
+    per-request user query. The returned user is never saved; views only use
+    it for ownership filters and serialization.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        user = User(id=user_id, is_active=True)
+        for claim in USER_CLAIMS:
+            if claim in validated_token:
+                setattr(user, claim, validated_token[claim])
+        # Mark the instance as loaded from the database so it is treated like
+        # an existing row (e.g. when assigned to foreign keys)
+        user._state.adding = False
+        return user
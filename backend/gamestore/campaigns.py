@@ -0,0 +1,101 @@
+"""
+Sale campaigns -> Game.campaign_discount.
+
+A SaleCampaign discounts games by genre, tag, publisher or explicitly
+between starts_at and ends_at. apply_active_prices() works out the best
+running campaign discount per game and updates Game.campaign_discount of
+the games whose discount changed, all in one transaction, so readers see
+either the old or the new sale, never half of each. Games are updated with
+one UPDATE per discount value, not saved, so a store-wide sale sends no
+per-game signals. Game.save() never writes campaign_discount, so an admin
+edit or import running during a swap can't undo it.
+
+Game.effective_price is generated from price, discount_percentage and
+campaign_discount, so catalog sorting, price filters, cart totals, price
+drop alerts and the admin all read the same indexed column. The cost is
+that a swap rewrites the changed Game rows and their index entries.
+
+Run `manage.py apply_sale_campaigns` every minute, or with --watch, so
+campaigns start and end on time.
+
+That command runs outside the web workers, which hold the live catalog
+streams, so each swap records the games it changed as a CatalogChange row
+for the workers' watchers to publish (events.py).
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .events import prune_catalog_changes, record_catalog_change
+from .models import Game, SaleCampaign
+
+
+# Game ids per UPDATE
+UPDATE_BATCH_SIZE = 1000
+
+
+def running_campaigns(now):
+    return SaleCampaign.objects.filter(starts_at__lte=now, ends_at__gt=now)
+
+
+def campaign_game_ids(campaign):
+    """Ids of every game the campaign targets"""
+    targets = Q(sale_campaigns=campaign) | Q(genres__sale_campaigns=campaign) | Q(tags__sale_campaigns=campaign)
+    publishers = campaign.publisher_names()
+    if publishers:
+        targets |= Q(publisher__in=publishers)
+    return set(Game.objects.filter(targets).values_list('id', flat=True))
+
+
+def campaign_discounts(now):
+    """{game_id: discount} from the best campaign running at `now`"""
+    best = {}
+    # Bigger discounts first
+    for campaign in running_campaigns(now).order_by('-discount_percentage', 'id'):
+        for game_id in campaign_game_ids(campaign):
+            best.setdefault(game_id, campaign.discount_percentage)
+    return best
+
+
+def apply_active_prices(now=None):
+    """
+    Swap in the campaign discounts for `now`.
+
+    Returns (number of discounted games, whether anything changed); an
+    unchanged sale isn't rewritten.
+    """
+    now = now or timezone.now()
+    wanted = campaign_discounts(now)
+    applied = dict(Game.objects.filter(campaign_discount__gt=0).values_list('id', 'campaign_discount'))
+    changed = {
+        game_id for game_id in applied.keys() | wanted.keys()
+        if applied.get(game_id, 0) != wanted.get(game_id, 0)
+    }
+    prune_catalog_changes(now)
+    if not changed:
+        return len(wanted), False
+
+    with transaction.atomic():
+        by_discount = defaultdict(list)
+        for game_id in sorted(changed):
+            by_discount[wanted.get(game_id, 0)].append(game_id)
+        for discount, game_ids in by_discount.items():
+            for offset in range(0, len(game_ids), UPDATE_BATCH_SIZE):
+                Game.objects.filter(id__in=game_ids[offset:offset + UPDATE_BATCH_SIZE]).update(
+                    campaign_discount=discount
+                )
+        record_catalog_change(changed, fields=['sale_discount'])
+    return len(wanted), True
+
+
+def next_change(now):
+    """When the next campaign starts or ends after `now`, or None"""
+    upcoming = [
+        SaleCampaign.objects.filter(starts_at__gt=now).order_by('starts_at').values_list('starts_at', flat=True).first(),
+        SaleCampaign.objects.filter(ends_at__gt=now).order_by('ends_at').values_list('ends_at', flat=True).first(),
+    ]
+    upcoming = [moment for moment in upcoming if moment is not None]
+    return min(upcoming) if upcoming else None
@@ -0,0 +1,96 @@
+import base64
+
+from django.core.cache import cache
+
+from .models import GameLibrary, Wishlist
+
+
+ENTITLEMENTS_CACHE_TIMEOUT = 60 * 60
+
+ENCODINGS = ('list', 'delta', 'bitmap')
+
+
+def _cache_key(user_id):
+    return f'entitlements:{user_id}'
+
+
+def get_entitlements(user_id):
+    """
+    Return the user's owned and wishlisted game ids as sorted lists.
+
+    The sets are cached per user and invalidated whenever a library or
+    wishlist row of that user changes (see signals.py).
+    """
+    key = _cache_key(user_id)
+    entitlements = cache.get(key)
+    if entitlements is None:
+        entitlements = {
+            'owned': sorted(
+                GameLibrary.objects.filter(user_id=user_id).values_list('game_id', flat=True)
+            ),
+            'wishlist': sorted(
+                Wishlist.objects.filter(user_id=user_id).values_list('game_id', flat=True)
+            ),
+        }
+        cache.set(key, entitlements, ENTITLEMENTS_CACHE_TIMEOUT)
+    return entitlements
+
+
+def get_owned_game_ids(user_id):
+    """Return the set of game ids the user owns"""
+    return set(get_entitlements(user_id)['owned'])
+
+
+def owned_among(user_id, game_ids):
+    """
+    The ids among `game_ids` the user owns, read from the database.
+
+    For decisions that cost money (charging, fulfilling an order) rather
+    than the cached set, which misses writes that bypass the signals.
+    """
+    return set(
+        GameLibrary.objects.filter(user_id=user_id, game_id__in=game_ids).values_list('game_id', flat=True)
+    )
+
+
+def invalidate_entitlements(user_id):
+    """Drop the cached sets after the user's library or wishlist changed"""
+    cache.delete(_cache_key(user_id))
+
+
+def encode_ids(ids, encoding='delta'):
+    """
+    Encode a sorted list of ids compactly.
+
+    - list:   the ids as-is
+    - delta:  gaps between consecutive ids (small numbers compress well)
+    - bitmap: base64 bit array starting at `offset`, bit i set when
+              `offset + i` is in the set (least significant bit first)
+    """
+    if encoding == 'list':
+        return {'encoding': 'list', 'ids': list(ids)}
+
+    if encoding == 'delta':
+        deltas = []
+        previous = 0
+        for game_id in ids:
+            deltas.append(game_id - previous)
+            previous = game_id
+        return {'encoding': 'delta', 'deltas': deltas}
+
+    if encoding == 'bitmap':
+        if not ids:
+            return {'encoding': 'bitmap', 'offset': 0, 'count': 0, 'bitmap': ''}
+        offset = ids[0]
+        bits = bytearray((ids[-1] - offset) // 8 + 1)
+        for game_id in ids:
+            position = game_id - offset
+            bits[position // 8] |= 1 << (position % 8)
+        return {
+            'encoding': 'bitmap',
+            'offset': offset,
+            'count': len(ids),
+            'bitmap': base64.b64encode(bytes(bits)).decode('ascii'),
+        }
+
+    raise ValueError(f'Unknown encoding: {encoding}')
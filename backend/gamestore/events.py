@@ -0,0 +1,352 @@
+"""
+Live catalog changes over Server-Sent Events.
+
+Game saves and deletes (post_save/post_delete signals), catalog imports and
+sale campaign swaps record a CatalogChange row in the same transaction as
+the change. Every web worker with a stream open runs a watcher thread
+(ensure_change_watcher) that polls those rows every CATALOG_EVENTS_POLL
+seconds and publishes compact change events to its in-process broker, so
+a change reaches every stream whichever process made it. Once no stream
+has been open for CATALOG_EVENTS_IDLE_AFTER seconds the watcher stops
+polling until the next one opens. GET
+/api/catalog/events/ streams them so the storefront patches prices and
+adds new releases instead of re-polling the game lists.
+
+Fan-out is one shared asyncio future per process: every idle stream awaits
+the same future, a publish appends to a ring buffer and resolves it, and
+each stream then reads what it hasn't sent yet from the buffer. An idle
+connection is a suspended coroutine and its keep-alive timer, so a worker
+holds thousands of them. Streams need the ASGI server (backend.asgi, as
+run by gunicorn.conf.py).
+
+Event ids are "<process epoch>-<sequence>". A client reconnecting with
+Last-Event-ID (or ?last_event_id=) gets the events it missed from the
+buffer; if they are gone, or it was connected to another worker
+(WEB_CONCURRENCY > 1), it gets a "reset" event and should refetch the
+catalog once. The watchers (and apply_sale_campaigns) prune change rows
+older than a day.
+"""
+
+import asyncio
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CatalogChange, Game
+
+
+logger = logging.getLogger(__name__)
+
+# Change rows are only needed until every worker has polled them
+CHANGE_RETENTION = datetime.timedelta(days=1)
+# How often a watcher prunes them, in seconds (idle watchers included)
+CHANGE_PRUNE_INTERVAL = 60 * 60
+
+# Game fields the storefront shows; a save changing one of them is published
+CATALOG_FIELDS = (
+    'title', 'slug', 'short_description', 'price', 'discount_percentage', 'image',
+    'release_date', 'developer', 'publisher', 'positive_reviews',
+)
+
+
+class CatalogEventBroker:
+    """Ring buffer of catalog events plus a wake-up future shared by all streams"""
+
+    def __init__(self, backlog):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.events = deque(maxlen=backlog)  # (sequence, event type, data)
+        self.sequence = 0
+        self.subscribers = 0
+        # Set when a stream opens, to wake an idle watcher
+        self.listening = threading.Event()
+        self.lock = threading.Lock()
+        self.loop = None
+        self.changed = None
+
+    def event_id(self, sequence):
+        return f'{self.epoch}-{sequence}'
+
+    def parse_event_id(self, event_id):
+        """Sequence of one of this broker's event ids, else None"""
+        epoch, _, sequence = (event_id or '').partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def restart(self):
+        """
+        Start a new epoch with an empty buffer: ids handed out so far get a
+        reset, as the changes made while nobody watched were not published
+        """
+        with self.lock:
+            self.epoch = uuid.uuid4().hex[:8]
+            self.events.clear()
+
+    def publish(self, event_type, data):
+        """Append an event and wake the streams; safe from any thread"""
+        with self.lock:
+            self.sequence += 1
+            self.events.append((self.sequence, event_type, data))
+            loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        if self.changed is not None and not self.changed.done():
+            self.changed.set_result(None)
+        self.changed = None
+
+    def wait_future(self):
+        """Future resolved on the next publish (call from the event loop)"""
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            with self.lock:
+                self.loop, self.changed = loop, None
+        if self.changed is None:
+            self.changed = self.loop.create_future()
+        return self.changed
+
+    def since(self, sequence):
+        """Events after `sequence`, or None if some of them left the buffer"""
+        with self.lock:
+            if sequence >= self.sequence:
+                return []
+            oldest = self.events[0][0] if self.events else self.sequence + 1
+            if sequence + 1 < oldest:
+                return None
+            return list(islice(self.events, sequence + 1 - oldest, None))
+
+
+_broker = None
+_broker_pid = None
+_broker_lock = threading.Lock()
+
+
+def get_catalog_events():
+    """Return this process's broker (a forked worker gets its own)"""
+    global _broker, _broker_pid
+    if _broker_pid != os.getpid():
+        with _broker_lock:
+            if _broker_pid != os.getpid():
+                _broker = CatalogEventBroker(settings.CATALOG_EVENTS_BACKLOG)
+                _broker_pid = os.getpid()
+    return _broker
+
+
+def _price(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def record_catalog_change(game_ids, fields=(), created=False, removed=False):
+    """Log a change for the watchers to publish (commits with the caller's transaction)"""
+    game_ids = sorted(game_ids)
+    if game_ids:
+        CatalogChange.objects.create(game_ids=game_ids, fields=sorted(fields), created=created, removed=removed)
+
+
+def publish_changes(changes):
+    """Queue events for CatalogChange rows, with the games' current prices"""
+    broker = get_catalog_events()
+    changed = {game_id for change in changes if not change.removed for game_id in change.game_ids}
+    prices = {
+        game_id: (price, max(discount, campaign_discount))
+        for game_id, price, discount, campaign_discount in Game.objects.filter(id__in=changed).values_list(
+            'id', 'effective_price', 'discount_percentage', 'campaign_discount'
+        )
+    }
+    for change in changes:
+        for game_id in change.game_ids:
+            if change.removed:
+                broker.publish('removed', {'id': game_id})
+            elif game_id in prices:
+                price, discount = prices[game_id]
+                broker.publish('game', {
+                    'id': game_id,
+                    'created': change.created,
+                    'effective_price': _price(price),
+                    'sale_discount': discount,
+                    'fields': change.fields,
+                })
+
+
+def prune_catalog_changes(now):
+    CatalogChange.objects.filter(recorded_at__lt=now - CHANGE_RETENTION).delete()
+
+
+class CatalogChangeWatcher:
+    """
+    Polls CatalogChange rows by id. An id can commit after a higher one
+    (its transaction took longer), so ids skipped over are looked for again
+    until CATALOG_EVENTS_GAP_WAIT seconds have passed; most are rollbacks.
+    """
+
+    def __init__(self):
+        self.after = None
+        self.gaps = {}  # skipped id -> monotonic deadline
+
+    def poll(self):
+        """Publish changes recorded since the last poll (the first one only finds where to start)"""
+        changes = CatalogChange.objects.order_by('id')
+        if self.after is None:
+            self.after = changes.values_list('id', flat=True).last() or 0
+            return
+
+        now = time.monotonic()
+        self.gaps = {change_id: deadline for change_id, deadline in self.gaps.items() if deadline > now}
+        new = list(changes.filter(Q(id__gt=self.after) | Q(id__in=list(self.gaps))))
+        for change in new:
+            self.gaps.pop(change.id, None)
+            if change.id > self.after:
+                for skipped in range(self.after + 1, change.id):
+                    self.gaps[skipped] = now + settings.CATALOG_EVENTS_GAP_WAIT
+                self.after = change.id
+        if new:
+            publish_changes(new)
+
+
+class ChangeWatcherLoop:
+    """
+    One worker's watcher thread: polls while streams are open, stops once
+    none has been for CATALOG_EVENTS_IDLE_AFTER seconds, and prunes old
+    change rows every CHANGE_PRUNE_INTERVAL seconds.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.watcher = None
+        self.idle_since = None
+        self.next_prune = 0
+
+    def step(self, now):
+        """Run once at monotonic time `now`; the seconds to sleep, or None to wait for a stream"""
+        if now >= self.next_prune:
+            prune_catalog_changes(timezone.now())
+            self.next_prune = now + CHANGE_PRUNE_INTERVAL
+
+        if self.broker.subscribers:
+            self.idle_since = None
+        elif self.idle_since is None:
+            self.idle_since = now
+        elif now - self.idle_since >= settings.CATALOG_EVENTS_IDLE_AFTER:
+            if self.watcher is not None:
+                self.broker.restart()
+                self.watcher = None
+            return None
+
+        if self.watcher is None:
+            self.watcher = CatalogChangeWatcher()
+        self.watcher.poll()
+        return settings.CATALOG_EVENTS_POLL
+
+
+_watcher_pid = None
+_watcher_lock = threading.Lock()
+
+
+def _watch_loop():
+    broker = get_catalog_events()
+    loop = ChangeWatcherLoop(broker)
+    while True:
+        try:
+            delay = loop.step(time.monotonic())
+        except Exception:
+            logger.exception('Polling catalog changes failed')
+            delay = settings.CATALOG_EVENTS_POLL
+        finally:
+            connection.close()
+        if delay is not None:
+            time.sleep(delay)
+            continue
+        # Idle: sleep until a stream opens, waking up to prune
+        broker.listening.clear()
+        if not broker.subscribers:
+            broker.listening.wait(CHANGE_PRUNE_INTERVAL)
+
+
+def ensure_change_watcher():
+    """Start this process's catalog change watcher (after a fork, start a new one)"""
+    global _watcher_pid
+    if _watcher_pid == os.getpid():
+        return
+    with _watcher_lock:
+        if _watcher_pid != os.getpid():
+            threading.Thread(target=_watch_loop, name='catalog-change-watcher', daemon=True).start()
+            _watcher_pid = os.getpid()
+
+
+def format_event(event_type, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    lines.append('data: ' + json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')))
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+async def stream_catalog_events(last_event_id=None, max_age=None):
+    """
+    Async iterator of SSE messages, resuming after `last_event_id`.
+
+    Ends after `max_age` seconds (the client reconnects and resumes); with
+    0 it only sends what is already buffered.
+    """
+    broker = get_catalog_events()
+    heartbeat = settings.CATALOG_EVENTS_HEARTBEAT
+    if max_age is None:
+        max_age = settings.CATALOG_EVENTS_MAX_STREAM_SECONDS
+    deadline = time.monotonic() + max_age
+
+    broker.subscribers += 1
+    broker.listening.set()
+    try:
+        # Reconnect delay for EventSource, in milliseconds
+        yield f'retry: {int(settings.CATALOG_EVENTS_RETRY * 1000)}\n\n'.encode()
+
+        sequence = broker.parse_event_id(last_event_id)
+        if sequence is None:
+            sequence = broker.sequence
+            yield format_event('reset' if last_event_id else 'ready', {}, broker.event_id(sequence))
+
+        while True:
+            # Taken before reading the buffer so a publish in between still wakes us
+            changed = broker.wait_future()
+            events = broker.since(sequence)
+            if events is None:
+                sequence = broker.sequence
+                yield format_event('reset', {}, broker.event_id(sequence))
+                continue
+            for sequence, event_type, data in events:
+                yield format_event(event_type, data, broker.event_id(sequence))
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if events:
+                continue
+            done, _ = await asyncio.wait({changed}, timeout=min(heartbeat, remaining))
+            if not done:
+                yield b': keep-alive\n\n'
+    finally:
+        broker.subscribers -= 1
+
+
+def catalog_event_metrics():
+    broker = get_catalog_events()
+    return {
+        'streams': broker.subscribers,
+        'last_event_id': broker.event_id(broker.sequence),
+        'buffered_events': len(broker.events),
+    }
@@ -0,0 +1,288 @@
+"""
+Outbound calls to payment gateways (Stripe and 2Checkout).
+
+Every call goes through a Gateway, which gives it:
+- a pooled keep-alive connection (one httpx.AsyncClient per event loop for
+  2Checkout, Stripe's per-thread requests session)
+- a deadline (GATEWAY_TIMEOUT seconds)
+- a circuit breaker: after GATEWAY_BREAKER_THRESHOLD consecutive failures
+  calls fail fast with GatewayUnavailable for GATEWAY_BREAKER_RESET seconds,
+  then a single trial call decides whether to close it again (a trial
+  that is cancelled, or hangs for another GATEWAY_BREAKER_RESET seconds,
+  lets the next call try instead)
+- per-process metrics (calls, failures, rejections, cache hits, latency)
+
+Completed 2Checkout orders don't change, so their details are cached for
+GATEWAY_CACHE_TTL seconds by refno. Point TWOCHECKOUT_API_URL and
+STRIPE_API_BASE at `python manage.py mock_gateways` to test locally.
+
+The stripe and httpx SDKs are imported on the first call, not at startup.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayUnavailable(Exception):
+    """The provider failed, timed out, or its circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with closed, open and half-open states"""
+
+    def __init__(self, name, failure_threshold, reset_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go out; half-open lets a single trial call through"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if self.state == 'open' and now - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self.trial_started_at = now
+                return True
+            if self.state == 'half_open' and now - self.trial_started_at >= self.reset_timeout:
+                # The trial never reported back: let another call try
+                self.trial_started_at = now
+                return True
+            return False
+
+    def abandon(self):
+        """A call ended without a verdict (cancelled): free the half-open trial"""
+        with self._lock:
+            if self.state == 'half_open':
+                self.state = 'open'
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning('%s circuit opened after %d failures', self.name, self.failures)
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class Gateway:
+    """Breaker and metrics for one provider"""
+
+    COUNTERS = ('calls', 'successes', 'failures', 'rejected', 'cache_hits')
+
+    def __init__(self, name):
+        self.name = name
+        self.breaker = CircuitBreaker(
+            name, settings.GATEWAY_BREAKER_THRESHOLD, settings.GATEWAY_BREAKER_RESET
+        )
+        self._lock = threading.Lock()
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        with self._lock:
+            self.counters = dict.fromkeys(self.COUNTERS, 0)
+            self.latency_total = 0.0
+            self.latency_max = 0.0
+
+    def count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def start(self):
+        """Check the breaker before a call; returns the start time"""
+        if not self.breaker.allow():
+            self.count('rejected')
+            raise GatewayUnavailable(f'{self.name} is temporarily unavailable, please try again shortly')
+        return time.monotonic()
+
+    def finish(self, started, ok):
+        latency = time.monotonic() - started
+        with self._lock:
+            self.counters['calls'] += 1
+            self.counters['successes' if ok else 'failures'] += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def abandon(self):
+        self.breaker.abandon()
+
+    def metrics(self):
+        with self._lock:
+            calls = self.counters['calls']
+            return {
+                **self.counters,
+                'avg_latency_ms': round(1000 * self.latency_total / calls, 1) if calls else None,
+                'max_latency_ms': round(1000 * self.latency_max, 1),
+                'circuit': self.breaker.state,
+            }
+
+
+stripe_gateway = Gateway('stripe')
+twocheckout_gateway = Gateway('2checkout')
+GATEWAYS = [stripe_gateway, twocheckout_gateway]
+
+
+def gateway_metrics():
+    return {gateway.name: gateway.metrics() for gateway in GATEWAYS}
+
+
+# ============================================
+# STRIPE
+# ============================================
+
+_stripe_lock = threading.Lock()
+_stripe = None
+
+
+def get_stripe():
+    """The configured stripe module, imported on first use"""
+    global _stripe
+    if _stripe is None:
+        with _stripe_lock:
+            if _stripe is None:
+                import stripe
+
+                stripe.api_key = settings.STRIPE_SECRET_KEY
+                if settings.STRIPE_API_BASE:
+                    stripe.api_base = settings.STRIPE_API_BASE
+                # RequestsClient keeps a keep-alive session per thread
+                stripe.default_http_client = stripe.RequestsClient(timeout=settings.GATEWAY_TIMEOUT)
+                stripe.max_network_retries = 0
+                _stripe = stripe
+    return _stripe
+
+
+def stripe_call(call):
+    """Run `call(stripe)` through the breaker, e.g. stripe_call(lambda s: s.Balance.retrieve())"""
+    stripe = get_stripe()
+    # Errors that mean Stripe itself is degraded (not a declined card or bad input)
+    outage_errors = (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+
+    started = stripe_gateway.start()
+    try:
+        result = call(stripe)
+    except outage_errors as exc:
+        stripe_gateway.finish(started, ok=False)
+        raise GatewayUnavailable(f'Stripe is unavailable: {exc}') from exc
+    except Exception:
+        # The request reached Stripe and got an answer (declined, invalid...)
+        stripe_gateway.finish(started, ok=True)
+        raise
+    except BaseException:
+        stripe_gateway.abandon()
+        raise
+    stripe_gateway.finish(started, ok=True)
+    return result
+
+
+def create_stripe_payment_intent(**params):
+    return stripe_call(lambda stripe: stripe.PaymentIntent.create(**params))
+
+
+def retrieve_stripe_payment_intent(intent_id):
+    return stripe_call(lambda stripe: stripe.PaymentIntent.retrieve(intent_id))
+
+
+# ============================================
+# 2CHECKOUT
+# ============================================
+
+# Order statuses that won't change any more, safe to cache
+TWOCHECKOUT_FINAL_STATUSES = {'COMPLETE', 'CANCELED', 'REFUND', 'REVERSED'}
+
+# One client (connection pool) per event loop: an AsyncClient can't be
+# shared across loops, and under WSGI each async view runs in a new loop
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """The pooled AsyncClient for the running event loop"""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=settings.GATEWAY_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.GATEWAY_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GATEWAY_MAX_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+def twocheckout_headers():
+    return {
+        'Content-Type': 'application/json',
+        'X-Avangate-Authentication': f'code="{settings.TWOCHECKOUT_MERCHANT_CODE}" date="{timezone.now().strftime("%Y-%m-%d %H:%M:%S")}" hash="{settings.TWOCHECKOUT_SECRET_KEY}"'
+    }
+
+
+async def fetch_twocheckout_order(refno):
+    """
+    2Checkout order details as a dict, or None if 2Checkout doesn't know
+    the order. Raises GatewayUnavailable on timeouts, 5xx and open circuit.
+    """
+    cache_key = f'gateway:2checkout:order:{refno}'
+    cached = await cache.aget(cache_key)
+    if cached is not None:
+        twocheckout_gateway.count('cache_hits')
+        return cached
+
+    import httpx
+
+    started = twocheckout_gateway.start()
+    try:
+        response = await asyncio.wait_for(
+            get_async_client().get(
+                f'{settings.TWOCHECKOUT_API_URL}orders/{refno}/',
+                headers=twocheckout_headers(),
+            ),
+            timeout=settings.GATEWAY_TIMEOUT,
+        )
+    except (httpx.HTTPError, asyncio.TimeoutError) as exc:
+        twocheckout_gateway.finish(started, ok=False)
+        raise GatewayUnavailable(f'2Checkout is unavailable: {exc!r}') from exc
+    except BaseException:
+        # Cancelled (the client went away) or a bug: no verdict on 2Checkout
+        twocheckout_gateway.abandon()
+        raise
+
+    twocheckout_gateway.finish(started, ok=response.status_code < 500)
+    if response.status_code >= 500:
+        raise GatewayUnavailable(f'2Checkout answered {response.status_code}')
+    if response.status_code != 200:
+        return None
+
+    order_data = response.json()
+    if order_data.get('Status') in TWOCHECKOUT_FINAL_STATUSES:
+        await cache.aset(cache_key, order_data, settings.GATEWAY_CACHE_TTL)
+    return order_data
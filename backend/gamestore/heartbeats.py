@@ -0,0 +1,374 @@
+"""
+Playtime heartbeats.
+
+Game clients send a heartbeat about once a minute while a game is running.
+Writing each one to GameLibrary would be one row UPDATE per player per
+minute, so heartbeats go to a local SQLite file instead (shared by every
+worker on the host, like the throttle buckets), coalesced per (user, game).
+A flusher moves the buffered rows into an in-flight batch and applies the
+batch to GameLibrary with one bulk UPDATE, at most HEARTBEAT_FLUSH_INTERVAL
+seconds after the oldest of them arrived.
+
+A heartbeat is acknowledged once committed to the buffer, so worker
+restarts don't lose it. Each batch id is stored in HeartbeatFlush in the
+same transaction as the UPDATE: a batch left in flight by a crash is
+applied on the next flush unless its id shows it already was.
+
+A heartbeat counts for at most the time since the previous one of the same
+(user, game) (`clock`), so a client can't add playtime faster than real
+time by sending large or frequent heartbeats; after a longer gap it counts
+for at most HEARTBEAT_MAX_SECONDS.
+
+hours_played has two decimals, so only whole 36-second steps are applied;
+the remainder stays buffered for the next flush.
+"""
+
+import datetime
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import GameLibrary, HeartbeatFlush
+
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_STEP = 36  # 0.01 hours
+
+FLUSH_BATCH_SIZE = 2000
+
+# A flusher that died holding the lock releases it after this long
+FLUSH_LOCK_TTL = 120
+
+# Batch ids are only needed until the batch has left the buffer
+FLUSH_ID_RETENTION = datetime.timedelta(days=1)
+
+# first_seen of leftover seconds: they wait for the next heartbeat of the
+# same (user, game) instead of making the buffer due on their own
+NOT_DUE = 1e18
+
+
+class HeartbeatBuffer:
+    """
+    Buffered playtime in a local SQLite file.
+
+    `pending` holds one coalesced row per (user, game), `inflight` the batch
+    being applied, `clock` the last heartbeat per (user, game), `stats` the
+    flush metrics and the flusher lock.
+    """
+
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS pending ('
+        'user_id INTEGER NOT NULL, game_id INTEGER NOT NULL, seconds REAL NOT NULL, '
+        'last_played REAL NOT NULL, first_seen REAL NOT NULL, PRIMARY KEY (user_id, game_id))',
+        'CREATE INDEX IF NOT EXISTS pending_first_seen ON pending (first_seen)',
+        'CREATE TABLE IF NOT EXISTS inflight ('
+        'flush_id TEXT NOT NULL, user_id INTEGER NOT NULL, game_id INTEGER NOT NULL, '
+        'seconds REAL NOT NULL, last_played REAL NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS clock ('
+        'user_id INTEGER NOT NULL, game_id INTEGER NOT NULL, last_seen REAL NOT NULL, '
+        'PRIMARY KEY (user_id, game_id))',
+        'CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value REAL NOT NULL)',
+    ]
+
+    # last_played 0 marks a leftover with no heartbeat of its own
+    ADD_SQL = """
+        INSERT INTO pending (user_id, game_id, seconds, last_played, first_seen)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, game_id) DO UPDATE SET
+            seconds = seconds + excluded.seconds,
+            last_played = max(last_played, excluded.last_played),
+            first_seen = min(first_seen, excluded.first_seen)
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Durable once committed, unless the host itself loses power
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+        return conn
+
+    def record(self, user_id, game_id, seconds, now, max_seconds):
+        """
+        Buffer a heartbeat, counting at most the time since the previous one
+        of (user, game), or `max_seconds` after a longer gap. Returns the
+        seconds counted.
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT last_seen FROM clock WHERE user_id = ? AND game_id = ?', (user_id, game_id)
+            ).fetchone()
+            if row is not None:
+                max_seconds = min(max_seconds, max(now - row[0], 0))
+            seconds = min(seconds, max_seconds)
+            conn.execute(
+                'INSERT INTO clock (user_id, game_id, last_seen) VALUES (?, ?, ?) '
+                'ON CONFLICT (user_id, game_id) DO UPDATE SET last_seen = max(last_seen, excluded.last_seen)',
+                (user_id, game_id, now)
+            )
+            if seconds > 0:
+                conn.execute(self.ADD_SQL, (user_id, game_id, seconds, now, now))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return seconds
+
+    def forget_clock(self, before):
+        """Drop last-heartbeat times older than `before` (they no longer limit anything)"""
+        self._connection().execute('DELETE FROM clock WHERE last_seen < ?', (before,))
+
+    def oldest(self):
+        """Arrival time of the oldest buffered heartbeat, or None"""
+        return self._connection().execute(
+            'SELECT min(first_seen) FROM pending WHERE first_seen < ?', (NOT_DUE,)
+        ).fetchone()[0]
+
+    def has_inflight(self):
+        return self._connection().execute('SELECT 1 FROM inflight LIMIT 1').fetchone() is not None
+
+    def acquire(self, now):
+        """Take the flusher lock; False if another flusher holds it"""
+        conn = self._connection()
+        conn.execute("INSERT INTO stats (key, value) VALUES ('lock_until', 0) ON CONFLICT (key) DO NOTHING")
+        cursor = conn.execute(
+            "UPDATE stats SET value = ? WHERE key = 'lock_until' AND value < ?", (now + FLUSH_LOCK_TTL, now)
+        )
+        return cursor.rowcount == 1
+
+    def release(self):
+        self._connection().execute("UPDATE stats SET value = 0 WHERE key = 'lock_until'")
+
+    def take_batch(self, cutoff, limit):
+        """
+        Move up to `limit` rows buffered before `cutoff` in flight.
+
+        A batch already in flight (left by a crash) is returned first.
+        Returns (flush id, rows) or None.
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT flush_id FROM inflight LIMIT 1').fetchone()
+            if row is not None:
+                flush_id = row[0]
+            else:
+                rows = conn.execute(
+                    'SELECT user_id, game_id, seconds, last_played FROM pending '
+                    'WHERE first_seen <= ? ORDER BY first_seen LIMIT ?', (cutoff, limit)
+                ).fetchall()
+                if not rows:
+                    conn.execute('COMMIT')
+                    return None
+                flush_id = uuid.uuid4().hex
+                conn.executemany(
+                    'INSERT INTO inflight (flush_id, user_id, game_id, seconds, last_played) VALUES (?, ?, ?, ?, ?)',
+                    [(flush_id, *row) for row in rows]
+                )
+                conn.executemany(
+                    'DELETE FROM pending WHERE user_id = ? AND game_id = ?', [row[:2] for row in rows]
+                )
+            rows = conn.execute(
+                'SELECT user_id, game_id, seconds, last_played FROM inflight WHERE flush_id = ?', (flush_id,)
+            ).fetchall()
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return flush_id, rows
+
+    def finish_batch(self, flush_id, leftovers, latency_ms, now):
+        """Drop an applied batch, put leftover seconds back and record metrics"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute('DELETE FROM inflight WHERE flush_id = ?', (flush_id,)).rowcount
+            conn.executemany(
+                self.ADD_SQL,
+                [(user_id, game_id, seconds, 0, NOT_DUE) for (user_id, game_id), seconds in leftovers.items() if seconds > 0]
+            )
+            for key, value, combine in [
+                ('flushes', 1, 'value + excluded.value'),
+                ('rows_flushed', rows, 'value + excluded.value'),
+                ('flush_ms_total', latency_ms, 'value + excluded.value'),
+                ('flush_ms_max', latency_ms, 'max(value, excluded.value)'),
+                ('last_flush_ms', latency_ms, 'excluded.value'),
+                ('last_flush_at', now, 'excluded.value'),
+            ]:
+                conn.execute(
+                    f'INSERT INTO stats (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = {combine}',
+                    (key, value)
+                )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def metrics(self, now):
+        conn = self._connection()
+        rows, seconds, oldest = conn.execute(
+            'SELECT count(*), coalesce(sum(seconds), 0), min(first_seen) FROM pending WHERE first_seen < ?',
+            (NOT_DUE,)
+        ).fetchone()
+        stats = dict(conn.execute('SELECT key, value FROM stats').fetchall())
+        flushes = int(stats.get('flushes', 0))
+        return {
+            'backlog_rows': rows,
+            'backlog_seconds': round(seconds, 1),
+            'oldest_age_seconds': round(now - oldest, 1) if oldest else None,
+            'inflight_rows': conn.execute('SELECT count(*) FROM inflight').fetchone()[0],
+            'leftover_rows': conn.execute('SELECT count(*) FROM pending WHERE first_seen >= ?', (NOT_DUE,)).fetchone()[0],
+            'flushes': flushes,
+            'rows_flushed': int(stats.get('rows_flushed', 0)),
+            'last_flush_ms': round(stats['last_flush_ms'], 1) if flushes else None,
+            'avg_flush_ms': round(stats['flush_ms_total'] / flushes, 1) if flushes else None,
+            'max_flush_ms': round(stats['flush_ms_max'], 1) if flushes else None,
+            'last_flush_age_seconds': round(now - stats['last_flush_at'], 1) if flushes else None,
+            'flush_interval_seconds': settings.HEARTBEAT_FLUSH_INTERVAL,
+        }
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_heartbeat_buffer():
+    """Return the process-wide heartbeat buffer"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                path = settings.HEARTBEAT_DB_PATH or os.path.join(
+                    tempfile.gettempdir(), 'notsteam-heartbeats.sqlite3'
+                )
+                _buffer = HeartbeatBuffer(path)
+    return _buffer
+
+
+def apply_batch(flush_id, rows):
+    """
+    Add a batch of buffered playtime to GameLibrary in one UPDATE.
+
+    Returns the seconds left over per (user, game) (less than one step).
+    Rows of games no longer in the library are dropped.
+    """
+    updates = {(user_id, game_id): (seconds, last_played) for user_id, game_id, seconds, last_played in rows}
+    entries = [
+        entry for entry in GameLibrary.objects.filter(
+            user_id__in={key[0] for key in updates}, game_id__in={key[1] for key in updates}
+        ).only('id', 'user_id', 'game_id')
+        if (entry.user_id, entry.game_id) in updates
+    ]
+
+    leftovers = {}
+    for entry in entries:
+        seconds, last_played = updates[(entry.user_id, entry.game_id)]
+        steps = int(seconds // SECONDS_PER_STEP)
+        leftovers[(entry.user_id, entry.game_id)] = seconds - steps * SECONDS_PER_STEP
+        entry.hours_played = F('hours_played') + Decimal(steps).scaleb(-2)
+        if last_played:
+            moment = Value(datetime.datetime.fromtimestamp(last_played, tz=datetime.timezone.utc))
+            entry.last_played = Greatest(Coalesce(F('last_played'), moment), moment)
+        else:
+            entry.last_played = F('last_played')
+
+    with transaction.atomic():
+        _, created = HeartbeatFlush.objects.get_or_create(id=flush_id)
+        # Not created: applied before a crash kept it from leaving the buffer
+        if created and entries:
+            GameLibrary.objects.bulk_update(entries, ['hours_played', 'last_played'])
+    return leftovers
+
+
+def flush_heartbeats(force=False):
+    """
+    Apply buffered heartbeats to GameLibrary.
+
+    Without `force` nothing happens until the oldest heartbeat is
+    HEARTBEAT_FLUSH_INTERVAL old. Returns the number of rows applied, or
+    None if another flusher is running.
+    """
+    buffer = get_heartbeat_buffer()
+    started = time.time()
+    if not force and not buffer.has_inflight():
+        oldest = buffer.oldest()
+        if oldest is None or started - oldest < settings.HEARTBEAT_FLUSH_INTERVAL:
+            return 0
+    if not buffer.acquire(started):
+        return None
+
+    flushed = 0
+    try:
+        # Only rows buffered before this flush started
+        while True:
+            batch = buffer.take_batch(started, FLUSH_BATCH_SIZE)
+            if batch is None:
+                break
+            flush_id, rows = batch
+            batch_started = time.monotonic()
+            leftovers = apply_batch(flush_id, rows)
+            buffer.finish_batch(flush_id, leftovers, (time.monotonic() - batch_started) * 1000, time.time())
+            flushed += len(rows)
+        HeartbeatFlush.objects.filter(
+            applied_at__lt=datetime.datetime.now(datetime.timezone.utc) - FLUSH_ID_RETENTION
+        ).delete()
+        buffer.forget_clock(started - settings.HEARTBEAT_MAX_SECONDS)
+    finally:
+        buffer.release()
+    return flushed
+
+
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(settings.HEARTBEAT_FLUSH_INTERVAL / 2)
+        try:
+            flush_heartbeats()
+        except Exception:
+            logger.exception('Heartbeat flush failed')
+        finally:
+            connection.close()
+
+
+def ensure_flusher():
+    """Start this process's background flusher (after a fork, start a new one)"""
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid != os.getpid():
+            threading.Thread(target=_flush_loop, name='heartbeat-flusher', daemon=True).start()
+            _flusher_pid = os.getpid()
+
+
+def record_heartbeat(user_id, game_id, seconds):
+    """Buffer up to `seconds` of playtime; durable once this returns. Returns the seconds counted"""
+    counted = get_heartbeat_buffer().record(
+        user_id, game_id, seconds, time.time(), settings.HEARTBEAT_MAX_SECONDS
+    )
+    ensure_flusher()
+    return counted
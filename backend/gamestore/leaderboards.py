@@ -0,0 +1,186 @@
+"""
+XP and per-game achievement leaderboards.
+
+Ranking live (ORDER BY xp, then COUNT(*) of users above someone) scans
+every profile, so `manage.py build_leaderboards` periodically writes a
+snapshot per board:
+
+- LeaderboardEntry: every ranked user with their rank, indexed by
+  (board, rank) for top-N pages and by (board, user) for "my rank"
+- LeaderboardBucket: a histogram of scores with the number of users in
+  and above each bucket, so a score that changed since the snapshot still
+  gets its standing from a single bucket lookup
+- LeaderboardSnapshot: population size and build time
+
+Boards: "global" ranks users by xp (bucketed by level); "game-<id>" ranks
+a game's owners by achievements unlocked (one bucket per count). Ties
+share a rank (1, 2, 2, 4).
+"""
+
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .achievements import MAX_LEVEL, level_for_xp
+from .models import (
+    Achievement, GameLibrary, LeaderboardBucket, LeaderboardEntry, LeaderboardSnapshot,
+    UserAchievement, UserProfile
+)
+
+
+GLOBAL_BOARD = 'global'
+
+INSERT_BATCH_SIZE = 5000
+
+
+def game_board(game_id):
+    return f'game-{game_id}'
+
+
+def global_bucket(xp):
+    return level_for_xp(xp)
+
+
+def _ranked(scores):
+    """(user_id, score) sorted by score desc -> (user_id, score, rank)"""
+    rank = 0
+    previous = None
+    for position, (user_id, score) in enumerate(scores, start=1):
+        if score != previous:
+            rank, previous = position, score
+        yield user_id, score, rank
+
+
+def _histogram(bucket_users, buckets):
+    """{bucket: users} -> (bucket, users, users above) for every bucket in `buckets`, highest first"""
+    above = 0
+    for bucket in buckets:
+        users = bucket_users.get(bucket, 0)
+        yield bucket, users, above
+        above += users
+
+
+@transaction.atomic
+def store_board(board, ranked, histogram):
+    """
+    Replace a board's snapshot in one transaction.
+
+    `ranked` yields (user_id, score, rank); `histogram()` is called once it
+    is consumed and returns ((bucket, users, users above), ...) and the
+    population size.
+    """
+    LeaderboardEntry.objects.filter(board=board).delete()
+    LeaderboardBucket.objects.filter(board=board).delete()
+    LeaderboardEntry.objects.bulk_create(
+        (LeaderboardEntry(board=board, user_id=user_id, score=score, rank=rank) for user_id, score, rank in ranked),
+        batch_size=INSERT_BATCH_SIZE,
+    )
+    buckets, total_users = histogram()
+    LeaderboardBucket.objects.bulk_create(
+        [
+            LeaderboardBucket(board=board, bucket=bucket, users=users, users_above=above)
+            for bucket, users, above in buckets
+        ],
+        batch_size=INSERT_BATCH_SIZE,
+    )
+    LeaderboardSnapshot.objects.update_or_create(
+        board=board, defaults={'total_users': total_users, 'built_at': timezone.now()}
+    )
+
+
+def rebuild_global_board():
+    """Rank every user with xp; returns the board's population (all profiles)"""
+    bucket_users = {}
+
+    def scores():
+        rows = UserProfile.objects.filter(xp__gt=0).order_by('-xp', 'user_id').values_list('user_id', 'xp')
+        for user_id, xp in rows.iterator(chunk_size=INSERT_BATCH_SIZE):
+            bucket = global_bucket(xp)
+            bucket_users[bucket] = bucket_users.get(bucket, 0) + 1
+            yield user_id, xp
+
+    def histogram():
+        total_users = UserProfile.objects.count()
+        # Profiles without xp are in the lowest bucket
+        bucket_users[global_bucket(0)] = (
+            bucket_users.get(global_bucket(0), 0) + total_users - sum(bucket_users.values())
+        )
+        return _histogram(bucket_users, range(MAX_LEVEL, 0, -1)), total_users
+
+    store_board(GLOBAL_BOARD, _ranked(scores()), histogram)
+    return LeaderboardSnapshot.objects.get(board=GLOBAL_BOARD).total_users
+
+
+def rebuild_game_boards():
+    """Rank each game's players by achievements unlocked; returns the number of boards"""
+    owners = dict(GameLibrary.objects.values('game_id').annotate(n=Count('id')).values_list('game_id', 'n'))
+    achievement_counts = dict(
+        Achievement.objects.values('game_id').annotate(n=Count('id')).values_list('game_id', 'n')
+    )
+    unlocks = (
+        UserAchievement.objects
+        .values('achievement__game_id', 'user_id')
+        .annotate(n=Count('id'))
+        .order_by('achievement__game_id', '-n', 'user_id')
+        .values_list('achievement__game_id', 'user_id', 'n')
+    )
+
+    built = set()
+    for game_id, rows in groupby(unlocks.iterator(chunk_size=INSERT_BATCH_SIZE), key=lambda row: row[0]):
+        scores = [(user_id, unlocked) for _, user_id, unlocked in rows]
+        bucket_users = {}
+        for _, unlocked in scores:
+            bucket_users[unlocked] = bucket_users.get(unlocked, 0) + 1
+        total_users = max(owners.get(game_id, 0), len(scores))
+        # Owners without unlocks
+        bucket_users[0] = total_users - len(scores)
+        top_bucket = max(achievement_counts.get(game_id, 0), scores[0][1])
+
+        store_board(
+            game_board(game_id), _ranked(scores),
+            lambda: (_histogram(bucket_users, range(top_bucket, -1, -1)), total_users),
+        )
+        built.add(game_board(game_id))
+
+    # Boards of games nobody has unlocks in any more
+    stale = LeaderboardSnapshot.objects.filter(board__startswith='game-').exclude(board__in=built)
+    for board in stale.values_list('board', flat=True):
+        store_board(board, [], lambda: ([], 0))
+    return len(built)
+
+
+def top_entries(board, limit):
+    return list(
+        LeaderboardEntry.objects.filter(board=board).select_related('user').order_by('rank', 'user_id')[:limit]
+    )
+
+
+def standing(board, user_id, score, bucket):
+    """
+    The user's snapshot rank and where `score` (their current score, in
+    `bucket`) stands in the snapshot's histogram. None if there is no
+    snapshot yet.
+    """
+    snapshot = LeaderboardSnapshot.objects.filter(board=board).first()
+    if snapshot is None or not snapshot.total_users:
+        return None
+    entry = LeaderboardEntry.objects.filter(board=board, user_id=user_id).only('rank', 'score').first()
+    histogram = LeaderboardBucket.objects.filter(board=board, bucket=bucket).first()
+    if histogram is None:
+        # Above the highest bucket of the snapshot
+        users_above, users_in_bucket = 0, 0
+    else:
+        users_above, users_in_bucket = histogram.users_above, histogram.users
+
+    return {
+        'rank': entry.rank if entry else None,
+        'ranked_score': entry.score if entry else None,
+        'score': score,
+        # Best and worst rank the current score could have among the snapshot's users
+        'estimated_rank': {'from': users_above + 1, 'to': users_above + max(users_in_bucket, 1)},
+        'top_percent': round(100 * (users_above + 1) / snapshot.total_users, 2),
+        'total_users': snapshot.total_users,
+        'built_at': snapshot.built_at,
+    }
@@ -0,0 +1,46 @@
+"""
+Management command to apply sale campaigns: swap in the discounts of the
+campaigns running now
+
+Usage: python manage.py apply_sale_campaigns [--watch] [--interval 60]
+
+Run it every minute from a scheduler, or keep it running with --watch: it
+then sleeps until the next campaign starts or ends, waking at least every
+--interval seconds to pick up new or edited campaigns.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gamestore.campaigns import apply_active_prices, next_change
+
+
+class Command(BaseCommand):
+    help = 'Recompute active sale prices and swap them in atomically'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true', help='Keep running and apply each start/end on time')
+        parser.add_argument('--interval', type=float, default=60, help='Longest sleep in --watch mode (seconds)')
+
+    def apply(self):
+        discounted, changed = apply_active_prices()
+        if changed:
+            self.stdout.write(self.style.SUCCESS(f'✅ Active prices swapped: {discounted} games on sale'))
+        else:
+            self.stdout.write(f'No change ({discounted} games on sale)')
+
+    def handle(self, *args, **options):
+        self.apply()
+        while options['watch']:
+            now = timezone.now()
+            upcoming = next_change(now)
+            delay = options['interval']
+            if upcoming is not None:
+                delay = min(delay, max((upcoming - now).total_seconds(), 0))
+            try:
+                time.sleep(delay)
+            except KeyboardInterrupt:
+                return
+            self.apply()
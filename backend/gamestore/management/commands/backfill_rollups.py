@@ -0,0 +1,119 @@
+"""
+Management command to rebuild the GameDailyStats rollup from history
+
+Usage: python manage.py backfill_rollups [--since 2024-01-01] [--window-days 30]
+
+Works through the history one date window at a time: each window is zeroed,
+then refilled from GROUP BY (game, day) aggregates over completed orders and
+reviews, streamed with a server-side cursor and upserted in batches. Memory
+use is bounded by the batch size, not the history size.
+"""
+
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from gamestore.models import GameDailyStats, Order, OrderItem, Review
+from gamestore.rollups import REVIEW_FIELDS, SALES_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily per-game sales and review rollups from history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='First day to rebuild (YYYY-MM-DD), defaults to the oldest order/review')
+        parser.add_argument('--window-days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+
+        if options['since']:
+            start = parse_date(options['since'])
+            if start is None:
+                raise CommandError('--since must be a date (YYYY-MM-DD)')
+        else:
+            oldest = [
+                Order.objects.filter(status='completed').aggregate(first=Min('completed_at'))['first'],
+                Review.objects.aggregate(first=Min('created_at'))['first'],
+            ]
+            oldest = [timezone.localdate(value) for value in oldest if value]
+            if not oldest:
+                self.stdout.write('Nothing to backfill')
+                return
+            start = min(oldest)
+
+        today = timezone.localdate()
+        window = datetime.timedelta(days=options['window_days'])
+        while start <= today:
+            end = min(start + window, today + datetime.timedelta(days=1))
+            rows = self.rebuild_window(start, end)
+            self.stdout.write(self.style.SUCCESS(f'✓ {start} → {end - datetime.timedelta(days=1)}: {rows} rows'))
+            start = end
+
+        self.stdout.write(self.style.SUCCESS('✅ Rollups rebuilt'))
+
+    def rebuild_window(self, start, end):
+        """Recompute every rollup row with start <= date < end"""
+        sales = (
+            OrderItem.objects
+            .filter(order__status='completed', order__completed_at__date__gte=start, order__completed_at__date__lt=end)
+            .annotate(day=TruncDate('order__completed_at'))
+            .values('game_id', 'day')
+            .annotate(
+                units_sold=Count('id'),
+                gross_revenue=Sum('price'),
+                discount_given=Sum('discount_applied'),
+            )
+            .order_by()
+        )
+        reviews = (
+            Review.objects
+            .filter(created_at__date__gte=start, created_at__date__lt=end)
+            .annotate(day=TruncDate('created_at'))
+            .values('game_id', 'day')
+            .annotate(
+                positive_reviews=Count('id', filter=Q(rating='positive')),
+                negative_reviews=Count('id', filter=Q(rating='negative')),
+            )
+            .order_by()
+        )
+
+        with transaction.atomic():
+            GameDailyStats.objects.filter(date__gte=start, date__lt=end).update(
+                units_sold=0, gross_revenue=0, discount_given=0,
+                positive_reviews=0, negative_reviews=0,
+            )
+            rows = self.upsert(sales, SALES_FIELDS)
+            rows += self.upsert(reviews, REVIEW_FIELDS)
+        return rows
+
+    def upsert(self, aggregates, fields):
+        """Write aggregate rows in batches, touching only `fields`"""
+        written = 0
+        batch = []
+        for row in aggregates.iterator(chunk_size=self.batch_size):
+            batch.append(GameDailyStats(
+                game_id=row['game_id'],
+                date=row['day'],
+                **{field: row[field] or 0 for field in fields}
+            ))
+            if len(batch) >= self.batch_size:
+                written += self.flush(batch, fields)
+                batch = []
+        if batch:
+            written += self.flush(batch, fields)
+        return written
+
+    def flush(self, batch, fields):
+        GameDailyStats.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['game', 'date'],
+            update_fields=fields,
+        )
+        return len(batch)
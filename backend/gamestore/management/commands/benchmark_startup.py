@@ -0,0 +1,109 @@
+"""
+Management command to measure cold start: time from a fresh interpreter to
+the first response of backend.wsgi
+
+Usage: python manage.py benchmark_startup [--path /api/] [--runs 5] [--budget-ms 1000] [--top 15] [--warm]
+
+Each run is a new `python` process that imports backend.wsgi and serves one
+GET request. The median is checked against the budget (the command fails
+above it), then one extra run with `-X importtime` shows which top-level
+packages the time goes to, and whether any of the SDKs meant to load on
+first use were imported. With --warm, backend.warmup runs before the
+request, as in a gunicorn worker forked from a preloaded master.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Only needed by a few endpoints or commands; should not load on a cold start.
+# (requests isn't listed: rest_framework.compat imports it anyway.)
+LAZY_MODULES = ['stripe', 'cloudinary', 'PIL', 'httpx', 'numpy', 'scipy', 'pyarrow']
+
+FIRST_REQUEST = '''
+import io, json, os, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+from backend.wsgi import application
+if sys.argv[3] == 'warm':
+    from backend.warmup import warm_up
+    warm_up()
+loaded = time.perf_counter()
+from django.conf import settings
+host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '',
+    'SERVER_NAME': host, 'SERVER_PORT': '443', 'HTTP_HOST': host,
+    'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'https',
+}
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({
+    'status': statuses[0],
+    'load_ms': (loaded - started) * 1000,
+    'first_response_ms': (done - started) * 1000,
+    'lazy_loaded': sorted({name.split('.')[0] for name in sys.modules} & set(sys.argv[2].split(','))),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure time from interpreter start to the first WSGI response, with an import-time breakdown'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/', help='Request path for the first response')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--budget-ms', type=float, default=1000)
+        parser.add_argument('--top', type=int, default=15, help='Top-level packages to list by import time')
+        parser.add_argument('--warm', action='store_true', help='Run backend.warmup before the request')
+
+    def run_once(self, path, importtime=False, warm=False):
+        command = [sys.executable]
+        if importtime:
+            command += ['-X', 'importtime']
+        command += ['-c', FIRST_REQUEST, path, ','.join(LAZY_MODULES), 'warm' if warm else 'cold']
+        result = subprocess.run(
+            command, cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Benchmark process failed:\n{result.stderr[-2000:]}')
+        return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+    def handle(self, *args, **options):
+        path, warm = options['path'], options['warm']
+
+        # The first run may compile .pyc files; don't count it
+        self.run_once(path, warm=warm)
+        runs = [self.run_once(path, warm=warm)[0] for _ in range(options['runs'])]
+        load_ms = statistics.median(run['load_ms'] for run in runs)
+        first_ms = statistics.median(run['first_response_ms'] for run in runs)
+
+        _, stderr = self.run_once(path, importtime=True, warm=warm)
+        by_package = defaultdict(int)
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, name = line[len('import time:'):].split('|')
+            by_package[name.strip().split('.')[0]] += int(self_us)
+
+        self.stdout.write(f'GET {path} → {runs[0]["status"]}')
+        self.stdout.write(f'  import backend.wsgi: {load_ms:.0f} ms (median of {len(runs)})')
+        self.stdout.write(f'  first response:      {first_ms:.0f} ms (budget {options["budget_ms"]:.0f} ms)')
+        self.stdout.write('\nImport time by top-level package:')
+        for name, total_us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {total_us / 1000:8.1f} ms  {name}')
+
+        lazy_loaded = runs[0]['lazy_loaded']
+        if lazy_loaded:
+            self.stdout.write(self.style.WARNING(f'\nLoaded before the first response: {", ".join(lazy_loaded)}'))
+
+        if first_ms > options['budget_ms']:
+            raise CommandError(f'First response took {first_ms:.0f} ms, over the {options["budget_ms"]:.0f} ms budget')
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Within budget ({first_ms:.0f} / {options["budget_ms"]:.0f} ms)'))
@@ -0,0 +1,30 @@
+"""
+Management command to rebuild the leaderboard snapshots: ranks and score
+histograms of the global XP board and every per-game achievements board
+
+Usage: python manage.py build_leaderboards [--global-only | --games-only]
+
+Run it from a scheduler (render.yaml runs it every 10 minutes); the
+leaderboard endpoints only read the snapshot.
+"""
+
+from django.core.management.base import BaseCommand
+
+from gamestore.leaderboards import rebuild_game_boards, rebuild_global_board
+
+
+class Command(BaseCommand):
+    help = 'Rebuild leaderboard rank snapshots and histograms'
+
+    def add_arguments(self, parser):
+        only = parser.add_mutually_exclusive_group()
+        only.add_argument('--global-only', action='store_true', help='Only rebuild the global XP board')
+        only.add_argument('--games-only', action='store_true', help='Only rebuild the per-game boards')
+
+    def handle(self, *args, **options):
+        if not options['games_only']:
+            users = rebuild_global_board()
+            self.stdout.write(self.style.SUCCESS(f'✅ Global leaderboard built ({users} users)'))
+        if not options['global_only']:
+            boards = rebuild_game_boards()
+            self.stdout.write(self.style.SUCCESS(f'✅ {boards} game leaderboards built'))
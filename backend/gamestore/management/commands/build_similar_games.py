@@ -0,0 +1,39 @@
+"""
+Management command to precompute content-based similar games
+
+Usage: python manage.py build_similar_games [--incremental] [--k 10] [--batch-size 500]
+
+Builds a sparse game x (genre, tag, developer) matrix and stores the top-k
+cosine neighbours of each game in GameNeighbour, which the
+/api/games/<id or slug>/similar/ endpoint reads in one query. With
+--incremental only games queued since the last run (tags, genres or
+developer changed) and the games affected by them are recomputed.
+
+Needs NumPy and SciPy.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from gamestore.similarity import DEFAULT_BATCH_SIZE, DEFAULT_K, rebuild_similar_games
+
+
+class Command(BaseCommand):
+    help = 'Precompute top-k similar games from genres, tags and developer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true', help='Only recompute games queued since the last run')
+        parser.add_argument('--k', type=int, default=DEFAULT_K)
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            import numpy  # noqa: F401
+            import scipy  # noqa: F401
+        except ImportError as exc:
+            raise CommandError(f'build_similar_games needs {exc.name} installed')
+
+        updated = rebuild_similar_games(
+            incremental=options['incremental'],
+            k=options['k'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ Similar games updated for {updated} games'))
@@ -0,0 +1,72 @@
+"""
+Management command to notify users when a wishlisted game gets cheaper
+
+Usage: python manage.py detect_price_drops [--chunk-size 2000]
+
+Finds every wishlist entry whose game's effective price is below the price
+when it was added (or the last notified price) with one Wishlist x Game
+join, then writes notifications and new baselines in bulk per chunk. The
+comparison and the new baselines use the stored Game.effective_price
+(running sale campaigns included), rounded to cents like the baselines
+themselves.
+Meant to run on a schedule (e.g. a cron job after price updates).
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from gamestore.models import Game, Notification, Wishlist
+
+
+class Command(BaseCommand):
+    help = 'Notify users about price drops on wishlisted games'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        drops = (
+            Wishlist.objects
+            .filter(price_when_added__isnull=False)
+            .annotate(
+                current_price=F('game__effective_price'),
+                baseline=Coalesce('last_notified_price', 'price_when_added'),
+            )
+            .filter(current_price__lt=F('baseline'))
+            .values_list('id', 'user_id', 'game_id', 'game__title', 'baseline', 'current_price')
+        )
+
+        # Walk the matches in id order so each chunk is one bounded query and
+        # the updates never disturb an open cursor
+        notified = 0
+        last_id = 0
+        while True:
+            chunk = list(drops.filter(id__gt=last_id).order_by('id')[:chunk_size])
+            if not chunk:
+                break
+            notified += self.notify(chunk)
+            last_id = chunk[-1][0]
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Sent {notified} price drop notifications'))
+
+    def notify(self, rows):
+        """Write notifications and move the baselines for one chunk"""
+        with transaction.atomic():
+            Notification.objects.bulk_create([
+                Notification(
+                    user_id=user_id,
+                    game_id=game_id,
+                    notification_type='price_drop',
+                    message=f'{title} dropped from ${baseline:.2f} to ${current:.2f}'[:300],
+                )
+                for _, user_id, game_id, title, baseline, current in rows
+            ])
+            Wishlist.objects.filter(id__in=[row[0] for row in rows]).update(
+                last_notified_price=Subquery(
+                    Game.objects.filter(id=OuterRef('game_id')).values('effective_price')[:1]
+                )
+            )
+        return len(rows)
@@ -0,0 +1,312 @@
+"""
+Management command to export store data to compressed columnar files
+
+Usage: python manage.py export_analytics [--output-dir DIR] [--format parquet|npz]
+                                         [--full] [--chunk-size 50000]
+
+Writes orders, order items, library entries and reviews as date partitions
+(<table>/date=YYYY-MM-DD/part-<run>-<n>.<ext>) plus a full games snapshot.
+Rows are read in (created_at, id) order through server-side cursors, and a
+watermark file remembers the last exported row per table, so a nightly run
+only reads new rows. Analysts then query the files locally instead of the
+primary database.
+
+Each table is written to a staging directory first. Its files are moved in
+(or, with --full, the staged table directory replaces the old one) and only
+then is the watermark advanced. A run that dies in between is rolled back
+at the start of the next one, so rows are never exported twice.
+
+Parquet needs pyarrow; without it the command falls back to NumPy .npz.
+"""
+
+import datetime
+import glob
+import importlib
+import json
+import os
+import shutil
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from gamestore.models import Game, GameLibrary, Order, OrderItem, Review
+
+
+# table name -> (queryset, partition timestamp lookup, [(column, lookup), ...])
+EXPORTS = {
+    'orders': (Order.objects.all(), 'created_at', [
+        ('id', 'id'),
+        ('user_id', 'user_id'),
+        ('total_amount', 'total_amount'),
+        ('status', 'status'),
+        ('payment_method', 'payment_method'),
+        ('created_at', 'created_at'),
+        ('completed_at', 'completed_at'),
+    ]),
+    'order_items': (OrderItem.objects.all(), 'order__created_at', [
+        ('id', 'id'),
+        ('order_id', 'order_id'),
+        ('game_id', 'game_id'),
+        ('price', 'price'),
+        ('discount_applied', 'discount_applied'),
+        ('created_at', 'order__created_at'),
+    ]),
+    'library': (GameLibrary.objects.all(), 'purchase_date', [
+        ('id', 'id'),
+        ('user_id', 'user_id'),
+        ('game_id', 'game_id'),
+        ('purchase_date', 'purchase_date'),
+        ('hours_played', 'hours_played'),
+        ('last_played', 'last_played'),
+    ]),
+    'reviews': (Review.objects.all(), 'created_at', [
+        ('id', 'id'),
+        ('user_id', 'user_id'),
+        ('game_id', 'game_id'),
+        ('rating', 'rating'),
+        ('hours_played', 'hours_played'),
+        ('helpful_count', 'helpful_count'),
+        ('created_at', 'created_at'),
+    ]),
+}
+
+GAME_COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('slug', 'slug'),
+    ('price', 'price'),
+    ('discount_percentage', 'discount_percentage'),
+    ('release_date', 'release_date'),
+    ('developer', 'developer'),
+    ('publisher', 'publisher'),
+    ('positive_reviews', 'positive_reviews'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+WATERMARK_FILE = '_watermarks.json'
+# Key in the watermark file for tables whose files are being moved in
+PENDING_KEY = '_pending'
+STAGING_PREFIX = '.staging-'
+
+
+# Module each export format needs
+FORMAT_DEPENDENCIES = {'parquet': 'pyarrow', 'npz': 'numpy'}
+
+
+def _available_format(requested=None):
+    """`requested` if its dependency imports, else parquet or npz, whichever is installed first"""
+    for export_format in [requested] if requested else list(FORMAT_DEPENDENCIES):
+        try:
+            importlib.import_module(FORMAT_DEPENDENCIES[export_format])
+        except ImportError as exc:
+            if requested:
+                raise CommandError(f'{export_format} export needs {exc.name} installed')
+            continue
+        return export_format
+    raise CommandError('export_analytics needs pyarrow or numpy installed')
+
+
+def write_parquet(path, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pq.write_table(pa.Table.from_pydict(columns), path, compression='zstd')
+
+
+def _numpy_column(values):
+    """Convert one column of Python values to a typed NumPy array"""
+    import numpy as np
+
+    sample = next((value for value in values if value is not None), None)
+    if isinstance(sample, datetime.datetime):
+        return np.array(
+            [
+                timezone.make_naive(value, datetime.timezone.utc) if value is not None and timezone.is_aware(value) else value
+                for value in values
+            ],
+            dtype='datetime64[us]'
+        )
+    if isinstance(sample, datetime.date):
+        return np.array(values, dtype='datetime64[D]')
+    if isinstance(sample, Decimal) or isinstance(sample, float):
+        return np.array([float('nan') if value is None else float(value) for value in values], dtype=np.float64)
+    if isinstance(sample, bool):
+        return np.array(values, dtype=bool)
+    if isinstance(sample, int):
+        if any(value is None for value in values):
+            return np.array([float('nan') if value is None else value for value in values], dtype=np.float64)
+        return np.array(values, dtype=np.int64)
+    return np.array(['' if value is None else str(value) for value in values], dtype=str)
+
+
+def write_npz(path, columns):
+    import numpy as np
+
+    np.savez_compressed(path, **{name: _numpy_column(values) for name, values in columns.items()})
+
+
+class Command(BaseCommand):
+    help = 'Export orders, order items, library, reviews and games to Parquet/NPZ files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', default=os.path.join(settings.BASE_DIR, 'analytics_export'))
+        parser.add_argument('--format', choices=['parquet', 'npz'], help='Defaults to parquet when pyarrow is installed')
+        parser.add_argument('--full', action='store_true', help='Ignore watermarks and export everything again')
+        parser.add_argument('--chunk-size', type=int, default=50000)
+        parser.add_argument(
+            '--lag-minutes', type=int, default=5,
+            help='Skip rows newer than this, so slow transactions are not missed by the watermark'
+        )
+
+    def handle(self, *args, **options):
+        self.output_dir = options['output_dir']
+        self.chunk_size = options['chunk_size']
+        self.run_id = timezone.now().strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:6]
+
+        export_format = _available_format(options['format'])
+        self.writer = write_parquet if export_format == 'parquet' else write_npz
+        self.extension = 'parquet' if export_format == 'parquet' else 'npz'
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        watermarks = self.load_watermarks()
+        self.recover(watermarks)
+        full = options['full']
+        cutoff = timezone.now() - datetime.timedelta(minutes=options['lag_minutes'])
+        self.staging_root = os.path.join(self.output_dir, STAGING_PREFIX + self.run_id)
+
+        for table, (queryset, timestamp, columns) in EXPORTS.items():
+            staging = os.path.join(self.staging_root, table)
+            rows, watermark = self.export_table(
+                staging, queryset, timestamp, columns, None if full else watermarks.get(table), cutoff
+            )
+            if rows or full:
+                self.publish(table, staging, watermarks, watermark, full)
+            self.stdout.write(self.style.SUCCESS(f'✓ {table}: {rows} new rows'))
+        shutil.rmtree(self.staging_root, ignore_errors=True)
+
+        rows = self.export_games()
+        self.stdout.write(self.style.SUCCESS(f'✓ games: {rows} rows (snapshot)'))
+        self.stdout.write(self.style.SUCCESS(f'✅ Export written to {self.output_dir}'))
+
+    def load_watermarks(self):
+        path = os.path.join(self.output_dir, WATERMARK_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def save_watermarks(self, watermarks):
+        path = os.path.join(self.output_dir, WATERMARK_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(watermarks, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def recover(self, watermarks):
+        """Roll back tables a previous run was publishing when it died"""
+        for table, pending in watermarks.pop(PENDING_KEY, {}).items():
+            target = os.path.join(self.output_dir, table)
+            staging_root = os.path.join(self.output_dir, STAGING_PREFIX + pending['run'])
+            if pending['full']:
+                previous = os.path.join(staging_root, table + '.old')
+                swapped = not os.path.exists(os.path.join(staging_root, table))
+                if os.path.exists(previous) or swapped:
+                    shutil.rmtree(target, ignore_errors=True)
+                if os.path.exists(previous):
+                    os.rename(previous, target)
+            else:
+                for path in glob.glob(os.path.join(target, 'date=*', f'part-{pending["run"]}-*')):
+                    os.remove(path)
+            self.stdout.write(self.style.WARNING(f'Rolled back unfinished export of {table}'))
+        self.save_watermarks(watermarks)
+        for path in glob.glob(os.path.join(self.output_dir, STAGING_PREFIX + '*')):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def publish(self, table, staging, watermarks, watermark, full):
+        """Move a staged table into place, then advance its watermark"""
+        watermarks.setdefault(PENDING_KEY, {})[table] = {'run': self.run_id, 'full': full}
+        self.save_watermarks(watermarks)
+
+        target = os.path.join(self.output_dir, table)
+        if full:
+            os.makedirs(staging, exist_ok=True)
+            if os.path.exists(target):
+                os.rename(target, staging + '.old')
+            os.rename(staging, target)
+        else:
+            for directory, _, files in os.walk(staging):
+                destination = os.path.join(target, os.path.relpath(directory, staging))
+                os.makedirs(destination, exist_ok=True)
+                for name in files:
+                    os.replace(os.path.join(directory, name), os.path.join(destination, name))
+
+        if watermark:
+            watermarks[table] = watermark
+        else:
+            watermarks.pop(table, None)
+        del watermarks[PENDING_KEY][table]
+        if not watermarks[PENDING_KEY]:
+            del watermarks[PENDING_KEY]
+        self.save_watermarks(watermarks)
+
+    def export_table(self, staging, queryset, timestamp, columns, watermark, cutoff):
+        """Stream rows after the watermark into per-day partition files under `staging`"""
+        queryset = queryset.filter(**{f'{timestamp}__lt': cutoff})
+        if watermark:
+            last_time, last_id = parse_datetime(watermark[0]), watermark[1]
+            queryset = queryset.filter(
+                Q(**{f'{timestamp}__gt': last_time}) | Q(**{timestamp: last_time, 'id__gt': last_id})
+            )
+
+        names = [name for name, _ in columns]
+        rows = queryset.order_by(timestamp, 'id').values_list(timestamp, *[lookup for _, lookup in columns])
+
+        total = 0
+        part = 0
+        day = None
+        buffer = {name: [] for name in names}
+        last = None
+        for row in rows.iterator(chunk_size=self.chunk_size):
+            row_day = timezone.localdate(row[0])
+            if day is not None and (row_day != day or len(buffer['id']) >= self.chunk_size):
+                self.write_partition(staging, day, part, buffer)
+                part += 1
+                buffer = {name: [] for name in names}
+            day = row_day
+            for name, value in zip(names, row[1:]):
+                buffer[name].append(value)
+            last = row
+            total += 1
+
+        if buffer['id']:
+            self.write_partition(staging, day, part, buffer)
+
+        if last is None:
+            return 0, watermark
+        return total, [last[0].isoformat(), last[names.index('id') + 1]]
+
+    def write_partition(self, staging, day, part, columns):
+        directory = os.path.join(staging, f'date={day.isoformat()}')
+        os.makedirs(directory, exist_ok=True)
+        self.writer(os.path.join(directory, f'part-{self.run_id}-{part}.{self.extension}'), columns)
+
+    def export_games(self):
+        """Games are a small dimension table: rewrite the whole snapshot"""
+        names = [name for name, _ in GAME_COLUMNS]
+        columns = {name: [] for name in names}
+        for row in Game.objects.order_by('id').values_list(*[lookup for _, lookup in GAME_COLUMNS]).iterator(
+            chunk_size=self.chunk_size
+        ):
+            for name, value in zip(names, row):
+                columns[name].append(value)
+
+        directory = os.path.join(self.output_dir, 'games')
+        os.makedirs(directory, exist_ok=True)
+        temporary = os.path.join(directory, f'.snapshot-tmp.{self.extension}')
+        self.writer(temporary, columns)
+        os.replace(temporary, os.path.join(directory, f'snapshot.{self.extension}'))
+        return len(columns['id'])
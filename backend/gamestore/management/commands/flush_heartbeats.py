@@ -0,0 +1,29 @@
+"""
+Management command to apply all buffered playtime heartbeats now
+
+Usage: python manage.py flush_heartbeats
+
+Each worker already flushes in the background once the oldest heartbeat
+is HEARTBEAT_FLUSH_INTERVAL seconds old; this drains the buffer right away
+(e.g. before moving to a new host) and also retries a batch left in
+flight by a crash.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gamestore.heartbeats import flush_heartbeats, get_heartbeat_buffer
+
+
+class Command(BaseCommand):
+    help = 'Apply buffered playtime heartbeats to the game library'
+
+    def handle(self, *args, **options):
+        flushed = flush_heartbeats(force=True)
+        if flushed is None:
+            raise CommandError('Another flush is running, try again shortly')
+        metrics = get_heartbeat_buffer().metrics(time.time())
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Applied {flushed} buffered rows ({metrics["backlog_rows"]} arrived since)'
+        ))
@@ -0,0 +1,210 @@
+"""
+Management command to bulk import games from CSV or JSON Lines
+
+Usage: python manage.py import_catalog catalog.csv [--format csv|jsonl] [--batch-size 1000]
+
+Each batch of rows is validated, then upserted by slug in one
+INSERT ... ON CONFLICT statement. Genre and tag names are resolved through
+in-memory maps (missing ones are created in bulk), M2M links are written
+with bulk inserts into the through tables, and cover images are queued as
+PendingGameImage rows for `python manage.py ingest_images` instead of being
+downloaded and recompressed inline.
+
+CSV columns match the field names (title, slug, description, price,
+release_date, developer, publisher, genres, tags, image_url, ...); genres
+and tags are separated with "|". JSONL rows use lists for them.
+"""
+
+import csv
+import json
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.text import slugify
+from gamestore.events import CATALOG_FIELDS, record_catalog_change
+from gamestore.models import Game, Genre, PendingGameImage, Tag
+from gamestore.serializers import CatalogImportSerializer
+from gamestore.similarity import queue_similarity
+
+
+# Game fields overwritten when the slug already exists
+UPDATE_FIELDS = [
+    'title', 'description', 'short_description', 'price', 'discount_percentage',
+    'release_date', 'developer', 'publisher', 'meta_title', 'meta_description',
+    'meta_keywords', 'positive_reviews', 'updated_at',
+]
+
+LIST_FIELDS = ['genres', 'tags']
+
+
+class Command(BaseCommand):
+    help = 'Bulk import or update games from a CSV or JSONL file, upserting by slug'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        self.genre_ids = dict(Genre.objects.values_list('name', 'id'))
+        self.tag_ids = dict(Tag.objects.values_list('name', 'id'))
+        self.imported = 0
+        self.failed = 0
+
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                rows = self.read_csv(f) if file_format == 'csv' else self.read_jsonl(f)
+                while True:
+                    batch = list(islice(rows, options['batch_size']))
+                    if not batch:
+                        break
+                    self.import_batch(batch)
+                    self.stdout.write(f'  {self.imported} imported, {self.failed} rejected')
+        except OSError as exc:
+            raise CommandError(f'Could not read {path}: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Done! Imported {self.imported} games, rejected {self.failed} rows'
+        ))
+
+    def read_csv(self, f):
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            row = {key: value for key, value in row.items() if value not in (None, '')}
+            for field in LIST_FIELDS:
+                if field in row:
+                    row[field] = [name.strip() for name in row[field].split('|') if name.strip()]
+            yield line, row
+
+    def read_jsonl(self, f):
+        for line, text in enumerate(f, start=1):
+            if not text.strip():
+                continue
+            try:
+                yield line, json.loads(text)
+            except json.JSONDecodeError as exc:
+                yield line, exc
+
+    def reject(self, line, errors):
+        self.failed += 1
+        self.stderr.write(f'Line {line}: {errors}')
+
+    def import_batch(self, batch):
+        # Validate; a later row with the same slug replaces an earlier one
+        rows = {}
+        for line, row in batch:
+            if not isinstance(row, dict):
+                self.reject(line, row)
+                continue
+            serializer = CatalogImportSerializer(data=row)
+            if not serializer.is_valid():
+                self.reject(line, serializer.errors)
+                continue
+            data = serializer.validated_data
+            slug = data.get('slug') or slugify(data['title'])
+            if not slug:
+                self.reject(line, {'slug': ['Could not derive a slug from the title']})
+                continue
+            rows[slug] = data
+
+        if not rows:
+            return
+
+        games = []
+        for slug, data in rows.items():
+            game = Game(
+                slug=slug,
+                title=data['title'],
+                description=data['description'],
+                short_description=data.get('short_description') or data['description'][:500],
+                price=data['price'],
+                discount_percentage=data['discount_percentage'],
+                release_date=data['release_date'],
+                developer=data['developer'],
+                publisher=data['publisher'],
+                meta_title=data.get('meta_title', ''),
+                meta_description=data.get('meta_description', ''),
+                meta_keywords=data.get('meta_keywords', ''),
+                positive_reviews=data['positive_reviews'],
+            )
+            game.fill_seo_defaults()
+            games.append(game)
+
+        with transaction.atomic():
+            existing = set(Game.objects.filter(slug__in=rows).values_list('slug', flat=True))
+            Game.objects.bulk_create(
+                games,
+                update_conflicts=True,
+                unique_fields=['slug'],
+                update_fields=UPDATE_FIELDS,
+            )
+            game_ids = dict(Game.objects.filter(slug__in=rows).values_list('slug', 'id'))
+
+            self.link(
+                rows, game_ids, 'genres', self.genre_ids, Genre, Game.genres.through, 'genre_id'
+            )
+            self.link(
+                rows, game_ids, 'tags', self.tag_ids, Tag, Tag.games.through, 'tag_id'
+            )
+            self.queue_images(rows, game_ids)
+            # Bulk writes skip signals: queue similar-games updates and log
+            # the catalog changes for live streams directly
+            queue_similarity(game_ids.values())
+            record_catalog_change(
+                [game_id for slug, game_id in game_ids.items() if slug not in existing], created=True
+            )
+            record_catalog_change(
+                [game_id for slug, game_id in game_ids.items() if slug in existing],
+                [field for field in UPDATE_FIELDS if field in CATALOG_FIELDS],
+            )
+
+        self.imported += len(rows)
+
+    def link(self, rows, game_ids, field, name_ids, model, through, target_column):
+        """Replace the M2M links of rows that list `field`, using bulk inserts"""
+        listed = {slug: data[field] for slug, data in rows.items() if field in data}
+        if not listed:
+            return
+
+        missing = {name for names in listed.values() for name in names} - name_ids.keys()
+        if missing:
+            new_objects = [model(name=name) for name in missing]
+            for obj in new_objects:
+                if hasattr(obj, 'fill_defaults'):
+                    obj.fill_defaults()
+            model.objects.bulk_create(new_objects, ignore_conflicts=True)
+            if hasattr(model, 'fill_defaults'):
+                # Names with the same slug ("Role Playing", "Role-Playing") are one
+                # genre: the insert kept only one of them, so look them up by slug
+                slug_ids = dict(
+                    model.objects.filter(slug__in={obj.slug for obj in new_objects}).values_list('slug', 'id')
+                )
+                name_ids.update((obj.name, slug_ids[obj.slug]) for obj in new_objects)
+            else:
+                name_ids.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+
+        linked_game_ids = [game_ids[slug] for slug in listed]
+        through.objects.filter(game_id__in=linked_game_ids).delete()
+        through.objects.bulk_create(
+            [
+                through(game_id=game_ids[slug], **{target_column: name_ids[name]})
+                for slug, names in listed.items()
+                for name in set(names)
+                if name in name_ids
+            ],
+            ignore_conflicts=True,
+        )
+
+    def queue_images(self, rows, game_ids):
+        """Queue cover images for ingest_images rather than fetching them now"""
+        images = {game_ids[slug]: data['image_url'] for slug, data in rows.items() if data.get('image_url')}
+        if not images:
+            return
+        PendingGameImage.objects.filter(game_id__in=images, status='pending').delete()
+        PendingGameImage.objects.bulk_create([
+            PendingGameImage(game_id=game_id, source_url=url)
+            for game_id, url in images.items()
+        ])
@@ -0,0 +1,72 @@
+"""
+Management command to download and compress queued game cover images
+
+Usage: python manage.py ingest_images [--limit 100]
+
+Processes PendingGameImage rows (queued by import_catalog): downloads each
+image, compresses it the same way Game.save does, uploads it to media
+storage and points the game at it without re-running Game.save.
+Downloads are streamed and abandoned past --max-bytes, and an image that
+can't be decoded (or is a decompression bomb) only fails its own job.
+"""
+
+from io import BytesIO
+
+import requests
+from django.core.management.base import BaseCommand
+from PIL import Image
+from gamestore.models import Game, PendingGameImage, compress_image
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+def download(url, timeout, max_bytes):
+    """The body at `url`, refusing anything over `max_bytes`"""
+    with requests.get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise ImageTooLarge(f'{length} bytes is over the {max_bytes} byte limit')
+        content = BytesIO()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            content.write(chunk)
+            if content.tell() > max_bytes:
+                raise ImageTooLarge(f'over the {max_bytes} byte limit')
+    content.seek(0)
+    return content
+
+
+class Command(BaseCommand):
+    help = 'Download, compress and store queued game cover images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100)
+        parser.add_argument('--timeout', type=int, default=20)
+        parser.add_argument('--max-bytes', type=int, default=20 * 1024 * 1024, help='Largest download accepted')
+
+    def handle(self, *args, **options):
+        jobs = PendingGameImage.objects.filter(status='pending').select_related('game').order_by('id')
+        done = 0
+        failed = 0
+
+        for job in jobs[:options['limit']]:
+            game = job.game
+            try:
+                content = download(job.source_url, options['timeout'], options['max_bytes'])
+                game.image.save(f'{game.slug}.jpg', compress_image(content), save=False)
+                # Plain UPDATE: Game.save would compress the image again
+                Game.objects.filter(pk=game.pk).update(image=game.image.name)
+                job.status = 'done'
+                job.error = ''
+                done += 1
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {game.title}'))
+            except (requests.RequestException, OSError, ValueError, ImageTooLarge, Image.DecompressionBombError) as exc:
+                job.status = 'failed'
+                job.error = str(exc)
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'  ✗ {game.title}: {exc}'))
+            job.save(update_fields=['status', 'error', 'updated_at'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {done} images stored, {failed} failed'))
@@ -10,6 +10,9 @@ from gamestore.models import Game, UserProfile, Achievement
 import cloudinary.uploader
 import os
 
+# Applies the CLOUDINARY_STORAGE credentials to the cloudinary SDK
+from cloudinary_storage import app_settings  # noqa: F401
+
 
 class Command(BaseCommand):
     help = 'Migrate existing local images to Cloudinary'
@@ -0,0 +1,117 @@
+"""
+Management command to run local fake Stripe and 2Checkout APIs with injected latency
+
+Usage: python manage.py mock_gateways [--port 8099] [--latency 2.0] [--fail-rate 0.0]
+
+Serves the calls the store makes:
+- 2Checkout: GET /orders/<refno>/
+- Stripe: POST /v1/payment_intents, GET /v1/payment_intents/<id>
+
+Start the site with TWOCHECKOUT_API_URL=http://127.0.0.1:8099/ and
+STRIPE_API_BASE=http://127.0.0.1:8099 to see how the gateway client behaves
+when the upstream is slow or failing (timeouts, circuit breaker, caching).
+"""
+
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from django.core.management.base import BaseCommand
+
+
+def make_server(port=8099, latency=2.0, fail_rate=0.0):
+    """The fake gateways' HTTP server (port 0 picks a free one); call serve_forever() to run it"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.delay_or_fail():
+                return
+            parts = self.path_parts()
+            if len(parts) == 2 and parts[0] == 'orders':
+                self.reply(200, {
+                    'RefNo': parts[1],
+                    'Status': 'COMPLETE',
+                    'GrossPrice': '19.99',
+                    'Currency': 'USD',
+                    'OrderDate': '2025-01-01 12:00:00',
+                })
+            elif len(parts) == 3 and parts[:2] == ['v1', 'payment_intents']:
+                self.reply(200, self.payment_intent(parts[2], 'succeeded', 1999))
+            else:
+                self.reply(404, {'error': 'Not found'})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+            if self.delay_or_fail():
+                return
+            if self.path_parts() == ['v1', 'payment_intents']:
+                amount = int(parse_qs(body).get('amount', ['0'])[0])
+                intent_id = f'pi_mock_{uuid.uuid4().hex[:12]}'
+                self.reply(200, self.payment_intent(intent_id, 'requires_payment_method', amount))
+            else:
+                self.reply(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+
+        def delay_or_fail(self):
+            time.sleep(latency)
+            if random.random() < fail_rate:
+                self.reply(503, {'error': {'message': 'Service unavailable', 'type': 'api_error'}})
+                return True
+            return False
+
+        def path_parts(self):
+            return [part for part in self.path.split('?')[0].split('/') if part]
+
+        def payment_intent(self, intent_id, intent_status, amount):
+            return {
+                'id': intent_id,
+                'object': 'payment_intent',
+                'amount': amount,
+                'currency': 'usd',
+                'status': intent_status,
+                'client_secret': f'{intent_id}_secret_mock',
+            }
+
+        def reply(self, code, body):
+            content = json.dumps(body).encode()
+            try:
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client timed out and hung up while we were "slow"
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+class Command(BaseCommand):
+    help = 'Run fake Stripe and 2Checkout APIs that answer slowly (for local testing)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--latency', type=float, default=2.0, help='Seconds to wait before answering')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+
+    def handle(self, *args, **options):
+        latency = options['latency']
+        fail_rate = options['fail_rate']
+        server = make_server(options['port'], latency, fail_rate)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Mock gateways on http://127.0.0.1:{options["port"]}/ ({latency}s latency, {fail_rate:.0%} failures)'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -1,38 +1,49 @@
 from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils.text import slugify
 from gamestore.models import Game
+from gamestore.slugs import SAVE_ATTEMPTS, allocate_slugs
 
 
 class Command(BaseCommand):
     help = 'Populate slug fields for all games that are missing them'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
     def handle(self, *args, **options):
         self.stdout.write('Starting slug population...\n')
-        
-        games = Game.objects.all()
+
+        missing = Game.objects.filter(Q(slug='') | Q(slug='None') | Q(slug__isnull=True)).order_by('id')
         updated_count = 0
-        
-        for game in games:
-            if not game.slug or game.slug == 'None':
-                # Generate base slug from title
-                base_slug = slugify(game.title)
-                slug = base_slug
-                counter = 1
-                
-                # Handle duplicates by adding counter
-                while Game.objects.filter(slug=slug).exclude(id=game.id).exists():
-                    slug = f"{base_slug}-{counter}"
-                    counter += 1
-                
-                # Save the slug
-                game.slug = slug
-                game.save()
-                updated_count += 1
-                
+        conflicts = 0
+
+        while True:
+            games = list(missing.only('id', 'title', 'slug')[:options['batch_size']])
+            if not games:
+                break
+            try:
+                with transaction.atomic():
+                    # One prefix query for the whole batch, then one UPDATE
+                    slugs = allocate_slugs(Game.objects.all(), [slugify(game.title) or 'game' for game in games])
+                    for game, slug in zip(games, slugs):
+                        game.slug = slug
+                    Game.objects.bulk_update(games, ['slug'])
+            except IntegrityError:
+                # A concurrent insert took one of the slugs; allocate again
+                conflicts += 1
+                if conflicts >= SAVE_ATTEMPTS:
+                    raise
+                continue
+            conflicts = 0
+            updated_count += len(games)
+
+            for game in games:
                 self.stdout.write(
-                    self.style.SUCCESS(f'✓ {game.title} → {slug}')
+                    self.style.SUCCESS(f'✓ {game.title} → {game.slug}')
                 )
-        
+
         self.stdout.write(
             self.style.SUCCESS(f'\n✅ Done! Updated {updated_count} games')
-        )
\ No newline at end of file
+        )
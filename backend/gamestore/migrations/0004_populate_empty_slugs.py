@@ -5,26 +5,38 @@ from django.utils.text import slugify
 import uuid
 
 
+# Inlined rather than imported from gamestore.slugs, so later changes to the
+# app code can't change what this migration does
+def unique_slugs(taken, bases):
+    """A unique slug per base: the base or the first free base-N"""
+    taken = set(taken)
+    slugs = []
+    for base in bases:
+        slug, counter = base, 0
+        while slug in taken:
+            counter += 1
+            slug = f'{base}-{counter}'
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
 def populate_empty_slugs(apps, schema_editor):
     """Fill in empty slugs for existing games"""
     Game = apps.get_model('gamestore', 'Game')
 
     # Get all games with empty or null slugs
-    games_without_slugs = Game.objects.filter(slug__in=['', None])
-
-    for game in games_without_slugs:
-        # Generate slug from title
-        base_slug = slugify(game.title) if game.title else str(uuid.uuid4())[:8]
-        slug = base_slug
-        counter = 1
-
-        # Ensure slug is unique
-        while Game.objects.filter(slug=slug).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-
+    games_without_slugs = list(Game.objects.filter(slug__in=['', None]).only('id', 'title', 'slug'))
+    if not games_without_slugs:
+        return
+
+    # Generate slugs from titles, made unique in one batch
+    bases = [slugify(game.title) if game.title else str(uuid.uuid4())[:8] for game in games_without_slugs]
+    taken = Game.objects.exclude(slug__in=['', None]).values_list('slug', flat=True)
+    for game, slug in zip(games_without_slugs, unique_slugs(taken, bases)):
         game.slug = slug
-        game.save()
+
+    Game.objects.bulk_update(games_without_slugs, ['slug'], batch_size=500)
 
 
 def reverse_populate_empty_slugs(apps, schema_editor):
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def snapshot_wishlist_prices(apps, schema_editor):
+    """Use today's effective price as the baseline for existing wishlist rows"""
+    Game = apps.get_model('gamestore', 'Game')
+    Wishlist = apps.get_model('gamestore', 'Wishlist')
+
+    current_price = Game.objects.filter(id=models.OuterRef('game_id')).values(
+        effective=models.ExpressionWrapper(
+            models.F('price') * (100 - models.F('discount_percentage')) / 100,
+            output_field=models.DecimalField(max_digits=10, decimal_places=2)
+        )
+    )[:1]
+    Wishlist.objects.filter(price_when_added__isnull=True).update(
+        price_when_added=models.Subquery(current_price)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0005_add_unique_constraint_to_slug'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wishlist',
+            name='last_notified_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='wishlist',
+            name='price_when_added',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('price_drop', 'Price Drop')], max_length=30)),
+                ('message', models.CharField(max_length=300)),
+                ('is_read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('game', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='gamestore.game')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'is_read'], name='gamestore_n_user_id_29e1ca_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_wishlist_prices, migrations.RunPython.noop),
+    ]
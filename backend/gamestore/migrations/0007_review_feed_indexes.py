@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0006_wishlist_price_tracking_notification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['game', 'helpful_count', 'id'], name='review_game_helpful_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['game', 'created_at', 'id'], name='review_game_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0007_review_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('units_sold', models.IntegerField(default=0)),
+                ('gross_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('discount_given', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('positive_reviews', models.IntegerField(default=0)),
+                ('negative_reviews', models.IntegerField(default=0)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='gamestore.game')),
+            ],
+            options={
+                'verbose_name_plural': 'game daily stats',
+                'indexes': [models.Index(fields=['date'], name='gamestore_g_date_b04f0f_idx')],
+                'unique_together': {('game', 'date')},
+            },
+        ),
+    ]
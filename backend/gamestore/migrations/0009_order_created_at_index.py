@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0008_gamedailystats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at'], name='gamestore_o_created_236e39_idx'),
+        ),
+    ]
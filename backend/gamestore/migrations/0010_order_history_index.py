@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0009_order_created_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='gamestore_o_user_id_3e5bf6_idx'),
+        ),
+    ]
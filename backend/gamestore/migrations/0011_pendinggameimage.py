@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0010_order_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingGameImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_url', models.URLField(max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_images', to='gamestore.game')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='gamestore_p_status_780a22_idx')],
+            },
+        ),
+    ]
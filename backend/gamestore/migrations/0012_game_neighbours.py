@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0011_pendinggameimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingSimilarity',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='gamestore.game')),
+                ('queued_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'pending similarities',
+            },
+        ),
+        migrations.CreateModel(
+            name='GameNeighbour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('similar', 'Similar content')], default='similar', max_length=20)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='gamestore.game')),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gamestore.game')),
+            ],
+            options={
+                'ordering': ['game', 'kind', 'rank'],
+                'unique_together': {('game', 'kind', 'rank')},
+            },
+        ),
+    ]
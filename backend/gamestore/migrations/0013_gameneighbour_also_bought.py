@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0012_game_neighbours'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gameneighbour',
+            name='kind',
+            field=models.CharField(choices=[('similar', 'Similar content'), ('also_bought', 'Customers also bought')], default='similar', max_length=20),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:21
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0013_gameneighbour_also_bought'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='campaign_discount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='effective_price',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(100), '-', django.db.models.functions.comparison.Greatest(models.F('discount_percentage'), models.F('campaign_discount')))), '*', models.Value(Decimal('0.01'))), 2), output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0014_game_effective_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('discount_percentage', models.IntegerField(help_text='Discount (0-100) while the campaign runs')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('publishers', models.TextField(blank=True, help_text='One publisher name per line')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('games', models.ManyToManyField(blank=True, related_name='sale_campaigns', to='gamestore.game')),
+                ('genres', models.ManyToManyField(blank=True, related_name='sale_campaigns', to='gamestore.genre')),
+                ('tags', models.ManyToManyField(blank=True, related_name='sale_campaigns', to='gamestore.tag')),
+            ],
+            options={
+                'ordering': ['-starts_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='salecampaign',
+            index=models.Index(fields=['starts_at', 'ends_at'], name='gamestore_s_starts__d3adbe_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0015_sale_campaigns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeartbeatFlush',
+            fields=[
+                ('id', models.CharField(max_length=36, primary_key=True, serialize=False)),
+                ('applied_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0016_heartbeatflush'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardSnapshot',
+            fields=[
+                ('board', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('total_users', models.PositiveIntegerField()),
+                ('built_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LeaderboardBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(max_length=32)),
+                ('bucket', models.IntegerField()),
+                ('users', models.PositiveIntegerField()),
+                ('users_above', models.PositiveIntegerField(help_text='Users in higher buckets')),
+            ],
+            options={
+                'unique_together': {('board', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(max_length=32)),
+                ('score', models.IntegerField()),
+                ('rank', models.PositiveIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['board', 'rank'], name='gamestore_l_board_6814de_idx')],
+                'unique_together': {('board', 'user')},
+            },
+        ),
+    ]
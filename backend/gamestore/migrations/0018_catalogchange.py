@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamestore', '0017_leaderboards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_ids', models.JSONField(default=list)),
+                ('fields', models.JSONField(default=list)),
+                ('created', models.BooleanField(default=False)),
+                ('removed', models.BooleanField(default=False)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
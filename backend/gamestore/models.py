@@ -1,11 +1,54 @@
+from decimal import ROUND_HALF_UP, Decimal
+
 from django.db import models
+from django.db.models.functions import Greatest, Round
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.utils.text import slugify
-from PIL import Image
 from io import BytesIO
 import sys
 
+from .slugs import save_with_unique_slug
+
+
+def compress_image(image_file):
+    """Convert an image to RGB JPEG, at most 1920px wide and under 9MB"""
+    # Pillow is only needed when an image is uploaded, not on startup
+    from PIL import Image
+
+    # Open the image
+    img = Image.open(image_file)
+
+    # Convert to RGB if necessary (for PNG with transparency)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+        img = background
+
+    # Resize if image is too large (max 1920px width)
+    max_width = 1920
+    if img.width > max_width:
+        ratio = max_width / img.width
+        new_height = int(img.height * ratio)
+        img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+
+    # Compress image to under 10MB
+    output = BytesIO()
+    quality = 85
+    img.save(output, format='JPEG', quality=quality, optimize=True)
+
+    # If still too large, reduce quality further
+    while output.tell() > 9 * 1024 * 1024 and quality > 20:  # 9MB to be safe
+        output = BytesIO()
+        quality -= 5
+        img.save(output, format='JPEG', quality=quality, optimize=True)
+
+    output.seek(0)
+    return ContentFile(output.read())
+
 
 class Genre(models.Model):
     """Game genre/category"""
@@ -20,13 +63,17 @@ class Genre(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
+    def fill_defaults(self):
+        """Fill slug and SEO fields left empty (also used before bulk inserts)"""
         if not self.slug:
             self.slug = slugify(self.name)
         if not self.meta_title:
             self.meta_title = f"{self.name} Games - Best {self.name} PC Games"
         if not self.meta_description:
             self.meta_description = f"Browse the best {self.name} games. Find top-rated {self.name} PC games with reviews and discounts."
+
+    def save(self, *args, **kwargs):
+        self.fill_defaults()
         super().save(*args, **kwargs)
 
     class Meta:
@@ -41,6 +88,23 @@ class Game(models.Model):
     short_description = models.CharField(max_length=500)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     discount_percentage = models.IntegerField(default=0)
+    # Discount of the best running sale campaign, only written by
+    # campaigns.apply_active_prices (never edited by hand or by save())
+    campaign_discount = models.IntegerField(default=0, editable=False)
+    # Price users pay now (the better of the two discounts), computed and
+    # stored by the database so the catalog can be sorted/filtered by it
+    # and carts summed in SQL
+    effective_price = models.GeneratedField(
+        expression=Round(
+            models.F('price')
+            * (100 - Greatest(models.F('discount_percentage'), models.F('campaign_discount')))
+            * models.Value(Decimal('0.01')),
+            2,
+        ),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+        db_index=True,
+    )
     image = models.ImageField(upload_to='games/', blank=True, null=True)
     release_date = models.DateField()
     developer = models.CharField(max_length=200)
@@ -62,72 +126,51 @@ class Game(models.Model):
     def __str__(self):
         return self.title
 
-    def save(self, *args, **kwargs):
-        """Override save to compress image and auto-generate SEO fields"""
-        # Auto-generate slug from title if not provided
-        if not self.slug:
-            self.slug = slugify(self.title)
-            # Ensure slug is unique
-            original_slug = self.slug
-            counter = 1
-            while Game.objects.filter(slug=self.slug).exclude(pk=self.pk).exists():
-                self.slug = f"{original_slug}-{counter}"
-                counter += 1
-
-        # Set default SEO fields if not provided
+    def fill_seo_defaults(self):
+        """Set default SEO fields if not provided (also used before bulk inserts)"""
         if not self.meta_title:
             self.meta_title = self.title
         if not self.meta_description:
             self.meta_description = self.short_description[:160]
 
-        if self.image:
-            # Open the image
-            img = Image.open(self.image)
-
-            # Convert to RGB if necessary (for PNG with transparency)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-
-            # Resize if image is too large (max 1920px width)
-            max_width = 1920
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_height = int(img.height * ratio)
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-
-            # Compress image to under 10MB
-            output = BytesIO()
-            quality = 85
-            img.save(output, format='JPEG', quality=quality, optimize=True)
-
-            # If still too large, reduce quality further
-            while output.tell() > 9 * 1024 * 1024 and quality > 20:  # 9MB to be safe
-                output = BytesIO()
-                quality -= 5
-                img.save(output, format='JPEG', quality=quality, optimize=True)
-
-            output.seek(0)
+    def save(self, *args, **kwargs):
+        """Override save to compress image and auto-generate SEO fields"""
+        self.fill_seo_defaults()
 
+        if self.image:
             # Replace the image file with compressed version
             self.image.save(
                 self.image.name.rsplit('.', 1)[0] + '.jpg',
-                ContentFile(output.read()),
+                compress_image(self.image),
                 save=False
             )
 
-        super().save(*args, **kwargs)
+        # A game loaded before a campaign swap mustn't write back its old
+        # campaign discount, so updates leave that column alone
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated and field.name != 'campaign_discount'
+            ]
+
+        # Auto-generate a unique slug from title if not provided
+        if not self.slug:
+            save_with_unique_slug(self, slugify(self.title), lambda: super(Game, self).save(*args, **kwargs))
+        else:
+            super().save(*args, **kwargs)
+
+    @property
+    def sale_discount(self):
+        """Discount applied now, including a running sale campaign"""
+        return max(self.discount_percentage, self.campaign_discount)
 
     @property
     def discounted_price(self):
-        """Calculate discounted price"""
-        from decimal import Decimal
-        if self.discount_percentage > 0:
-            discount = self.price * (Decimal(self.discount_percentage) / Decimal(100))
-            return self.price - discount
+        """Price users pay now, rounded like effective_price"""
+        discount = self.sale_discount
+        if discount > 0:
+            discount_amount = self.price * (Decimal(discount) / Decimal(100))
+            return (self.price - discount_amount).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
         return self.price
 
 
@@ -164,6 +207,9 @@ class Wishlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wishlist')
     game = models.ForeignKey(Game, on_delete=models.CASCADE)
     added_date = models.DateTimeField(auto_now_add=True)
+    # Effective price when added, and the price of the last drop notification
+    price_when_added = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    last_notified_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     
     class Meta:
         unique_together = ('user', 'game')
@@ -190,6 +236,11 @@ class Review(models.Model):
     
     class Meta:
         unique_together = ('user', 'game')
+        indexes = [
+            # Keyset pagination of a game's review feed
+            models.Index(fields=['game', 'helpful_count', 'id'], name='review_game_helpful_idx'),
+            models.Index(fields=['game', 'created_at', 'id'], name='review_game_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username}'s review of {self.game.title}"
@@ -236,6 +287,14 @@ class Order(models.Model):
     stripe_payment_id = models.CharField(max_length=200, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Admin date drilldowns and newest-first listings
+            models.Index(fields=['created_at']),
+            # Keyset pagination of a user's order history
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
@@ -258,4 +317,204 @@ class Tag(models.Model):
     games = models.ManyToManyField(Game, related_name='tags')
     
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class Notification(models.Model):
+    """User notifications (e.g. wishlist price drops)"""
+    TYPE_CHOICES = [
+        ('price_drop', 'Price Drop'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    notification_type = models.CharField(max_length=30, choices=TYPE_CHOICES)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, null=True, blank=True)
+    message = models.CharField(max_length=300)
+    is_read = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.message}"
+
+
+class GameDailyStats(models.Model):
+    """Per-game, per-day sales and review counters (rollup for analytics)"""
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    units_sold = models.IntegerField(default=0)
+    gross_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discount_given = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    positive_reviews = models.IntegerField(default=0)
+    negative_reviews = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('game', 'date')
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+        verbose_name_plural = 'game daily stats'
+
+    def __str__(self):
+        return f"{self.game.title} - {self.date}"
+
+
+class PendingGameImage(models.Model):
+    """Cover image waiting to be downloaded and compressed (see ingest_images)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='pending_images')
+    source_url = models.URLField(max_length=500)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.game.title} - {self.source_url}"
+
+
+class GameNeighbour(models.Model):
+    """Precomputed top-k related game (see build_similar_games, build_also_bought)"""
+    KIND_CHOICES = [
+        ('similar', 'Similar content'),
+        ('also_bought', 'Customers also bought'),
+    ]
+
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='neighbours')
+    neighbour = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='similar')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('game', 'kind', 'rank')
+        ordering = ['game', 'kind', 'rank']
+
+    def __str__(self):
+        return f"{self.game_id} → {self.neighbour_id} ({self.kind} #{self.rank})"
+
+
+class PendingSimilarity(models.Model):
+    """Game whose tags, genres or developer changed since neighbours were built"""
+    game = models.OneToOneField(Game, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    queued_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'pending similarities'
+
+    def __str__(self):
+        return f"{self.game_id} (queued {self.queued_at})"
+
+
+class SaleCampaign(models.Model):
+    """Time-boxed discount on genres, tags, publishers and/or specific games"""
+    name = models.CharField(max_length=200)
+    discount_percentage = models.IntegerField(help_text="Discount (0-100) while the campaign runs")
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    genres = models.ManyToManyField(Genre, related_name='sale_campaigns', blank=True)
+    tags = models.ManyToManyField(Tag, related_name='sale_campaigns', blank=True)
+    publishers = models.TextField(blank=True, help_text="One publisher name per line")
+    games = models.ManyToManyField(Game, related_name='sale_campaigns', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-starts_at']
+        indexes = [
+            models.Index(fields=['starts_at', 'ends_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} (-{self.discount_percentage}%)"
+
+    def clean(self):
+        if not 0 < self.discount_percentage <= 100:
+            raise ValidationError({'discount_percentage': 'Must be between 1 and 100.'})
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError({'ends_at': 'Must be after the start.'})
+
+    def publisher_names(self):
+        return [name.strip() for name in self.publishers.splitlines() if name.strip()]
+
+
+class CatalogChange(models.Model):
+    """
+    Games changed by a save, delete, import or sale campaign swap. Every web
+    worker polls these to publish the changes to its catalog streams (see
+    events.py), whichever process made them.
+    """
+    game_ids = models.JSONField(default=list)
+    # Catalog fields that changed (empty for new and removed games)
+    fields = models.JSONField(default=list)
+    created = models.BooleanField(default=False)
+    removed = models.BooleanField(default=False)
+    recorded_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.recorded_at}: {len(self.game_ids)} games"
+
+
+class HeartbeatFlush(models.Model):
+    """A playtime batch already applied to GameLibrary, so replays after a crash are skipped"""
+    id = models.CharField(max_length=36, primary_key=True)
+    applied_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.id
+
+
+class LeaderboardEntry(models.Model):
+    """A user's place on a leaderboard snapshot (see leaderboards.py)"""
+    board = models.CharField(max_length=32)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    score = models.IntegerField()
+    rank = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('board', 'user')
+        indexes = [
+            models.Index(fields=['board', 'rank']),
+        ]
+
+    def __str__(self):
+        return f"{self.board} #{self.rank}: {self.user_id} ({self.score})"
+
+
+class LeaderboardBucket(models.Model):
+    """Score histogram bucket of a leaderboard snapshot"""
+    board = models.CharField(max_length=32)
+    bucket = models.IntegerField()
+    users = models.PositiveIntegerField()
+    users_above = models.PositiveIntegerField(help_text="Users in higher buckets")
+
+    class Meta:
+        unique_together = ('board', 'bucket')
+
+    def __str__(self):
+        return f"{self.board} [{self.bucket}]: {self.users}"
+
+
+class LeaderboardSnapshot(models.Model):
+    """When a leaderboard was last built and how many users it covers"""
+    board = models.CharField(max_length=32, primary_key=True)
+    total_users = models.PositiveIntegerField()
+    built_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.board} ({self.total_users} users, {self.built_at})"
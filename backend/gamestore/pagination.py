@@ -0,0 +1,67 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    """Opaque cursor string for a list of JSON-serializable values"""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValidationError({'cursor': 'Invalid cursor'})
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValidationError({'cursor': 'Invalid cursor'})
+    return values
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(request.query_params.get('limit', default))
+    except ValueError:
+        raise ValidationError({'limit': 'Must be an integer'})
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_page(queryset, field, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    One page of `queryset` ordered by `(field, id)` descending.
+
+    Unlike OFFSET pagination each page is a single index range scan,
+    however deep the client has scrolled. Returns `(items, next_cursor)`.
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+
+    if cursor:
+        value, last_id = decode_cursor(cursor)
+        try:
+            value = queryset.model._meta.get_field(field).to_python(value)
+            last_id = int(last_id)
+        except (DjangoValidationError, TypeError, ValueError):
+            raise ValidationError({'cursor': 'Invalid cursor'})
+        queryset = queryset.filter(
+            Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': last_id})
+        )
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        value = getattr(last, field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        next_cursor = encode_cursor([value, last.id])
+    return items, next_cursor
@@ -0,0 +1,119 @@
+"""
+"Customers also bought" recommendations.
+
+Co-occurrence comes from two sparse incidence matrices: users x games
+(library ownership) and orders x games (completed baskets, a stronger
+signal, weighted up). C = U'U + w B'B is computed one chunk of games at a
+time, normalised by sqrt(popularity_i * popularity_j) so best-sellers don't
+top every list, and the top k per game are stored in GameNeighbour.
+
+Only the two incidence matrices and one chunk of C are held in memory, so
+millions of order items fit in a few hundred MB. NumPy and SciPy are only
+needed by the offline job.
+"""
+
+from itertools import islice
+
+from .models import Game, GameLibrary, GameNeighbour, OrderItem
+from .similarity import store_neighbours, top_k_rows
+
+
+KIND = 'also_bought'
+DEFAULT_K = 10
+DEFAULT_CHUNK_SIZE = 1000
+
+# A game bought in the same order counts twice as much as one merely owned
+BASKET_WEIGHT = 2.0
+
+READ_CHUNK_SIZE = 50000
+
+
+def _incidence(np, sparse, pairs, game_ids):
+    """Binary (owner x game) CSR matrix from an iterator of (owner id, game id)"""
+    links = np.fromiter(pairs, dtype=[('owner', np.int64), ('game', np.int64)])
+    owners, rows = np.unique(links['owner'], return_inverse=True)
+    columns = np.searchsorted(game_ids, links['game'])
+    matrix = sparse.csr_matrix(
+        (np.ones(len(links), dtype=np.float32), (rows, columns)),
+        shape=(len(owners), len(game_ids)),
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix
+
+
+def also_bought_neighbours(k=DEFAULT_K, chunk_size=DEFAULT_CHUNK_SIZE, min_count=1):
+    """Return (game_ids, iterator of (row, neighbour rows, scores))"""
+    import numpy as np
+    from scipy import sparse
+
+    game_ids = np.fromiter(Game.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    owners = _incidence(
+        np, sparse,
+        GameLibrary.objects.values_list('user_id', 'game_id').iterator(chunk_size=READ_CHUNK_SIZE),
+        game_ids,
+    )
+    baskets = _incidence(
+        np, sparse,
+        OrderItem.objects.filter(order__status='completed').values_list('order_id', 'game_id').iterator(
+            chunk_size=READ_CHUNK_SIZE
+        ),
+        game_ids,
+    )
+
+    # The diagonal of C: how often each game was owned or bought
+    popularity = np.asarray(owners.sum(axis=0)).ravel() + BASKET_WEIGHT * np.asarray(baskets.sum(axis=0)).ravel()
+    scale = np.zeros(len(game_ids))
+    scale[popularity > 0] = 1 / np.sqrt(popularity[popularity > 0])
+    column_scale = sparse.diags(scale)
+
+    owners_by_game = owners.T.tocsr()
+    baskets_by_game = baskets.T.tocsr()
+
+    def chunks():
+        for start in range(0, len(game_ids), chunk_size):
+            rows = np.arange(start, min(start + chunk_size, len(game_ids)))
+            counts = (owners_by_game[rows] @ owners + BASKET_WEIGHT * (baskets_by_game[rows] @ baskets)).tocsr()
+            if min_count > 1:
+                counts.data[counts.data < min_count] = 0
+                counts.eliminate_zeros()
+            scores = (sparse.diags(scale[rows]) @ counts @ column_scale).tocsr()
+            yield from top_k_rows(scores, rows, k)
+
+    return game_ids, chunks()
+
+
+def rebuild_also_bought(k=DEFAULT_K, chunk_size=DEFAULT_CHUNK_SIZE, min_count=1):
+    """Recompute every game's also-bought list; returns the number of games"""
+    game_ids, results = also_bought_neighbours(k, chunk_size, min_count)
+    updated = 0
+    while True:
+        chunk = list(islice(results, chunk_size))
+        if not chunk:
+            break
+        updated += store_neighbours(game_ids, chunk, kind=KIND)
+    return updated
+
+
+def checkout_recommendations(cart_game_ids, owned_game_ids, limit=DEFAULT_K):
+    """
+    Games bought alongside the cart, minus the cart and games already owned.
+
+    Scores of a game recommended by several cart items are added up.
+    """
+    # At most len(cart) * k rows: filter owned games here, not in a huge NOT IN
+    excluded = set(cart_game_ids) | set(owned_game_ids)
+    scores = {}
+    games = {}
+    neighbours = (
+        GameNeighbour.objects
+        .filter(kind=KIND, game_id__in=cart_game_ids)
+        .select_related('neighbour')
+    )
+    for entry in neighbours:
+        if entry.neighbour_id in excluded:
+            continue
+        scores[entry.neighbour_id] = scores.get(entry.neighbour_id, 0) + entry.score
+        games[entry.neighbour_id] = entry.neighbour
+    ranked = sorted(scores, key=lambda game_id: (-scores[game_id], game_id))
+    return [games[game_id] for game_id in ranked[:limit]]
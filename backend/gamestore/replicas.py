@@ -0,0 +1,120 @@
+"""
+Read replica routing with read-your-writes.
+
+When a `replica` database is configured (REPLICA_DATABASE_URL), safe requests
+to the catalog views (games, reviews, genres and tags served with them) read
+catalog tables from the replica. Everything else, and every write, goes to
+the primary:
+
+- ReplicaRouter only answers `replica` for catalog models, and only while a
+  view using CatalogReplicaMixin is handling a GET/HEAD/OPTIONS request
+- ReplicaPinMiddleware pins a user to the primary for REPLICA_PIN_SECONDS
+  after any successful write of theirs, so e.g. a review they just posted
+  shows up in the feed even if the replica lags behind
+
+Without a replica every query goes to `default`, as before.
+"""
+
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.permissions import SAFE_METHODS
+
+
+REPLICA = 'replica'
+
+# Tables the catalog views read; lag of a few seconds is fine for these
+CATALOG_MODELS = {
+    'gamestore.game', 'gamestore.genre', 'gamestore.tag', 'gamestore.review',
+    'gamestore.gameneighbour', 'gamestore.game_genres', 'gamestore.tag_games',
+}
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f'replica:pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Keep the user's reads on the primary for REPLICA_PIN_SECONDS"""
+    cache.set(_pin_key(user_id), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(_pin_key(user_id), False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            _replica_reads.get()
+            and model._meta.label_lower in CATALOG_MODELS
+            and replica_configured()
+        ):
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both sides
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from the primary
+        return db != REPLICA
+
+
+class CatalogReplicaMixin:
+    """Serve safe requests of a DRF view from the replica unless the user is pinned"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # After authentication, so a pinned user is recognised
+        if (
+            request.method in SAFE_METHODS
+            and replica_configured()
+            and not (request.user.is_authenticated and is_pinned(request.user.id))
+        ):
+            self._replica_token = _replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _replica_reads.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def _pin_if_written(request, response):
+    if request.method in SAFE_METHODS or response.status_code >= 400 or not replica_configured():
+        return
+    # DRF copies the authenticated user (JWT included) back onto the request
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        pin_to_primary(user.id)
+
+
+@sync_and_async_middleware
+def ReplicaPinMiddleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            response = await get_response(request)
+            if request.method not in SAFE_METHODS:
+                await sync_to_async(_pin_if_written)(request, response)
+            return response
+    else:
+        def middleware(request):
+            response = get_response(request)
+            _pin_if_written(request, response)
+            return response
+    return middleware
@@ -0,0 +1,50 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import GameDailyStats
+
+
+SALES_FIELDS = ['units_sold', 'gross_revenue', 'discount_given']
+REVIEW_FIELDS = ['positive_reviews', 'negative_reviews']
+
+
+def bump(game_id, day, **deltas):
+    """Atomically add `deltas` to the rollup row for (game, day)"""
+    increments = {field: F(field) + value for field, value in deltas.items()}
+    rows = GameDailyStats.objects.filter(game_id=game_id, date=day)
+    if rows.update(**increments):
+        return
+    if not any(value > 0 for value in deltas.values()):
+        # Nothing to take a removal from; creating the row could also point
+        # at a game being deleted (its reviews are removed in the cascade)
+        return
+    try:
+        with transaction.atomic():
+            GameDailyStats.objects.create(game_id=game_id, date=day, **deltas)
+    except IntegrityError:
+        # Another request created the row first
+        rows.update(**increments)
+
+
+def record_order_sales(order, items):
+    """Add a completed order's items to the daily sales rollup"""
+    day = timezone.localdate(order.completed_at or timezone.now())
+    totals = defaultdict(lambda: {'units_sold': 0, 'gross_revenue': Decimal(0), 'discount_given': Decimal(0)})
+    for item in items:
+        total = totals[item.game_id]
+        total['units_sold'] += 1
+        total['gross_revenue'] += item.price
+        total['discount_given'] += item.discount_applied
+    for game_id, deltas in totals.items():
+        bump(game_id, day, **deltas)
+
+
+def record_review(review, delta, rating=None):
+    """Count a review (delta=1) or remove it (delta=-1) from the rollup"""
+    rating = rating or review.rating
+    field = 'positive_reviews' if rating == 'positive' else 'negative_reviews'
+    bump(review.game_id, timezone.localdate(review.created_at), **{field: delta})
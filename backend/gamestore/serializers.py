@@ -2,7 +2,8 @@ from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import (
     Game, UserProfile, GameLibrary, Wishlist, 
-    Review, Achievement, UserAchievement, Order, OrderItem, Tag
+    Review, Achievement, UserAchievement, Order, OrderItem, Tag, Notification,
+    LeaderboardEntry
 )
 
 
@@ -28,6 +29,7 @@ class TagSerializer(serializers.ModelSerializer):
 
 class GameSerializer(serializers.ModelSerializer):
     discounted_price = serializers.ReadOnlyField()
+    sale_discount = serializers.ReadOnlyField()
     tags = TagSerializer(many=True, read_only=True)
     review_count = serializers.SerializerMethodField()
 
@@ -35,7 +37,7 @@ class GameSerializer(serializers.ModelSerializer):
         model = Game
         fields = [
             'id', 'title', 'slug', 'description', 'short_description',
-            'price', 'discount_percentage', 'discounted_price',
+            'price', 'discount_percentage', 'sale_discount', 'discounted_price',
             'image', 'release_date', 'developer', 'publisher', 'genre',
             'meta_title', 'meta_description', 'meta_keywords',
             'positive_reviews', 'tags', 'review_count',
@@ -43,9 +45,24 @@ class GameSerializer(serializers.ModelSerializer):
         ]
 
     def get_review_count(self, obj):
+        if hasattr(obj, '_review_count'):
+            return obj._review_count
         return obj.reviews.count()
 
 
+class GameSummarySerializer(serializers.ModelSerializer):
+    """Slim game representation for lists that don't need the full details"""
+    discounted_price = serializers.ReadOnlyField()
+    sale_discount = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Game
+        fields = [
+            'id', 'title', 'slug', 'image',
+            'price', 'discount_percentage', 'sale_discount', 'discounted_price'
+        ]
+
+
 class GameLibrarySerializer(serializers.ModelSerializer):
     game = GameSerializer(read_only=True)
     
@@ -79,6 +96,18 @@ class ReviewSerializer(serializers.ModelSerializer):
         ]
 
 
+class ReviewFeedSerializer(serializers.ModelSerializer):
+    """Review without the nested game, for per-game feeds"""
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Review
+        fields = [
+            'id', 'username', 'rating', 'review_text',
+            'hours_played', 'helpful_count', 'created_at', 'updated_at'
+        ]
+
+
 class AchievementSerializer(serializers.ModelSerializer):
     class Meta:
         model = Achievement
@@ -114,6 +143,34 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
 
 
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ['id', 'notification_type', 'game', 'message', 'is_read', 'created_at']
+
+
+class OrderItemSummarySerializer(serializers.ModelSerializer):
+    """Order item with just the game id, title and slug"""
+    title = serializers.CharField(source='game.title', read_only=True)
+    slug = serializers.CharField(source='game.slug', read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'game_id', 'title', 'slug', 'price', 'discount_applied']
+
+
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """Order without the user and full game details, for history pages"""
+    items = OrderItemSummarySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'total_amount', 'status', 'payment_method',
+            'created_at', 'completed_at', 'items'
+        ]
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     password_confirm = serializers.CharField(write_only=True)
@@ -132,4 +189,33 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         # Create profile automatically
         UserProfile.objects.create(user=user)
-        return user
\ No newline at end of file
+        return user
+
+
+class CatalogImportSerializer(serializers.Serializer):
+    """One row of a catalog import file (plain Serializer: no per-row queries)"""
+    title = serializers.CharField(max_length=200)
+    slug = serializers.SlugField(max_length=250, required=False, allow_blank=True)
+    description = serializers.CharField()
+    short_description = serializers.CharField(max_length=500, required=False, allow_blank=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    discount_percentage = serializers.IntegerField(min_value=0, max_value=100, required=False, default=0)
+    release_date = serializers.DateField()
+    developer = serializers.CharField(max_length=200)
+    publisher = serializers.CharField(max_length=200)
+    genres = serializers.ListField(child=serializers.CharField(max_length=100), required=False)
+    tags = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
+    image_url = serializers.URLField(max_length=500, required=False, allow_blank=True)
+    meta_title = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    meta_description = serializers.CharField(max_length=160, required=False, allow_blank=True)
+    meta_keywords = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    positive_reviews = serializers.IntegerField(min_value=0, max_value=100, required=False, default=0)
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    """A ranked user of a leaderboard snapshot"""
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = LeaderboardEntry
+        fields = ['rank', 'username', 'score']
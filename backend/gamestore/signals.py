@@ -0,0 +1,82 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .entitlements import invalidate_entitlements
+from .events import CATALOG_FIELDS, record_catalog_change
+from .models import Game, GameLibrary, Review, Tag, Wishlist
+from .rollups import record_review
+from .similarity import queue_similarity
+
+
+@receiver([post_save, post_delete], sender=GameLibrary)
+@receiver([post_save, post_delete], sender=Wishlist)
+def library_or_wishlist_changed(sender, instance, **kwargs):
+    """Keep the cached entitlement sets in sync with library/wishlist rows"""
+    invalidate_entitlements(instance.user_id)
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    """Keep the stored rating so a changed rating can move between rollup columns"""
+    if instance.pk:
+        instance._previous_rating = Review.objects.filter(pk=instance.pk).values_list(
+            'rating', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    if created:
+        record_review(instance, 1)
+        return
+    previous = getattr(instance, '_previous_rating', None)
+    if previous and previous != instance.rating:
+        record_review(instance, -1, rating=previous)
+        record_review(instance, 1)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    record_review(instance, -1)
+
+
+@receiver(pre_save, sender=Game)
+def remember_game_fields(sender, instance, **kwargs):
+    """Keep the stored catalog fields to tell which of them a save changes"""
+    if instance.pk:
+        instance._previous_fields = Game.objects.filter(pk=instance.pk).values(*CATALOG_FIELDS).first()
+
+
+@receiver(post_save, sender=Game)
+def game_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Rebuild similar games of new games and developer changes; log catalog changes"""
+    previous = getattr(instance, '_previous_fields', None) or {}
+    if created or previous.get('developer') != instance.developer:
+        queue_similarity([instance.pk])
+
+    fields = [
+        name for name in CATALOG_FIELDS
+        if (update_fields is None or name in update_fields)
+        and previous.get(name) != Game._meta.get_field(name).get_prep_value(getattr(instance, name))
+    ]
+    if created or fields:
+        record_catalog_change([instance.pk], [] if created else fields, created=created)
+
+
+@receiver(post_delete, sender=Game)
+def game_deleted(sender, instance, **kwargs):
+    record_catalog_change([instance.pk], removed=True)
+
+
+@receiver(m2m_changed, sender=Game.genres.through)
+@receiver(m2m_changed, sender=Tag.games.through)
+def game_features_changed(sender, instance, action, pk_set, **kwargs):
+    """Queue games whose genres or tags changed, from either side of the relation"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if isinstance(instance, Game):
+        queue_similarity([instance.pk])
+    elif action == 'pre_clear':
+        queue_similarity(instance.games.values_list('id', flat=True))
+    else:
+        queue_similarity(pk_set)
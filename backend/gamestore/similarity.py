@@ -0,0 +1,192 @@
+"""
+Content-based "similar games".
+
+Each game is a sparse row over its genres, tags and developer, weighted by
+inverse document frequency (a tag on every game says little) and
+L2-normalised, so the dot product of two rows is their cosine similarity.
+Neighbours are found a batch of rows at a time with one sparse matrix
+product per batch, and the top k per game are stored in GameNeighbour.
+
+NumPy and SciPy are only needed by the offline job, not by the web process.
+"""
+
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Game, GameNeighbour, PendingSimilarity, Tag
+
+
+KIND = 'similar'
+DEFAULT_K = 10
+DEFAULT_BATCH_SIZE = 500
+
+# Developer matches count for less than a shared genre or tag
+DEVELOPER_WEIGHT = 0.5
+
+
+def queue_similarity(game_ids):
+    """Mark games for the next incremental build_similar_games run"""
+    game_ids = {game_id for game_id in game_ids if game_id is not None}
+    if not game_ids:
+        return
+    PendingSimilarity.objects.bulk_create(
+        [PendingSimilarity(game_id=game_id) for game_id in game_ids],
+        update_conflicts=True,
+        unique_fields=['game'],
+        update_fields=['queued_at'],
+    )
+
+
+def _link_block(np, links, row_of):
+    """(rows, columns, column count) for (game_id, feature_id) pairs"""
+    if not len(links):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0
+    links = np.asarray(links, dtype=np.int64)
+    features, columns = np.unique(links[:, 1], return_inverse=True)
+    return row_of(links[:, 0]), columns, len(features)
+
+
+def build_feature_matrix():
+    """Return (game_ids, matrix): one normalised CSR row per game, by id"""
+    import numpy as np
+    from scipy import sparse
+
+    game_ids = np.fromiter(Game.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+
+    def row_of(ids):
+        return np.searchsorted(game_ids, ids)
+
+    blocks = [
+        (_link_block(np, list(Game.genres.through.objects.values_list('game_id', 'genre_id')), row_of), 1.0),
+        (_link_block(np, list(Tag.games.through.objects.values_list('game_id', 'tag_id')), row_of), 1.0),
+    ]
+
+    developers = {}
+    developer_links = []
+    for game_id, developer in Game.objects.values_list('id', 'developer'):
+        developer = developer.strip().lower()
+        if developer:
+            developer_links.append((game_id, developers.setdefault(developer, len(developers))))
+    blocks.append((_link_block(np, developer_links, row_of), DEVELOPER_WEIGHT))
+
+    rows, columns, weights = [], [], []
+    offset = 0
+    for (block_rows, block_columns, width), weight in blocks:
+        rows.append(block_rows)
+        columns.append(block_columns + offset)
+        weights.append(np.full(len(block_rows), weight))
+        offset += width
+
+    matrix = sparse.csr_matrix(
+        (np.concatenate(weights), (np.concatenate(rows), np.concatenate(columns))),
+        shape=(len(game_ids), offset),
+    )
+    matrix.sum_duplicates()
+
+    # IDF weighting, then unit-length rows
+    document_frequency = np.bincount(matrix.indices, minlength=offset)
+    idf = np.log((1 + len(game_ids)) / (1 + document_frequency)) + 1
+    matrix = matrix.multiply(idf).tocsr()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix = sparse.diags(1 / norms) @ matrix
+    return game_ids, matrix.tocsr()
+
+
+def top_k_rows(scores, rows, k):
+    """
+    Yield (row, neighbour rows, scores), best first and equal scores by
+    row, for a CSR block of scores whose i-th line belongs to rows[i].
+    Self-matches are dropped.
+    """
+    import numpy as np
+
+    for i, row in enumerate(rows):
+        begin, end = scores.indptr[i], scores.indptr[i + 1]
+        candidates = scores.indices[begin:end]
+        values = scores.data[begin:end]
+        keep = (candidates != row) & (values > 0)
+        candidates, values = candidates[keep], values[keep]
+        if len(values) > k:
+            # Keep every candidate tied with the k-th best, so that ties
+            # are broken by row below rather than by the partition
+            kth = -np.partition(-values, k - 1)[k - 1]
+            keep = values >= kth
+            candidates, values = candidates[keep], values[keep]
+        order = np.lexsort((candidates, -values))[:k]
+        yield row, candidates[order], values[order]
+
+
+def top_k_neighbours(matrix, rows, k=DEFAULT_K, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield (row, neighbour rows, scores) for `rows`, best first"""
+    transposed = matrix.T.tocsr()
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        # Sparse product: only games sharing a feature get a score
+        yield from top_k_rows((matrix[batch] @ transposed).tocsr(), batch, k)
+
+
+def store_neighbours(game_ids, results, kind=KIND):
+    """Replace the stored neighbours of every game in `results`"""
+    updated = []
+    neighbours = []
+    for row, neighbour_rows, scores in results:
+        game_id = int(game_ids[row])
+        updated.append(game_id)
+        neighbours.extend(
+            GameNeighbour(
+                game_id=game_id,
+                neighbour_id=int(game_ids[neighbour]),
+                kind=kind,
+                rank=rank,
+                score=float(score),
+            )
+            for rank, (neighbour, score) in enumerate(zip(neighbour_rows, scores), start=1)
+        )
+    with transaction.atomic():
+        GameNeighbour.objects.filter(kind=kind, game_id__in=updated).delete()
+        GameNeighbour.objects.bulk_create(neighbours, batch_size=1000)
+    return len(updated)
+
+
+def rebuild_similar_games(incremental=False, k=DEFAULT_K, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Recompute similar games; returns the number of games updated.
+
+    Incremental runs only recompute queued games, games sharing a feature
+    with them, and games currently listing them as a neighbour.
+    """
+    import numpy as np
+
+    started = timezone.now()
+    game_ids, matrix = build_feature_matrix()
+    if not len(game_ids):
+        return 0
+
+    if incremental:
+        changed = list(PendingSimilarity.objects.values_list('game_id', flat=True))
+        if not changed:
+            return 0
+        listing = GameNeighbour.objects.filter(kind=KIND, neighbour_id__in=changed).values_list('game_id', flat=True)
+        changed_rows = np.flatnonzero(np.isin(game_ids, changed))
+        features = np.unique(matrix[changed_rows].indices)
+        sharing = np.unique(matrix.tocsc()[:, features].indices)
+        rows = np.union1d(
+            np.union1d(changed_rows, sharing),
+            np.flatnonzero(np.isin(game_ids, list(listing)))
+        )
+    else:
+        rows = np.arange(len(game_ids))
+
+    updated = 0
+    results = top_k_neighbours(matrix, rows, k, batch_size)
+    while True:
+        chunk = list(islice(results, batch_size))
+        if not chunk:
+            break
+        updated += store_neighbours(game_ids, chunk)
+
+    PendingSimilarity.objects.filter(queued_at__lte=started).delete()
+    return updated
@@ -0,0 +1,96 @@
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+
+SAVE_ATTEMPTS = 5
+
+# Bases looked up per prefix query in batch mode
+BATCH_QUERY_SIZE = 200
+
+
+def _suffix(slug, base):
+    """Counter used by `slug` for `base`: 0 for the bare base, None if unrelated"""
+    if slug == base:
+        return 0
+    tail = slug[len(base) + 1:]
+    if slug.startswith(base + '-') and tail.isdigit():
+        return int(tail)
+    return None
+
+
+def _prefix_filter(bases, field):
+    return reduce(or_, (Q(**{field: base}) | Q(**{f'{field}__startswith': base + '-'}) for base in bases))
+
+
+def _next_free(base, taken):
+    if 0 not in taken:
+        return base
+    counter = 1
+    while counter in taken:
+        counter += 1
+    return f'{base}-{counter}'
+
+
+def allocate_slug(queryset, base, field='slug'):
+    """
+    Return `base` or the first free `base-N`, with a single prefix query.
+
+    Pass a queryset that excludes the object being saved.
+    """
+    taken = set()
+    for slug in queryset.filter(_prefix_filter([base], field)).values_list(field, flat=True):
+        suffix = _suffix(slug, base)
+        if suffix is not None:
+            taken.add(suffix)
+    return _next_free(base, taken)
+
+
+def allocate_slugs(queryset, bases, field='slug'):
+    """
+    Batch mode: return a unique slug for each base, in order.
+
+    Existing slugs are fetched with one prefix query per BATCH_QUERY_SIZE
+    distinct bases. Every slug handed out joins the same taken set, so
+    repeated bases get successive suffixes and a base that looks like a
+    suffixed one ("portal-2" next to "portal") never gets a duplicate.
+    """
+    distinct = list(dict.fromkeys(bases))
+    used = set()
+    for start in range(0, len(distinct), BATCH_QUERY_SIZE):
+        chunk = distinct[start:start + BATCH_QUERY_SIZE]
+        used.update(queryset.filter(_prefix_filter(chunk, field)).values_list(field, flat=True))
+
+    # Next counter to try per base, so repeated bases don't rescan from 1
+    next_counter = {}
+    slugs = []
+    for base in bases:
+        counter = next_counter.get(base, 0)
+        slug = f'{base}-{counter}' if counter else base
+        while slug in used:
+            counter += 1
+            slug = f'{base}-{counter}'
+        next_counter[base] = counter + 1
+        used.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def save_with_unique_slug(instance, base, save, field='slug'):
+    """
+    Allocate a slug for `instance` and call `save()`, retrying with a fresh
+    slug when a concurrent insert took it first.
+    """
+    model = type(instance)
+    others = model._default_manager.exclude(pk=instance.pk) if instance.pk else model._default_manager.all()
+    for attempt in range(SAVE_ATTEMPTS):
+        setattr(instance, field, allocate_slug(others, base, field))
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            slug_taken = others.filter(**{field: getattr(instance, field)}).exists()
+            if not slug_taken or attempt == SAVE_ATTEMPTS - 1:
+                raise
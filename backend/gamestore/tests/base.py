@@ -0,0 +1,45 @@
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from gamestore import heartbeats, throttling
+from gamestore.models import Game
+
+
+# Throttle buckets, heartbeats and the cache are files shared by workers;
+# tests get their own so runs don't see each other's state
+STORE_DIR = tempfile.mkdtemp(prefix='notsteam-tests-')
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    THROTTLE_DB_PATH=os.path.join(STORE_DIR, 'throttle.sqlite3'),
+    HEARTBEAT_DB_PATH=os.path.join(STORE_DIR, 'heartbeats.sqlite3'),
+)
+class StoreTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        throttling._store = None
+        heartbeats._buffer = None
+        for name in ('throttle.sqlite3', 'heartbeats.sqlite3'):
+            for suffix in ('', '-wal', '-shm'):
+                path = os.path.join(STORE_DIR, name + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def make_user(self, username='player', **kwargs):
+        return User.objects.create_user(username=username, password='pass1234', **kwargs)
+
+    def make_game(self, title='Portal', price='9.99', **kwargs):
+        kwargs.setdefault('description', 'A game')
+        kwargs.setdefault('short_description', 'A game')
+        kwargs.setdefault('release_date', date(2020, 1, 1))
+        kwargs.setdefault('developer', 'Valve')
+        kwargs.setdefault('publisher', 'Valve')
+        return Game.objects.create(title=title, price=Decimal(price), **kwargs)
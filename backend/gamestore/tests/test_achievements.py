@@ -0,0 +1,66 @@
+from rest_framework.test import APIClient
+
+from gamestore.achievements import LEVEL_XP, MAX_UNLOCK_BATCH, level_for_xp
+from gamestore.models import Achievement, UserAchievement, UserProfile
+
+from .base import StoreTestCase
+
+
+class LevelCurveTests(StoreTestCase):
+    def test_levels_start_at_the_thresholds(self):
+        self.assertEqual(level_for_xp(0), 1)
+        self.assertEqual(level_for_xp(LEVEL_XP[1] - 1), 1)
+        self.assertEqual(level_for_xp(LEVEL_XP[1]), 2)
+        self.assertEqual(level_for_xp(10 ** 9), len(LEVEL_XP))
+
+
+class UnlockAchievementsTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+        self.owned = self.make_game('Portal')
+        self.user.library.create(game=self.owned)
+        self.other = self.make_game('Half-Life')
+        self.first, self.second = (
+            Achievement.objects.create(game=self.owned, name=name, description=name, xp_reward=60)
+            for name in ('Lab Rat', 'Fratricide')
+        )
+        self.unowned = Achievement.objects.create(game=self.other, name='Crowbar', description='Crowbar', xp_reward=500)
+
+    def unlock(self, achievement_ids):
+        return self.client.post('/api/achievements/unlock/', {'achievement_ids': achievement_ids}, format='json')
+
+    def test_xp_is_awarded_once_per_achievement(self):
+        response = self.unlock([self.first.id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['xp_gained'], 60)
+
+        response = self.unlock([self.first.id, self.first.id])
+        self.assertEqual(response.json()['unlocked'], [])
+        self.assertEqual(response.json()['already_unlocked'], [self.first.id])
+        self.assertEqual(response.json()['xp_gained'], 0)
+
+        self.assertEqual(UserProfile.objects.get(user=self.user).xp, 60)
+        self.assertEqual(UserAchievement.objects.filter(user=self.user).count(), 1)
+
+    def test_unowned_and_missing_achievements_are_invalid(self):
+        response = self.unlock([self.unowned.id, 999999])
+        self.assertEqual(response.json()['invalid'], sorted([self.unowned.id, 999999]))
+        self.assertEqual(response.json()['xp_gained'], 0)
+        self.assertFalse(UserAchievement.objects.exists())
+
+    def test_crossing_a_threshold_levels_up(self):
+        response = self.unlock([self.first.id]).json()
+        self.assertEqual((response['xp'], response['level'], response['level_up']), (60, 1, False))
+
+        response = self.unlock([self.second.id]).json()
+        self.assertEqual((response['xp'], response['level'], response['level_up']), (120, 2, True))
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.xp, profile.level), (120, 2))
+
+    def test_bad_batches_are_rejected(self):
+        self.assertEqual(self.unlock('1,2').status_code, 400)
+        self.assertEqual(self.unlock([True]).status_code, 400)
+        self.assertEqual(self.unlock(list(range(MAX_UNLOCK_BATCH + 1))).status_code, 400)
@@ -0,0 +1,145 @@
+import datetime
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from gamestore.admin import BoundedDatesQuerySet, EstimatedCountPaginator, estimate_count
+from gamestore.models import GameLibrary, Genre, Order, OrderItem, Tag, UserProfile
+
+from .base import StoreTestCase
+
+
+class ChangelistTests(StoreTestCase):
+    """Annotated changelists: flat query counts and ordering by the annotations"""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = self.make_user('admin', is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        # Row n gets n sales, n owned games and n games in its genre and tag
+        for n in range(self.rows + 1, self.rows + count + 1):
+            user = self.make_user(f'player{n}')
+            UserProfile.objects.create(user=user)
+            genre = Genre.objects.create(name=f'Genre {n}')
+            tag = Tag.objects.create(name=f'Tag {n}')
+            order = Order.objects.create(
+                user=user, total_amount=Decimal('9.99') * n, status='completed', payment_method='stripe'
+            )
+            game = self.make_game(f'Game {n}')
+            game.genres.add(genre)
+            game.tags.add(tag)
+            OrderItem.objects.bulk_create([OrderItem(order=order, game=game, price=Decimal('9.99'))] * n)
+            others = [self.make_game(f'Game {n}.{m}') for m in range(1, n)]
+            genre.games.add(*others)
+            tag.games.add(*others)
+            GameLibrary.objects.bulk_create([GameLibrary(user=user, game=other) for other in [game, *others]])
+        self.rows += count
+
+    def changelist(self, model, **params):
+        response = self.client.get(f'/admin/gamestore/{model}/', params)
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['cl'].result_list)
+
+    def test_query_count_does_not_grow_with_the_rows(self):
+        models = ('game', 'userprofile', 'genre', 'tag')
+        self.add_rows(3)
+        counts = {}
+        for model in models:
+            with CaptureQueriesContext(connection) as queries:
+                self.changelist(model)
+            counts[model] = len(queries)
+
+        self.add_rows(3)
+        for model in models:
+            with self.subTest(model=model), self.assertNumQueries(counts[model]):
+                self.assertEqual(len(self.changelist(model)), 6 if model != 'game' else 21)
+
+    def test_ordering_by_annotated_columns(self):
+        self.add_rows(3)
+        # ?o= is the 1-based position in list_display
+        games = self.changelist('game', o='-7')
+        self.assertEqual([game.title for game in games[:3]], ['Game 3', 'Game 2', 'Game 1'])
+        self.assertEqual([game._revenue for game in games[:3]], [Decimal('29.97'), Decimal('19.98'), Decimal('9.99')])
+        self.assertEqual([game.title for game in self.changelist('game', o='8')][-3:], ['Game 1', 'Game 2', 'Game 3'])
+
+        profiles = self.changelist('userprofile', o='-4')
+        self.assertEqual([profile.user.username for profile in profiles], ['player3', 'player2', 'player1'])
+        self.assertEqual([profile._games_owned for profile in profiles], [3, 2, 1])
+        profiles = self.changelist('userprofile', o='5')
+        self.assertEqual([profile._total_spent for profile in profiles], [Decimal('9.99'), Decimal('19.98'), Decimal('29.97')])
+
+        for model, column in (('genre', '3'), ('tag', '2')):
+            with self.subTest(model=model):
+                rows = self.changelist(model, o=f'-{column}')
+                self.assertEqual([row.name.split()[-1] for row in rows], ['3', '2', '1'])
+                self.assertEqual([row._game_count for row in rows], [3, 2, 1])
+
+
+class LargeTableHelperTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+        self.orders = Order.objects.all()
+
+    def order_on(self, *days):
+        for day in days:
+            order = Order.objects.create(user=self.user, total_amount=Decimal('9.99'), payment_method='stripe')
+            Order.objects.filter(pk=order.pk).update(
+                created_at=datetime.datetime.combine(day, datetime.time(12), datetime.timezone.utc)
+            )
+
+    def paginator(self, threshold=5):
+        paginator = EstimatedCountPaginator(self.orders.order_by('id'), 10)
+        paginator.exact_count_threshold = threshold
+        return paginator
+
+    def test_paginator_counts_exactly_without_an_estimate(self):
+        self.order_on(date(2024, 1, 1), date(2024, 1, 2))
+        # SQLite has no planner estimate
+        self.assertIsNone(estimate_count(self.orders))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.paginator().count, 2)
+
+    def test_paginator_trusts_large_estimates_only(self):
+        self.order_on(date(2024, 1, 1), date(2024, 1, 2))
+        with mock.patch('gamestore.admin.estimate_count', return_value=4):
+            self.assertEqual(self.paginator().count, 2)
+        with mock.patch('gamestore.admin.estimate_count', return_value=50000):
+            with self.assertNumQueries(0):
+                paginator = self.paginator()
+                self.assertEqual((paginator.count, paginator.num_pages), (50000, 5000))
+
+    def test_dates_list_every_period_between_the_bounds(self):
+        self.assertEqual(BoundedDatesQuerySet(Order).dates('created_at', 'year'), [])
+        self.order_on(date(2023, 11, 30), date(2024, 1, 15), date(2024, 3, 4), date(2024, 3, 2))
+        orders = BoundedDatesQuerySet(Order)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(orders.datetimes('created_at', 'year'), [date(2023, 1, 1), date(2024, 1, 1)])
+        self.assertEqual(orders.dates('created_at', 'month', order='DESC'), [
+            date(2024, 3, 1), date(2024, 2, 1), date(2024, 1, 1), date(2023, 12, 1), date(2023, 11, 1),
+        ])
+        # Bounded by the drilldown's filter, with the empty 3rd in between
+        self.assertEqual(
+            orders.filter(created_at__year=2024, created_at__month=3).dates('created_at', 'day'),
+            [date(2024, 3, 2), date(2024, 3, 3), date(2024, 3, 4)]
+        )
+
+    def test_order_changelist_drilldown(self):
+        self.order_on(date(2023, 11, 30), date(2024, 1, 15), date(2024, 3, 4), date(2024, 3, 2))
+        self.client.force_login(self.make_user('admin', is_staff=True, is_superuser=True))
+
+        def choices(**params):
+            response = self.client.get('/admin/gamestore/order/', params)
+            self.assertEqual(response.status_code, 200)
+            return [choice['title'] for choice in response.context['choices']]
+
+        self.assertEqual(choices(), ['2023', '2024'])
+        self.assertEqual(choices(created_at__year=2024), ['January 2024', 'February 2024', 'March 2024'])
+        self.assertEqual(choices(created_at__year=2024, created_at__month=3), ['March 2', 'March 3', 'March 4'])
@@ -0,0 +1,72 @@
+from datetime import date
+
+from rest_framework.test import APIClient
+
+from gamestore.models import Game, GameDailyStats, Review
+
+from .base import StoreTestCase
+
+
+class SalesAnalyticsTests(StoreTestCase):
+    url = '/api/analytics/sales/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user(is_staff=True))
+
+    def test_bad_dates_are_rejected(self):
+        for params in (
+            {'start': '2024-02-30', 'end': '2024-03-10'}, {'start': 'garbage'}, {'end': 'yesterday'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_non_integer_game_id_is_rejected(self):
+        response = self.client.get(self.url, {'game_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_series_for_one_game(self):
+        game = self.make_game()
+        other = self.make_game(title='Other')
+        GameDailyStats.objects.create(game=game, date=date(2024, 3, 1), units_sold=2, gross_revenue='20.00')
+        GameDailyStats.objects.create(game=other, date=date(2024, 3, 1), units_sold=5, gross_revenue='50.00')
+
+        response = self.client.get(self.url, {'start': '2024-03-01', 'end': '2024-03-02', 'game_id': str(game.id)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['units_sold'] for row in response.json()['series']], [2])
+
+
+class ReviewRollupTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.game = self.make_game()
+
+    def add_review(self, username, rating='positive'):
+        return Review.objects.create(
+            user=self.make_user(username), game=self.game, rating=rating, review_text='Text', hours_played=1
+        )
+
+    def test_reviews_are_counted_and_removed(self):
+        review = self.add_review('ann')
+        self.add_review('bob', rating='negative')
+        review.delete()
+        stats = GameDailyStats.objects.get(game=self.game)
+        self.assertEqual((stats.positive_reviews, stats.negative_reviews), (0, 1))
+
+    def test_deleting_a_game_with_reviews(self):
+        self.add_review('ann')
+        self.add_review('bob', rating='negative')
+        client = APIClient()
+        client.force_authenticate(self.make_user('admin', is_staff=True))
+
+        response = client.delete(f'/api/games/{self.game.slug}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Game.objects.exists())
+        self.assertFalse(GameDailyStats.objects.exists())
+
+    def test_removal_without_a_rollup_row_creates_none(self):
+        review = self.add_review('ann')
+        GameDailyStats.objects.all().delete()
+        review.delete()
+        self.assertFalse(GameDailyStats.objects.exists())
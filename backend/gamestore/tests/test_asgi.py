@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.urls import path
+
+from backend import asgi
+
+
+chunk_sent = threading.Event()
+streamed_before_read = []
+
+
+def stream_view(request):
+    def chunks():
+        yield b'first'
+        # Only true streaming sends the first chunk before the second is produced
+        streamed_before_read.append(chunk_sent.wait(timeout=2))
+        yield b'second'
+    return StreamingHttpResponse(chunks())
+
+
+async def async_view(request):
+    return JsonResponse({'thread': threading.current_thread().name})
+
+
+def sync_view(request):
+    return JsonResponse({'thread': threading.current_thread().name})
+
+
+urlpatterns = [
+    path('stream/', stream_view),
+    path('async/', async_view),
+    path('sync/', sync_view),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsgiDispatchTests(SimpleTestCase):
+    def setUp(self):
+        asgi.is_async_path.cache_clear()
+        self.addCleanup(asgi.is_async_path.cache_clear)
+        chunk_sent.clear()
+        streamed_before_read.clear()
+
+    def request(self, url):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': url, 'raw_path': url.encode(), 'root_path': '', 'query_string': b'',
+            'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 1234), 'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def run():
+            requested = False
+            finished = asyncio.Event()
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The client hangs up once the response is complete
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                if message['type'] == 'http.response.body':
+                    if message.get('body') == b'first':
+                        chunk_sent.set()
+                    if not message.get('more_body'):
+                        finished.set()
+
+            await asgi.application(scope, receive, send)
+
+        asyncio.run(run())
+        return messages
+
+    def body(self, messages):
+        return b''.join(m.get('body', b'') for m in messages if m['type'] == 'http.response.body')
+
+    def test_routes_only_async_views_to_the_asgi_handler(self):
+        self.assertTrue(asgi.is_async_path('/async/'))
+        self.assertFalse(asgi.is_async_path('/sync/'))
+        self.assertFalse(asgi.is_async_path('/missing/'))
+
+    def test_sync_views_run_on_the_wsgi_thread_pool(self):
+        self.assertIn(b'"thread": "WSGI', self.body(self.request('/sync/')))
+
+    def test_sync_streaming_response_is_sent_chunk_by_chunk(self):
+        messages = self.request('/stream/')
+        self.assertEqual(self.body(messages), b'firstsecond')
+        self.assertEqual(streamed_before_read, [True])
+
+    def test_async_views_still_work(self):
+        messages = self.request('/async/')
+        self.assertEqual(messages[0]['status'], 200)
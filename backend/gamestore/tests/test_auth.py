@@ -0,0 +1,98 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient, APIRequestFactory
+
+from gamestore.authentication import StatelessJWTAuthentication, issue_tokens
+
+from .base import StoreTestCase
+
+
+class JWTAuthTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = self.make_user()
+
+    def login(self):
+        response = self.client.post('/api/auth/login/', {'username': 'player', 'password': 'pass1234'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def refresh(self, refresh):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': refresh}, format='json')
+
+    def test_login_returns_a_working_access_token(self):
+        tokens = self.login()
+        self.assertEqual(tokens['user']['username'], 'player')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        response = self.client.get('/api/auth/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['username'], 'player')
+
+    def test_wrong_password_is_rejected(self):
+        response = self.client.post('/api/auth/login/', {'username': 'player', 'password': 'nope'}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('access', response.json())
+
+    def test_refresh_rotates_and_rejects_the_old_token(self):
+        tokens = self.login()
+
+        response = self.refresh(tokens['refresh'])
+        self.assertEqual(response.status_code, 200)
+        rotated = response.json()
+        self.assertNotEqual(rotated['refresh'], tokens['refresh'])
+
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+        self.assertEqual(self.refresh(rotated['refresh']).status_code, 200)
+
+    def test_refresh_of_a_deactivated_user_is_rejected(self):
+        tokens = self.login()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+    def test_logout_blacklists_the_refresh_token(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        response = self.client.post('/api/auth/logout/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.client.credentials()
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+    def test_logout_with_only_the_refresh_token(self):
+        # The access token may have expired by the time the user logs out
+        tokens = self.login()
+        response = self.client.post('/api/auth/logout/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+
+class StatelessJWTAuthenticationTests(StoreTestCase):
+    def test_user_is_built_from_the_claims_without_queries(self):
+        admin = self.make_user('admin', is_staff=True)
+        access = issue_tokens(admin)['access']
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+        with self.assertNumQueries(0):
+            user, _ = StatelessJWTAuthentication().authenticate(request)
+        self.assertEqual((user.pk, user.username, user.is_staff, user.is_superuser), (admin.pk, 'admin', True, False))
+        self.assertFalse(user._state.adding)
+
+    def test_is_staff_comes_from_the_token_until_it_is_refreshed(self):
+        admin = self.make_user('admin', is_staff=True)
+        tokens = issue_tokens(admin)
+        User.objects.filter(pk=admin.pk).update(is_staff=False)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["access"]}')
+        self.assertEqual(client.get('/api/catalog/events/metrics/').status_code, 200)
+
+        client.credentials()
+        access = client.post('/api/auth/token/refresh/', {'refresh': tokens['refresh']}, format='json').json()['access']
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(client.get('/api/catalog/events/metrics/').status_code, 403)
+
+    def test_malformed_token_is_rejected(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(client.get('/api/auth/me/').status_code, 401)
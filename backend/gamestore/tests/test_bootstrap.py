@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from gamestore.models import Game, GameLibrary, Order, UserProfile, Wishlist
+
+from .base import StoreTestCase
+
+
+class SessionBootstrapTests(StoreTestCase):
+    url = '/api/auth/bootstrap/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = self.make_user()
+        UserProfile.objects.create(user=self.user, xp=150)
+        self.client.force_authenticate(self.user)
+        self.portal = self.make_game('Portal')
+        self.halflife = self.make_game('Half-Life', price='7.99')
+
+    def own(self, count):
+        # One at a time: bulk_create would skip the entitlement invalidation
+        start = GameLibrary.objects.count()
+        for n in range(start, start + count):
+            GameLibrary.objects.create(user=self.user, game=self.make_game(f'Game {n}'))
+
+    def bootstrap(self, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(self.url, headers=headers)
+
+    def test_payload(self):
+        GameLibrary.objects.create(user=self.user, game=self.portal)
+        Wishlist.objects.create(user=self.user, game=self.halflife)
+        Order.objects.create(user=self.user, total_amount=Decimal('9.99'), status='completed', payment_method='stripe')
+
+        data = self.bootstrap().json()
+        self.assertEqual(data['user']['username'], 'player')
+        self.assertEqual(data['profile']['xp'], 150)
+        self.assertEqual((data['owned_game_ids'], data['wishlist_game_ids']), ([self.portal.pk], [self.halflife.pk]))
+        self.assertEqual((data['order_count'], data['cart']), (1, []))
+
+    def test_query_count_does_not_grow_with_the_library(self):
+        for added, owned in ((1, 1), (19, 20)):
+            self.own(added)
+            # Profile with the order count, then the owned and wishlisted ids (invalidated by the new rows)
+            with self.assertNumQueries(3):
+                self.assertEqual(len(self.bootstrap().json()['owned_game_ids']), owned)
+
+    def test_not_modified_skips_the_payload(self):
+        etag = self.bootstrap()['ETag']
+        # Profile and order count only: entitlements come from the cache
+        with self.assertNumQueries(1):
+            response = self.bootstrap(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.bootstrap('"stale"').status_code, 200)
+
+    def test_etag_changes_with_the_library_and_wishlist(self):
+        etags = [self.bootstrap()['ETag']]
+        self.client.post('/api/wishlist/bulk_add/', {'game_ids': [self.portal.pk]}, format='json')
+        etags.append(self.bootstrap()['ETag'])
+        GameLibrary.objects.create(user=self.user, game=self.halflife)
+        etags.append(self.bootstrap()['ETag'])
+        self.assertEqual(len(set(etags)), 3)
+        self.assertEqual(self.bootstrap(etags[-1]).status_code, 304)
+
+    def test_etag_changes_with_the_cart_and_its_prices(self):
+        etag = self.bootstrap()['ETag']
+        self.client.post('/api/cart/add/', {'game_id': self.portal.pk}, format='json')
+        response = self.bootstrap(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([game['id'] for game in response.json()['cart']], [self.portal.pk])
+
+        etag = response['ETag']
+        self.assertEqual(self.bootstrap(etag).status_code, 304)
+        Game.objects.filter(pk=self.portal.pk).update(campaign_discount=50)
+        response = self.bootstrap(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(str(response.json()['cart'][0]['discounted_price'])), Decimal('5.00'))
+
+    def test_get_never_writes(self):
+        UserProfile.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bootstrap()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['profile']['xp'], 0)
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries))
+        self.assertFalse(UserProfile.objects.exists())
+
+        # The next login creates it
+        self.client.post('/api/auth/login/', {'username': 'player', 'password': 'pass1234'}, format='json')
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
@@ -0,0 +1,127 @@
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from gamestore.campaigns import apply_active_prices
+from gamestore.models import CatalogChange, Game, Review, SaleCampaign
+
+from .base import StoreTestCase
+
+
+class SaleCampaignTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = self.make_user()
+        self.portal = self.make_game('Portal', price='9.99')
+        self.halflife = self.make_game('Half-Life', price='7.99')
+        self.now = timezone.now()
+
+    def run_campaign(self, *games, discount=40):
+        campaign = SaleCampaign.objects.create(
+            name='Summer Sale',
+            discount_percentage=discount,
+            starts_at=self.now - timedelta(hours=1),
+            ends_at=self.now + timedelta(hours=1),
+        )
+        campaign.games.set(games)
+        return campaign
+
+    def test_campaign_discount_is_stored_on_the_game(self):
+        self.run_campaign(self.portal)
+        self.assertEqual(apply_active_prices(self.now), (1, True))
+
+        game = Game.objects.get(pk=self.portal.pk)
+        self.assertEqual(game.campaign_discount, 40)
+        self.assertEqual(game.sale_discount, 40)
+        self.assertEqual(game.effective_price, Decimal('5.99'))
+        self.assertEqual(game.discounted_price, game.effective_price)
+        change = CatalogChange.objects.last()
+        self.assertEqual((change.game_ids, change.fields), ([self.portal.pk], ['sale_discount']))
+
+        # Nothing changed since, so nothing is rewritten
+        self.assertEqual(apply_active_prices(self.now), (1, False))
+
+    def test_better_own_discount_wins(self):
+        Game.objects.filter(pk=self.portal.pk).update(discount_percentage=50)
+        self.run_campaign(self.portal)
+        apply_active_prices(self.now)
+        self.assertEqual(Game.objects.get(pk=self.portal.pk).effective_price, Decimal('5.00'))
+
+    def test_ended_campaign_restores_the_price(self):
+        self.run_campaign(self.portal)
+        apply_active_prices(self.now)
+
+        self.assertEqual(apply_active_prices(self.now + timedelta(hours=2)), (0, True))
+        game = Game.objects.get(pk=self.portal.pk)
+        self.assertEqual((game.campaign_discount, game.effective_price), (0, Decimal('9.99')))
+
+    def test_game_saved_during_a_campaign_keeps_the_sale(self):
+        # Loaded (e.g. into an admin form) before the campaign was applied
+        stale = Game.objects.get(pk=self.portal.pk)
+        self.run_campaign(self.portal)
+        apply_active_prices(self.now)
+
+        stale.title = 'Portal 2'
+        stale.price = Decimal('19.99')
+        stale.save()
+        game = Game.objects.get(pk=self.portal.pk)
+        self.assertEqual((game.title, game.campaign_discount), ('Portal 2', 40))
+        self.assertEqual(game.effective_price, Decimal('11.99'))
+        self.assertEqual(apply_active_prices(self.now), (1, False))
+
+    def test_catalog_sorts_and_filters_on_the_sale_price(self):
+        self.run_campaign(self.portal)
+        apply_active_prices(self.now)
+
+        response = self.client.get('/api/games/', {'ordering': 'effective_price'})
+        self.assertEqual([game['title'] for game in response.json()], ['Portal', 'Half-Life'])
+        self.assertEqual(str(response.json()[0]['discounted_price']), '5.99')
+
+        response = self.client.get('/api/games/', {'max_price': '6'})
+        self.assertEqual([game['title'] for game in response.json()], ['Portal'])
+
+        response = self.client.get('/api/games/featured/')
+        self.assertEqual([(game['title'], game['sale_discount']) for game in response.json()], [('Portal', 40)])
+
+    def test_checkout_charges_the_sale_price(self):
+        self.run_campaign(self.portal)
+        apply_active_prices(self.now)
+        self.client.force_authenticate(self.user)
+
+        intent = SimpleNamespace(client_secret='secret')
+        with mock.patch('gamestore.views.create_stripe_payment_intent', return_value=intent) as create:
+            response = self.client.post(
+                '/api/payment/create-intent/', {'game_ids': [self.portal.pk, self.halflife.pk]}, format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(str(response.json()['amount']), '13.98')
+        self.assertEqual(create.call_args.kwargs['amount'], 1398)
+
+    def test_review_list_queries_do_not_grow_with_reviews(self):
+        self.run_campaign(self.portal, self.halflife)
+        apply_active_prices(self.now)
+
+        def count_queries(reviews):
+            for index in range(reviews):
+                user = self.make_user(f'reviewer{Review.objects.count()}')
+                Review.objects.create(
+                    user=user, game=self.portal if index % 2 else self.halflife,
+                    rating=5, review_text='Great', hours_played=1,
+                )
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/reviews/')
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        few = count_queries(2)
+        self.assertEqual(count_queries(10), few)
+        sale_discounts = {review['game']['title']: review['game']['sale_discount'] for review in self.client.get('/api/reviews/').json()}
+        self.assertEqual(sale_discounts, {'Portal': 40, 'Half-Life': 40})
@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+from rest_framework.test import APIClient
+
+from .base import StoreTestCase
+
+
+class CatalogListTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        # Portal lists highest but sells at 10.00 after its discount, tied with Quake
+        self.portal = self.make_game('Portal', price='19.99', discount_percentage=50)
+        self.halflife = self.make_game('Half-Life', price='14.99')
+        self.doom = self.make_game('Doom', price='4.99')
+        self.quake = self.make_game('Quake', price='12.50', discount_percentage=20)
+
+    def titles(self, **params):
+        response = self.client.get('/api/games/', params)
+        self.assertEqual(response.status_code, 200)
+        return [game['title'] for game in response.json()]
+
+    def test_effective_price_includes_the_discount(self):
+        self.portal.refresh_from_db()
+        self.assertEqual(self.portal.effective_price, Decimal('10.00'))
+        self.assertEqual(self.portal.discounted_price, self.portal.effective_price)
+
+    def test_ordering_by_effective_price(self):
+        # Ties are broken by id
+        self.assertEqual(self.titles(ordering='effective_price'), ['Doom', 'Portal', 'Quake', 'Half-Life'])
+        self.assertEqual(self.titles(ordering='-effective_price'), ['Half-Life', 'Portal', 'Quake', 'Doom'])
+        # The list price ignores discounts
+        self.assertEqual(self.titles(ordering='price'), ['Doom', 'Quake', 'Half-Life', 'Portal'])
+
+    def test_price_filters_use_the_discounted_price(self):
+        self.assertEqual(self.titles(max_price='10', ordering='effective_price'), ['Doom', 'Portal', 'Quake'])
+        self.assertEqual(self.titles(min_price='10.00', ordering='effective_price'), ['Portal', 'Quake', 'Half-Life'])
+        self.assertEqual(self.titles(min_price='5', max_price='12', ordering='title'), ['Portal', 'Quake'])
+        self.assertEqual(self.titles(min_price='15'), [])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in (
+            {'ordering': 'popularity'}, {'min_price': 'cheap'}, {'max_price': 'NaN'}, {'max_price': 'Infinity'},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/games/', params).status_code, 400)
@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+
+from gamestore.models import CatalogChange, Game, Genre, PendingGameImage
+
+from .base import StoreTestCase
+
+
+def catalog_row(title, **fields):
+    return {
+        'title': title, 'description': 'A game', 'price': '9.99', 'release_date': '2020-01-01',
+        'developer': 'Valve', 'publisher': 'Valve', **fields,
+    }
+
+
+class ImportCatalogTests(StoreTestCase):
+    def import_rows(self, rows):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'catalog.jsonl')
+        with open(path, 'w') as f:
+            f.write('\n'.join(json.dumps(row) for row in rows))
+        call_command('import_catalog', path, stdout=StringIO(), stderr=StringIO())
+
+    def test_genre_names_with_the_same_slug_share_one_genre(self):
+        self.import_rows([
+            catalog_row('Portal', genres=['Role Playing']),
+            catalog_row('Half-Life', genres=['Role-Playing', 'Action']),
+        ])
+
+        role_playing = Genre.objects.get(slug='role-playing')
+        self.assertEqual(
+            sorted(role_playing.games.values_list('slug', flat=True)), ['half-life', 'portal']
+        )
+        self.assertEqual(Game.objects.get(slug='half-life').genres.count(), 2)
+
+    def test_existing_genre_is_matched_by_slug(self):
+        Genre.objects.create(name='Role-Playing')
+        self.import_rows([catalog_row('Portal', genres=['Role Playing'])])
+        self.assertEqual(list(Game.objects.get(slug='portal').genres.values_list('name', flat=True)), ['Role-Playing'])
+
+
+    def test_imported_games_are_logged_for_catalog_streams(self):
+        portal = self.make_game('Portal')
+        CatalogChange.objects.all().delete()
+        self.import_rows([catalog_row('Portal', price='4.99'), catalog_row('Half-Life')])
+
+        created, updated = CatalogChange.objects.order_by('id')
+        self.assertEqual((created.created, created.game_ids), (True, [Game.objects.get(slug='half-life').pk]))
+        self.assertEqual((updated.created, updated.game_ids), (False, [portal.pk]))
+        self.assertIn('price', updated.fields)
+
+class FakeResponse:
+    def __init__(self, body, headers=None):
+        self.body = body
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+
+def png_bytes(size=(8, 8)):
+    output = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(output, format='PNG')
+    return output.getvalue()
+
+
+class IngestImagesTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        storage = override_settings(
+            MEDIA_ROOT=media,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        )
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+    def queue(self, title, url):
+        game = self.make_game(title=title)
+        return PendingGameImage.objects.create(game=game, source_url=url)
+
+    def ingest(self, responses, *args):
+        with mock.patch(
+            'gamestore.management.commands.ingest_images.requests.get',
+            side_effect=lambda url, **kwargs: responses[url],
+        ):
+            call_command('ingest_images', *args, stdout=StringIO())
+
+    def test_bad_images_fail_only_their_own_job(self):
+        good = self.queue('Portal', 'https://img.example/good.png')
+        huge = self.queue('Half-Life', 'https://img.example/huge.png')
+        broken = self.queue('Doom', 'https://img.example/broken.png')
+        bomb = self.queue('Quake', 'https://img.example/bomb.png')
+
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 100):
+            self.ingest({
+                'https://img.example/good.png': FakeResponse(png_bytes()),
+                'https://img.example/huge.png': FakeResponse(b'x' * 5000),
+                'https://img.example/broken.png': FakeResponse(b'not an image'),
+                'https://img.example/bomb.png': FakeResponse(png_bytes((100, 100))),
+            }, '--max-bytes', '4000')
+
+        statuses = dict(PendingGameImage.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[good.id], 'done')
+        self.assertEqual(statuses[huge.id], 'failed')
+        self.assertEqual(statuses[broken.id], 'failed')
+        self.assertEqual(statuses[bomb.id], 'failed')
+        self.assertTrue(Game.objects.get(pk=good.game_id).image.name.startswith('games/portal'))
+
+    def test_declared_length_over_the_limit_is_refused(self):
+        job = self.queue('Portal', 'https://img.example/big.png')
+        self.ingest({'https://img.example/big.png': FakeResponse(png_bytes(), {'Content-Length': '999999'})},
+                    '--max-bytes', '4000')
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('limit', job.error)
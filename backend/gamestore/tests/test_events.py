@@ -0,0 +1,206 @@
+import json
+import os
+from datetime import timedelta
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.test import override_settings
+from django.utils import timezone
+
+from gamestore import events
+from gamestore.campaigns import apply_active_prices
+from gamestore.events import (
+    CHANGE_PRUNE_INTERVAL, CatalogChangeWatcher, ChangeWatcherLoop, get_catalog_events, stream_catalog_events
+)
+from gamestore.models import CatalogChange, Game, SaleCampaign
+
+from .base import StoreTestCase
+
+
+@override_settings(CATALOG_EVENTS_BACKLOG=3)
+class CatalogEventStreamTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        # A fresh broker, as in a newly started worker
+        events._broker_pid = None
+        self.broker = get_catalog_events()
+
+    def read(self, last_event_id=None):
+        """(event id, event type, data) of what a stream sends right away"""
+        async def collect():
+            return [chunk async for chunk in stream_catalog_events(last_event_id, max_age=0)]
+
+        messages = []
+        for chunk in async_to_sync(collect)():
+            fields = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n') if ': ' in line)
+            if 'event' in fields:
+                messages.append((fields['id'], fields['event'], json.loads(fields['data'])))
+        return messages
+
+    def test_new_stream_starts_at_the_current_event(self):
+        self.broker.publish('removed', {'id': 1})
+        self.assertEqual(self.read(), [(self.broker.event_id(1), 'ready', {})])
+
+    def test_reconnect_resumes_after_last_event_id(self):
+        (ready_id, _, _), = self.read()
+        self.broker.publish('removed', {'id': 1})
+        self.broker.publish('removed', {'id': 2})
+
+        self.assertEqual(self.read(ready_id), [
+            (self.broker.event_id(1), 'removed', {'id': 1}),
+            (self.broker.event_id(2), 'removed', {'id': 2}),
+        ])
+        self.assertEqual(self.read(self.broker.event_id(1)), [(self.broker.event_id(2), 'removed', {'id': 2})])
+        self.assertEqual(self.read(self.broker.event_id(2)), [])
+
+    def test_id_from_another_worker_gets_a_reset(self):
+        self.broker.publish('removed', {'id': 1})
+        self.assertEqual(self.read('0badc0de-1'), [(self.broker.event_id(1), 'reset', {})])
+
+    def test_events_gone_from_the_buffer_get_a_reset(self):
+        (ready_id, _, _), = self.read()
+        for game_id in range(1, 6):
+            self.broker.publish('removed', {'id': game_id})
+        self.assertEqual(self.read(ready_id), [(self.broker.event_id(5), 'reset', {})])
+
+    def another_worker(self):
+        """Switch to a fresh broker, as if the next request landed on another worker"""
+        events._broker_pid = None
+        self.broker = get_catalog_events()
+
+    def test_campaign_swaps_from_another_process_are_published(self):
+        game = self.make_game(price='9.99')
+        watcher = CatalogChangeWatcher()
+        watcher.poll()
+        (ready_id, _, _), = self.read()
+
+        # What `manage.py apply_sale_campaigns` does in its own process
+        campaign = SaleCampaign.objects.create(
+            name='Summer Sale', discount_percentage=40,
+            starts_at=timezone.now() - timedelta(hours=1), ends_at=timezone.now() + timedelta(hours=1),
+        )
+        campaign.games.add(game)
+        apply_active_prices()
+        self.assertEqual(self.read(ready_id), [])
+
+        watcher.poll()
+        (_, event_type, data), = self.read(ready_id)
+        self.assertEqual(event_type, 'game')
+        self.assertEqual((data['id'], Decimal(data['effective_price']), data['sale_discount']), (game.id, Decimal('5.99'), 40))
+        self.assertEqual(data['fields'], ['sale_discount'])
+
+        # Nothing new since
+        watcher.poll()
+        self.assertEqual(len(self.read(ready_id)), 1)
+
+    def test_game_edits_from_another_worker_are_published(self):
+        game = self.make_game(price='9.99')
+
+        # A stream and the watcher of this worker...
+        self.another_worker()
+        watcher = CatalogChangeWatcher()
+        watcher.poll()
+        (ready_id, _, _), = self.read()
+        broker = self.broker
+
+        # ...while the edit is made by another one, with its own broker
+        self.another_worker()
+        game.price = Decimal('19.99')
+        game.title = 'Portal 2'
+        game.save()
+        new_game = self.make_game('Half-Life', price='7.99')
+        Game.objects.get(pk=new_game.pk).delete()
+        self.assertEqual(self.broker.sequence, 0)
+
+        self.broker = events._broker = broker
+        events._broker_pid = os.getpid()
+        self.assertEqual(self.read(ready_id), [])
+        watcher.poll()
+        messages = [(event_type, data) for _, event_type, data in self.read(ready_id)]
+        self.assertEqual(messages, [
+            ('game', {
+                'id': game.id, 'created': False, 'effective_price': '19.99', 'sale_discount': 0,
+                'fields': ['price', 'title'],
+            }),
+            # Gone by the time the watcher looked: only its removal is sent
+            ('removed', {'id': new_game.id}),
+        ])
+
+    def test_change_committed_after_a_later_one_is_not_skipped(self):
+        game = self.make_game()
+        watcher = CatalogChangeWatcher()
+        watcher.poll()
+        (ready_id, _, _), = self.read()
+
+        # The second change commits first; the first one's id is a gap for now
+        first_id = watcher.after + 1
+        CatalogChange.objects.create(id=first_id + 1, game_ids=[game.id], fields=['title'])
+        watcher.poll()
+        self.assertEqual(watcher.after, first_id + 1)
+        self.assertEqual(len(self.read(ready_id)), 1)
+
+        CatalogChange.objects.create(id=first_id, game_ids=[game.id], fields=['price'])
+        watcher.poll()
+        self.assertEqual([data['fields'] for _, _, data in self.read(ready_id)], [['title'], ['price']])
+        self.assertEqual(watcher.gaps, {})
+
+
+@override_settings(CATALOG_EVENTS_IDLE_AFTER=60, CATALOG_EVENTS_POLL=2)
+class ChangeWatcherLoopTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        events._broker_pid = None
+        self.broker = get_catalog_events()
+        self.loop = ChangeWatcherLoop(self.broker)
+        self.game = self.make_game()
+
+    def change(self, field):
+        CatalogChange.objects.create(game_ids=[self.game.id], fields=[field])
+
+    def published(self):
+        return [data['fields'] for _, _, data in self.broker.since(0) or []]
+
+    def test_polls_while_streams_are_open(self):
+        self.broker.subscribers = 1
+        self.assertEqual(self.loop.step(0), 2)
+        self.change('price')
+        self.assertEqual(self.loop.step(2), 2)
+        self.assertEqual(self.published(), [['price']])
+
+    def test_stops_polling_once_idle(self):
+        self.broker.subscribers = 1
+        self.loop.step(0)
+        old_id = self.broker.event_id(self.broker.sequence)
+
+        # Streams reconnecting within the grace period keep the watcher going
+        self.broker.subscribers = 0
+        self.assertEqual(self.loop.step(10), 2)
+        self.assertEqual(self.loop.step(69), 2)
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.loop.step(70))
+            self.assertIsNone(self.loop.step(1000))
+        # Changes made meanwhile are never published, so old ids get a reset
+        self.change('price')
+        self.assertIsNone(self.broker.parse_event_id(old_id))
+
+        # The next stream starts it again
+        self.broker.subscribers = 1
+        self.assertEqual(self.loop.step(1002), 2)
+        self.change('title')
+        self.loop.step(1004)
+        self.assertEqual(self.published(), [['title']])
+
+    def test_prunes_old_changes_idle_or_not(self):
+        CatalogChange.objects.create(game_ids=[self.game.id])
+        CatalogChange.objects.update(recorded_at=timezone.now() - timedelta(days=2))
+        self.change('price')
+
+        self.loop.step(0)
+        self.assertEqual(CatalogChange.objects.count(), 1)
+
+        CatalogChange.objects.update(recorded_at=timezone.now() - timedelta(days=2))
+        self.loop.step(100)
+        self.loop.step(200)
+        self.assertEqual(CatalogChange.objects.count(), 1)
+        self.assertIsNone(self.loop.step(CHANGE_PRUNE_INTERVAL))
+        self.assertFalse(CatalogChange.objects.exists())
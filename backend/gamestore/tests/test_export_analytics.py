@@ -0,0 +1,110 @@
+import glob
+import importlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import numpy as np
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from gamestore.management.commands.export_analytics import _available_format
+from gamestore.models import Order
+
+from .base import StoreTestCase
+
+
+class ExportAnalyticsTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+        self.user = self.make_user()
+
+    def add_orders(self, count, days_ago):
+        created = timezone.now() - timedelta(days=days_ago)
+        for _ in range(count):
+            order = Order.objects.create(user=self.user, total_amount='9.99', payment_method='stripe')
+            Order.objects.filter(pk=order.pk).update(created_at=created)
+
+    def export(self, *args):
+        call_command('export_analytics', '--output-dir', self.output_dir, '--format', 'npz', *args, stdout=StringIO())
+
+    def exported_order_ids(self):
+        ids = []
+        for path in glob.glob(os.path.join(self.output_dir, 'orders', 'date=*', '*.npz')):
+            ids.extend(np.load(path)['id'].tolist())
+        return sorted(ids)
+
+    def test_incremental_runs_export_new_rows_once(self):
+        self.add_orders(3, days_ago=2)
+        self.export()
+        self.add_orders(2, days_ago=1)
+        self.export()
+        self.assertEqual(self.exported_order_ids(), sorted(Order.objects.values_list('id', flat=True)))
+
+    def test_full_export_replaces_the_partitions(self):
+        self.add_orders(3, days_ago=2)
+        self.export()
+        self.export('--full')
+        self.export()
+        self.assertEqual(self.exported_order_ids(), sorted(Order.objects.values_list('id', flat=True)))
+
+    def test_run_dying_while_publishing_is_rolled_back(self):
+        self.add_orders(2, days_ago=3)
+        self.add_orders(2, days_ago=2)
+
+        moved = []
+        real_replace = os.replace
+
+        def replace_then_die(source, destination):
+            if source.endswith('.npz'):
+                if moved:
+                    raise OSError('disk gone')
+                moved.append(destination)
+            return real_replace(source, destination)
+
+        with mock.patch('os.replace', side_effect=replace_then_die):
+            with self.assertRaises(OSError):
+                self.export()
+        self.assertEqual(len(self.exported_order_ids()), 2)
+
+        self.export()
+        self.assertEqual(self.exported_order_ids(), sorted(Order.objects.values_list('id', flat=True)))
+        self.assertEqual(glob.glob(os.path.join(self.output_dir, '.staging-*')), [])
+
+    def test_full_run_dying_mid_swap_keeps_the_previous_export(self):
+        self.add_orders(2, days_ago=2)
+        self.export()
+
+        real_rename = os.rename
+
+        def rename_then_die(source, destination):
+            real_rename(source, destination)
+            if destination.endswith('.old'):
+                raise OSError('killed')
+
+        with mock.patch('os.rename', side_effect=rename_then_die):
+            with self.assertRaises(OSError):
+                self.export('--full')
+        self.add_orders(1, days_ago=1)
+
+        self.export()
+        self.assertEqual(self.exported_order_ids(), sorted(Order.objects.values_list('id', flat=True)))
+
+    def test_format_falls_back_to_npz_without_pyarrow(self):
+        real_import = importlib.import_module
+
+        def without_pyarrow(name):
+            if name == 'pyarrow':
+                raise ImportError(name=name)
+            return real_import(name)
+
+        with mock.patch('importlib.import_module', side_effect=without_pyarrow):
+            self.assertEqual(_available_format(), 'npz')
+            with self.assertRaisesMessage(CommandError, 'parquet export needs pyarrow installed'):
+                _available_format('parquet')
@@ -0,0 +1,236 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient, SimpleTestCase, override_settings
+from rest_framework.test import APIClient
+
+from gamestore import gateways
+from gamestore.authentication import issue_tokens
+from gamestore.gateways import CircuitBreaker
+from gamestore.management.commands.mock_gateways import make_server
+
+from .base import StoreTestCase
+
+
+@override_settings(TWOCHECKOUT_API_URL='https://2co.test/rest/6.0/', GATEWAY_BREAKER_THRESHOLD=5)
+class TwoCheckoutOrderDetailsTests(StoreTestCase):
+    url = '/api/payment/2checkout/details/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user())
+        self.requests = []
+        breaker = CircuitBreaker('2checkout', failure_threshold=5, reset_timeout=30)
+        patcher = mock.patch.object(gateways.twocheckout_gateway, 'breaker', breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def mock_2checkout(self, handler):
+        """Serve 2Checkout calls from `handler(request)` through httpx.MockTransport"""
+        def record(request):
+            self.requests.append(request)
+            return handler(request)
+
+        patcher = mock.patch.object(
+            gateways, 'get_async_client',
+            lambda: httpx.AsyncClient(transport=httpx.MockTransport(record)),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_order_details(self):
+        self.mock_2checkout(lambda request: httpx.Response(200, json={
+            'RefNo': 'R1', 'Status': 'COMPLETE', 'GrossPrice': '9.99', 'Currency': 'USD', 'OrderDate': '2024-01-01',
+        }))
+
+        response = self.client.get(self.url, {'refno': 'R1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'COMPLETE')
+        self.assertEqual(str(self.requests[0].url), 'https://2co.test/rest/6.0/orders/R1/')
+
+        # Completed orders are cached
+        self.assertEqual(self.client.get(self.url, {'refno': 'R1'}).status_code, 200)
+        self.assertEqual(len(self.requests), 1)
+
+    def test_unknown_order(self):
+        self.mock_2checkout(lambda request: httpx.Response(404, json={'message': 'Not found'}))
+
+        response = self.client.get(self.url, {'refno': 'missing'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(gateways.twocheckout_gateway.breaker.failures, 0)
+
+    def test_server_error_is_a_gateway_failure(self):
+        self.mock_2checkout(lambda request: httpx.Response(502))
+
+        response = self.client.get(self.url, {'refno': 'R1'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(gateways.twocheckout_gateway.breaker.failures, 1)
+
+    def test_timeout_is_a_gateway_failure(self):
+        def timeout(request):
+            raise httpx.ReadTimeout('timed out', request=request)
+
+        self.mock_2checkout(timeout)
+
+        response = self.client.get(self.url, {'refno': 'R1'})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('unavailable', response.json()['error'])
+        self.assertEqual(gateways.twocheckout_gateway.breaker.failures, 1)
+
+    def test_cancelled_trial_does_not_leave_the_breaker_half_open(self):
+        def cancelled(request):
+            raise asyncio.CancelledError()
+
+        self.mock_2checkout(cancelled)
+        breaker = gateways.twocheckout_gateway.breaker
+        breaker.state, breaker.opened_at = 'open', 0
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(gateways.fetch_twocheckout_order('R1'))
+        self.assertEqual(breaker.state, 'open')
+        self.assertTrue(breaker.allow())
+
+
+@override_settings(GATEWAY_BREAKER_THRESHOLD=2, GATEWAY_BREAKER_RESET=30)
+class SlowGatewayTests(StoreTestCase):
+    """2Checkout calls against `manage.py mock_gateways` answering slowly"""
+
+    url = '/api/payment/2checkout/details/'
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+        breaker = CircuitBreaker('2checkout', failure_threshold=2, reset_timeout=30)
+        patcher = mock.patch.object(gateways.twocheckout_gateway, 'breaker', breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        gateways.twocheckout_gateway.reset_metrics()
+
+    def start_mock_gateways(self, latency, timeout=5, fail_rate=0.0):
+        server = make_server(0, latency=latency, fail_rate=fail_rate)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        upstream = override_settings(
+            TWOCHECKOUT_API_URL=f'http://127.0.0.1:{server.server_port}/', GATEWAY_TIMEOUT=timeout
+        )
+        upstream.enable()
+        self.addCleanup(upstream.disable)
+
+    def test_slow_upstream_leaves_the_worker_free(self):
+        self.start_mock_gateways(latency=1)
+        cache.set('gateway:2checkout:order:CACHED', {'RefNo': 'CACHED', 'Status': 'COMPLETE'})
+        headers = {'Authorization': f'Bearer {issue_tokens(self.user)["access"]}'}
+        finished = []
+
+        async def get(refno):
+            started = time.monotonic()
+            response = await AsyncClient().get(self.url, {'refno': refno}, headers=headers)
+            finished.append((refno, response.status_code, time.monotonic() - started))
+
+        async def both():
+            # The slow one starts first; the cached one must not wait for it
+            await asyncio.gather(get('SLOW'), get('CACHED'))
+
+        async_to_sync(both)()
+        self.assertEqual([(refno, code) for refno, code, _ in finished], [('CACHED', 200), ('SLOW', 200)])
+        self.assertLess(finished[0][2], 0.5)
+        self.assertGreaterEqual(finished[1][2], 1)
+
+    def test_stalled_upstream_times_out_then_trips_the_breaker(self):
+        self.start_mock_gateways(latency=5, timeout=0.2)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        for _ in range(2):
+            started = time.monotonic()
+            response = client.get(self.url, {'refno': 'R1'})
+            self.assertEqual(response.status_code, 503)
+            self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(gateways.twocheckout_gateway.breaker.state, 'open')
+
+        # Now rejected without waiting for the upstream
+        started = time.monotonic()
+        response = client.get(self.url, {'refno': 'R1'})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('temporarily unavailable', response.json()['error'])
+        self.assertLess(time.monotonic() - started, 0.2)
+        metrics = gateways.twocheckout_gateway.metrics()
+        self.assertEqual((metrics['failures'], metrics['rejected']), (2, 1))
+
+    def test_failing_upstream_is_a_gateway_failure(self):
+        self.start_mock_gateways(latency=0, fail_rate=1)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(self.url, {'refno': 'R1'}).status_code, 503)
+        self.assertEqual(gateways.twocheckout_gateway.breaker.failures, 1)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('gamestore.gateways.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=30)
+
+    def open_breaker(self):
+        for _ in range(3):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'closed')
+
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.assertFalse(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+
+    def test_abandoned_trial_frees_the_slot(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.abandon()
+        self.assertTrue(self.breaker.allow())
+
+    def test_hung_trial_is_replaced_after_the_reset_timeout(self):
+        self.open_breaker()
+        self.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.now += 29
+        self.assertFalse(self.breaker.allow())
+        self.now += 1
+        self.assertTrue(self.breaker.allow())
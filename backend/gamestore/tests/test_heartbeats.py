@@ -0,0 +1,82 @@
+from decimal import Decimal
+from unittest import mock
+
+from rest_framework.test import APIClient
+
+from gamestore.heartbeats import apply_batch, flush_heartbeats, get_heartbeat_buffer
+from gamestore.models import HeartbeatFlush
+
+from .base import StoreTestCase
+
+
+@mock.patch('gamestore.heartbeats.ensure_flusher', mock.Mock())
+class HeartbeatTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+        self.game = self.make_game()
+        self.entry = self.user.library.create(game=self.game)
+        self.buffer = get_heartbeat_buffer()
+
+    def hours_played(self):
+        self.entry.refresh_from_db()
+        return self.entry.hours_played
+
+    def test_heartbeat_is_buffered_then_flushed(self):
+        response = self.client.post('/api/playtime/heartbeat/', {'game_id': self.game.id, 'seconds': 60}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.hours_played(), Decimal('0'))
+
+        self.assertEqual(flush_heartbeats(force=True), 1)
+        # One whole 36-second step; the other 24 seconds wait for the next flush
+        self.assertEqual(self.hours_played(), Decimal('0.01'))
+        self.assertEqual(self.buffer.metrics(0)['leftover_rows'], 1)
+        self.assertIsNotNone(self.entry.last_played)
+
+    def test_heartbeats_of_a_game_are_coalesced(self):
+        self.buffer.record(self.user.id, self.game.id, 60, now=1000, max_seconds=300)
+        self.buffer.record(self.user.id, self.game.id, 60, now=1060, max_seconds=300)
+        self.assertEqual(self.buffer.metrics(1060)['backlog_rows'], 1)
+
+        flush_heartbeats(force=True)
+        self.assertEqual(self.hours_played(), Decimal('0.03'))
+
+    def test_seconds_are_capped_by_time_since_previous_heartbeat(self):
+        self.assertEqual(self.buffer.record(self.user.id, self.game.id, 10000, now=1000, max_seconds=300), 300)
+        self.assertEqual(self.buffer.record(self.user.id, self.game.id, 300, now=1010, max_seconds=300), 10)
+        self.assertEqual(self.buffer.record(self.user.id, self.game.id, 300, now=1010, max_seconds=300), 0)
+        self.assertEqual(self.buffer.record(self.user.id, self.game.id, 60, now=2000, max_seconds=300), 60)
+
+    def test_heartbeats_are_throttled(self):
+        statuses = [
+            self.client.post('/api/playtime/heartbeat/', {'game_id': self.game.id, 'seconds': 60}, format='json').status_code
+            for _ in range(11)
+        ]
+        self.assertEqual(statuses, [202] * 10 + [429])
+
+    def test_unowned_game_is_refused(self):
+        other = self.make_game('Half-Life')
+        response = self.client.post('/api/playtime/heartbeat/', {'game_id': other.id, 'seconds': 60}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_batch_applied_before_a_crash_is_not_applied_twice(self):
+        self.buffer.record(self.user.id, self.game.id, 72, now=1000, max_seconds=300)
+        flush_id, rows = self.buffer.take_batch(cutoff=1000, limit=100)
+        # The worker dies after committing the UPDATE, before finish_batch
+        apply_batch(flush_id, rows)
+        self.assertEqual(self.hours_played(), Decimal('0.02'))
+
+        self.assertEqual(flush_heartbeats(force=True), 1)
+        self.assertEqual(self.hours_played(), Decimal('0.02'))
+        self.assertFalse(self.buffer.has_inflight())
+        self.assertTrue(HeartbeatFlush.objects.filter(id=flush_id).exists())
+
+    def test_batch_taken_before_a_crash_is_applied_on_the_next_flush(self):
+        self.buffer.record(self.user.id, self.game.id, 72, now=1000, max_seconds=300)
+        self.buffer.take_batch(cutoff=1000, limit=100)
+
+        self.assertEqual(flush_heartbeats(force=True), 1)
+        self.assertEqual(self.hours_played(), Decimal('0.02'))
+        self.assertFalse(self.buffer.has_inflight())
@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from gamestore.leaderboards import GLOBAL_BOARD, game_board, global_bucket, standing
+from gamestore.models import (
+    Achievement, GameLibrary, LeaderboardBucket, LeaderboardEntry, UserAchievement, UserProfile
+)
+
+from .base import StoreTestCase
+
+
+class LeaderboardTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def make_player(self, username, xp):
+        user = self.make_user(username)
+        UserProfile.objects.create(user=user, xp=xp)
+        return user
+
+    def build(self):
+        call_command('build_leaderboards', stdout=StringIO())
+
+    def ranks(self, board):
+        return list(
+            LeaderboardEntry.objects.filter(board=board).order_by('rank', 'user__username')
+            .values_list('user__username', 'score', 'rank')
+        )
+
+    def buckets(self, board):
+        return {
+            bucket: (users, users_above)
+            for bucket, users, users_above in LeaderboardBucket.objects.filter(board=board).values_list(
+                'bucket', 'users', 'users_above'
+            )
+        }
+
+    def test_global_board_shares_ranks_on_ties(self):
+        self.make_player('ann', 500)
+        self.make_player('bob', 300)
+        self.make_player('cat', 300)
+        self.make_player('dan', 150)
+        self.make_player('eve', 0)
+
+        self.build()
+        self.assertEqual(self.ranks(GLOBAL_BOARD), [
+            ('ann', 500, 1), ('bob', 300, 2), ('cat', 300, 2), ('dan', 150, 4),
+        ])
+
+        # Levels 3 (283+ xp), 2 (100+) and 1; eve, without xp, is in level 1
+        buckets = self.buckets(GLOBAL_BOARD)
+        self.assertEqual((global_bucket(500), global_bucket(300), global_bucket(150)), (3, 3, 2))
+        self.assertEqual(buckets[4], (0, 0))
+        self.assertEqual(buckets[3], (3, 0))
+        self.assertEqual(buckets[2], (1, 3))
+        self.assertEqual(buckets[1], (1, 4))
+
+    def test_my_rank_uses_the_snapshot_and_the_current_score(self):
+        self.make_player('ann', 500)
+        dan = self.make_player('dan', 150)
+        self.make_player('eve', 0)
+        self.client.force_authenticate(dan)
+        self.assertEqual(self.client.get('/api/leaderboards/global/me/').status_code, 404)
+
+        self.build()
+        response = self.client.get('/api/leaderboards/global/me/')
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual((result['rank'], result['estimated_rank']), (2, {'from': 2, 'to': 2}))
+        self.assertEqual((result['top_percent'], result['total_users']), (66.67, 3))
+
+        # Caught up with ann since the snapshot: estimated within her bucket
+        UserProfile.objects.filter(user=dan).update(xp=400)
+        result = self.client.get('/api/leaderboards/global/me/').json()
+        self.assertEqual((result['rank'], result['score']), (2, 400))
+        self.assertEqual(result['estimated_rank'], {'from': 1, 'to': 1})
+
+    def test_game_board_and_a_score_above_the_highest_bucket(self):
+        game = self.make_game()
+        first, second = (Achievement.objects.create(game=game, name=name, description='') for name in ('A', 'B'))
+        players = [self.make_user(name) for name in ('ann', 'bob', 'cat', 'dan')]
+        for player in players:
+            GameLibrary.objects.create(user=player, game=game)
+        for player, achievements in zip(players, ([first, second], [first], [second], [])):
+            for achievement in achievements:
+                UserAchievement.objects.create(user=player, achievement=achievement)
+
+        self.build()
+        board = game_board(game.pk)
+        self.assertEqual(self.ranks(board), [('ann', 2, 1), ('bob', 1, 2), ('cat', 1, 2)])
+        self.assertEqual(self.buckets(board), {2: (1, 0), 1: (2, 1), 0: (1, 3)})
+
+        # A new achievement makes a score of 3 possible, above every bucket
+        result = standing(board, players[0].pk, 3, 3)
+        self.assertEqual((result['rank'], result['estimated_rank']), (1, {'from': 1, 'to': 1}))
+        self.assertEqual(result['top_percent'], 25.0)
+
+        # dan has no unlocks: not ranked, placed in bucket 0
+        result = standing(board, players[3].pk, 0, 0)
+        self.assertIsNone(result['rank'])
+        self.assertEqual(result['estimated_rank'], {'from': 4, 'to': 4})
+
+    def test_board_of_a_game_without_unlocks_any_more_is_emptied(self):
+        game = self.make_game()
+        achievement = Achievement.objects.create(game=game, name='A', description='')
+        user = self.make_user()
+        UserAchievement.objects.create(user=user, achievement=achievement)
+        self.build()
+        self.assertEqual(len(self.ranks(game_board(game.pk))), 1)
+
+        UserAchievement.objects.all().delete()
+        self.build()
+        self.assertEqual(self.ranks(game_board(game.pk)), [])
+        self.assertIsNone(standing(game_board(game.pk), user.pk, 0, 0))
+
+    def test_top_of_the_board(self):
+        self.make_player('ann', 500)
+        self.make_player('bob', 300)
+        self.build()
+        response = self.client.get('/api/leaderboards/global/', {'limit': 1})
+        self.assertEqual(response.json()['total_users'], 2)
+        self.assertEqual(len(response.json()['results']), 1)
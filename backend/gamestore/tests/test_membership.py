@@ -0,0 +1,81 @@
+import base64
+
+from rest_framework.test import APIClient
+
+from gamestore.entitlements import encode_ids, get_entitlements
+from gamestore.models import GameLibrary, Wishlist
+
+from .base import StoreTestCase
+
+
+class EncodingTests(StoreTestCase):
+    def test_encodings(self):
+        ids = [3, 4, 10]
+        self.assertEqual(encode_ids(ids, 'list'), {'encoding': 'list', 'ids': [3, 4, 10]})
+        self.assertEqual(encode_ids(ids, 'delta'), {'encoding': 'delta', 'deltas': [3, 1, 6]})
+
+        bitmap = encode_ids(ids, 'bitmap')
+        self.assertEqual((bitmap['offset'], bitmap['count']), (3, 3))
+        # Bits 0, 1 and 7 from offset 3
+        self.assertEqual(base64.b64decode(bitmap['bitmap']), bytes([0b10000011]))
+
+    def test_empty_sets(self):
+        self.assertEqual(encode_ids([], 'delta'), {'encoding': 'delta', 'deltas': []})
+        self.assertEqual(encode_ids([], 'bitmap'), {'encoding': 'bitmap', 'offset': 0, 'count': 0, 'bitmap': ''})
+
+
+class MembershipTests(StoreTestCase):
+    url = '/api/membership/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+        self.portal = self.make_game('Portal')
+        self.halflife = self.make_game('Half-Life')
+
+    def membership(self, encoding='list'):
+        response = self.client.get(self.url, {'encoding': encoding})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_encodings(self):
+        GameLibrary.objects.create(user=self.user, game=self.portal)
+        GameLibrary.objects.create(user=self.user, game=self.halflife)
+        gap = self.halflife.pk - self.portal.pk
+
+        self.assertEqual(self.membership('list')['owned']['ids'], [self.portal.pk, self.halflife.pk])
+        self.assertEqual(self.membership('delta')['owned']['deltas'], [self.portal.pk, gap])
+        self.assertEqual(self.membership()['wishlist'], {'encoding': 'list', 'ids': []})
+        bitmap = self.membership('bitmap')['owned']
+        self.assertEqual((bitmap['offset'], bitmap['count']), (self.portal.pk, 2))
+        self.assertEqual(self.client.get(self.url).json()['owned']['encoding'], 'delta')
+
+    def test_unknown_encoding_is_rejected(self):
+        self.assertEqual(self.client.get(self.url, {'encoding': 'zip'}).status_code, 400)
+
+    def test_library_writes_invalidate_the_cached_sets(self):
+        self.assertEqual(self.membership()['owned']['ids'], [])
+        entry = GameLibrary.objects.create(user=self.user, game=self.portal)
+        self.assertEqual(self.membership()['owned']['ids'], [self.portal.pk])
+        entry.delete()
+        self.assertEqual(self.membership()['owned']['ids'], [])
+
+    def test_wishlist_writes_invalidate_the_cached_sets(self):
+        self.assertEqual(self.membership()['wishlist']['ids'], [])
+        self.client.post('/api/wishlist/bulk_add/', {'game_ids': [self.portal.pk, self.halflife.pk]}, format='json')
+        self.assertEqual(self.membership()['wishlist']['ids'], [self.portal.pk, self.halflife.pk])
+
+        self.client.delete('/api/wishlist/remove_game/', {'game_id': self.portal.pk}, format='json')
+        self.assertEqual(self.membership()['wishlist']['ids'], [self.halflife.pk])
+        self.client.post('/api/wishlist/bulk_remove/', {'game_ids': [self.halflife.pk]}, format='json')
+        self.assertEqual(self.membership()['wishlist']['ids'], [])
+
+    def test_other_users_sets_are_kept(self):
+        other = self.make_user('other')
+        Wishlist.objects.create(user=other, game=self.portal)
+        self.assertEqual(get_entitlements(other.id)['wishlist'], [self.portal.pk])
+        GameLibrary.objects.create(user=self.user, game=self.portal)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_entitlements(other.id)['wishlist'], [self.portal.pk])
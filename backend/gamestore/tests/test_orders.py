@@ -0,0 +1,121 @@
+import csv
+import json
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+
+from rest_framework.test import APIClient
+
+from gamestore.models import Order, OrderItem
+
+from .base import StoreTestCase
+
+
+class OrderHistoryTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+        self.game = self.make_game('Portal', price='9.99')
+
+    def make_order(self, user=None, created_at=None, items=1):
+        order = Order.objects.create(
+            user=user or self.user, total_amount=Decimal('9.99') * items, status='completed', payment_method='stripe'
+        )
+        for _ in range(items):
+            OrderItem.objects.create(order=order, game=self.game, price=Decimal('9.99'))
+        if created_at:
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        return order
+
+    def test_cursor_pages_cover_every_order_once(self):
+        # Two orders share a timestamp, so the page boundary falls inside a tie
+        same_time = datetime(2024, 3, 1, tzinfo=dt_timezone.utc)
+        orders = [
+            self.make_order(created_at=datetime(2024, 1, 1, tzinfo=dt_timezone.utc)),
+            self.make_order(created_at=same_time),
+            self.make_order(created_at=same_time),
+            self.make_order(created_at=datetime(2024, 5, 1, tzinfo=dt_timezone.utc)),
+        ]
+        self.make_order(user=self.make_user('other'))
+
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get('/api/payment/orders/history/', params)
+            self.assertEqual(response.status_code, 200)
+            seen += [order['id'] for order in response.json()['results']]
+            cursor = response.json()['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(seen, [orders[3].pk, orders[2].pk, orders[1].pk, orders[0].pk])
+
+    def test_items_are_slim(self):
+        self.make_order()
+        (order,) = self.client.get('/api/payment/orders/history/').json()['results']
+        self.assertEqual(len(order['items']), 1)
+        self.assertNotIn('user', order)
+
+    def test_bad_cursor_is_rejected(self):
+        response = self.client.get('/api/payment/orders/history/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class OrderExportTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.make_user('admin', is_staff=True))
+        self.user = self.make_user()
+        self.portal = self.make_game('Portal', price='9.99')
+        self.halflife = self.make_game('Half-Life', price='7.99')
+        self.order = Order.objects.create(
+            user=self.user, total_amount=Decimal('17.98'), status='completed', payment_method='stripe'
+        )
+        OrderItem.objects.create(order=self.order, game=self.portal, price=Decimal('9.99'))
+        OrderItem.objects.create(order=self.order, game=self.halflife, price=Decimal('7.99'))
+        # A failed checkout can leave an order without items
+        self.empty = Order.objects.create(
+            user=self.user, total_amount=Decimal('0'), status='failed', payment_method='stripe'
+        )
+
+    def export(self, **params):
+        response = self.client.get('/api/payment/orders/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_a_row_per_item_and_keeps_orders_without_items(self):
+        rows = list(csv.DictReader(StringIO(self.export())))
+        self.assertEqual(
+            [(row['order_id'], row['game_title'], row['price']) for row in rows],
+            [
+                (str(self.order.pk), 'Portal', '9.99'),
+                (str(self.order.pk), 'Half-Life', '7.99'),
+                (str(self.empty.pk), '', ''),
+            ]
+        )
+        self.assertEqual(rows[0]['username'], 'player')
+
+    def test_ndjson_and_status_filter(self):
+        lines = self.export(output='ndjson', status='completed').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['game_id'] for row in rows], [self.portal.pk, self.halflife.pk])
+        self.assertEqual(rows[0]['order_total'], '17.98')
+
+    def test_date_range(self):
+        self.assertEqual(self.export(output='ndjson', end='2000-01-01'), '')
+
+    def test_bad_dates_and_format_are_rejected(self):
+        for params in (
+            {'start': '2024-02-30'}, {'end': '2024-13-01'}, {'start': 'garbage'}, {'end': '01/02/2024'},
+            {'output': 'xml'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get('/api/payment/orders/export/', params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_admins_only(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/payment/orders/export/').status_code, 403)
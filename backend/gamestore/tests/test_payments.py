@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from rest_framework.test import APIClient
+
+from gamestore.entitlements import get_owned_game_ids
+from gamestore.models import GameLibrary, Order
+
+from .base import StoreTestCase
+
+
+class GameIdValidationTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+
+    def test_non_numeric_game_ids_are_rejected(self):
+        for url in ('/api/payment/create-intent/', '/api/payment/2checkout/create/'):
+            with self.subTest(url=url):
+                response = self.client.post(url, {'game_ids': ['1', 'abc']}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'game_ids must be a list of game ids'})
+
+    def test_game_ids_must_be_a_list(self):
+        response = self.client.post('/api/payment/create-intent/', {'game_ids': '1,2'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_owned_games_are_refused(self):
+        game = self.make_game()
+        self.user.library.create(game=game)
+        response = self.client.post('/api/payment/create-intent/', {'game_ids': [str(game.id)]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['owned_game_ids'], [game.id])
+
+    def test_ownership_is_checked_against_the_database(self):
+        game = self.make_game()
+        self.assertEqual(get_owned_game_ids(self.user.id), set())
+        # bulk_create sends no signals, so the cached set is now stale
+        GameLibrary.objects.bulk_create([GameLibrary(user=self.user, game=game)])
+        for url in ('/api/payment/create-intent/', '/api/payment/2checkout/create/'):
+            with self.subTest(url=url):
+                response = self.client.post(url, {'game_ids': [game.id]}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['owned_game_ids'], [game.id])
+
+
+class ConfirmPaymentTests(StoreTestCase):
+    url = '/api/payment/confirm/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+        self.portal = self.make_game('Portal')
+        self.halflife = self.make_game('Half-Life')
+
+    def confirm(self, game_ids):
+        intent = SimpleNamespace(status='succeeded')
+        with mock.patch('gamestore.views.retrieve_stripe_payment_intent', return_value=intent) as retrieve:
+            response = self.client.post(self.url, {'payment_intent_id': 'pi_1', 'game_ids': game_ids}, format='json')
+        return response, retrieve
+
+    def test_malformed_game_ids_are_rejected_before_stripe_is_asked(self):
+        for game_ids in (['1', 'abc'], '1,2', [True], []):
+            with self.subTest(game_ids=game_ids):
+                response, retrieve = self.confirm(game_ids)
+                self.assertEqual(response.status_code, 400)
+                retrieve.assert_not_called()
+        self.assertFalse(Order.objects.exists())
+
+    def test_owned_games_are_skipped(self):
+        GameLibrary.objects.create(user=self.user, game=self.portal)
+        response, _ = self.confirm([self.portal.pk, str(self.halflife.pk)])
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get()
+        self.assertEqual(list(order.items.values_list('game_id', flat=True)), [self.halflife.pk])
+        self.assertEqual(order.total_amount, self.halflife.price)
+
+    def test_repeated_confirmation_is_refused(self):
+        self.assertEqual(self.confirm([self.portal.pk])[0].status_code, 200)
+        response, retrieve = self.confirm([self.portal.pk])
+        self.assertEqual(response.status_code, 400)
+        retrieve.assert_not_called()
+        self.assertEqual(Order.objects.count(), 1)
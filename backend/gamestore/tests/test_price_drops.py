@@ -0,0 +1,52 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from gamestore.campaigns import apply_active_prices
+from gamestore.models import Game, Notification, SaleCampaign, Wishlist
+
+from .base import StoreTestCase
+
+
+class DetectPriceDropsTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user()
+
+    def detect(self):
+        call_command('detect_price_drops', stdout=StringIO())
+        return list(Notification.objects.filter(notification_type='price_drop').values_list('message', flat=True))
+
+    def test_rounded_price_is_not_a_drop(self):
+        game = self.make_game(price='9.99', discount_percentage=50)
+        Wishlist.objects.create(user=self.user, game=game, price_when_added=game.discounted_price)
+        self.assertEqual(game.discounted_price, Decimal('5.00'))
+
+        self.assertEqual(self.detect(), [])
+        self.assertEqual(self.detect(), [])
+
+    def test_drop_is_notified_once_and_moves_the_baseline(self):
+        game = self.make_game(price='9.99')
+        entry = Wishlist.objects.create(user=self.user, game=game, price_when_added=Decimal('9.99'))
+        Game.objects.filter(pk=game.pk).update(discount_percentage=50)
+
+        self.assertEqual(self.detect(), ['Portal dropped from $9.99 to $5.00'])
+        entry.refresh_from_db()
+        self.assertEqual(entry.last_notified_price, Decimal('5.00'))
+        self.assertEqual(len(self.detect()), 1)
+
+    def test_sale_campaign_is_a_drop(self):
+        game = self.make_game(price='9.99')
+        Wishlist.objects.create(user=self.user, game=game, price_when_added=Decimal('9.99'))
+        campaign = SaleCampaign.objects.create(
+            name='Summer Sale', discount_percentage=40,
+            starts_at=timezone.now() - timedelta(hours=1), ends_at=timezone.now() + timedelta(hours=1),
+        )
+        campaign.games.add(game)
+        apply_active_prices()
+
+        self.assertEqual(self.detect(), ['Portal dropped from $9.99 to $5.99'])
+        self.assertEqual(Wishlist.objects.get().last_notified_price, Decimal('5.99'))
@@ -0,0 +1,100 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from rest_framework.test import APIClient
+
+from gamestore.models import GameLibrary, GameNeighbour, Order, OrderItem
+from gamestore.recommendations import checkout_recommendations
+
+from .base import StoreTestCase
+
+
+class AlsoBoughtTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.portal = self.make_game('Portal')
+        self.portal2 = self.make_game('Portal 2')
+        self.halflife = self.make_game('Half-Life')
+        self.doom = self.make_game('Doom')
+        self.unsold = self.make_game('Unsold')
+
+    def own(self, username, *games):
+        user = self.make_user(username)
+        for game in games:
+            GameLibrary.objects.create(user=user, game=game)
+        return user
+
+    def order(self, user, *games, status='completed'):
+        order = Order.objects.create(user=user, total_amount=Decimal('0'), status=status, payment_method='stripe')
+        for game in games:
+            OrderItem.objects.create(order=order, game=game, price=Decimal('9.99'))
+
+    def build(self, *args):
+        call_command('build_also_bought', *args, stdout=StringIO())
+
+    def neighbours(self, game):
+        return list(
+            GameNeighbour.objects.filter(game=game, kind='also_bought').order_by('rank').values_list('neighbour_id', flat=True)
+        )
+
+    def test_neighbours_are_ranked_by_normalised_co_occurrence(self):
+        self.own('a', self.portal, self.portal2, self.halflife)
+        self.own('b', self.portal, self.portal2)
+        self.own('c', self.halflife, self.doom)
+
+        self.build()
+        self.assertEqual(self.neighbours(self.portal), [self.portal2.pk, self.halflife.pk])
+        self.assertEqual(self.neighbours(self.doom), [self.halflife.pk])
+        self.assertEqual(self.neighbours(self.unsold), [])
+        self.assertFalse(GameNeighbour.objects.filter(game_id=F('neighbour_id')).exists())
+
+    def test_completed_baskets_outweigh_ownership(self):
+        buyer = self.own('a', self.portal, self.halflife)
+        self.order(buyer, self.portal, self.doom)
+        self.order(buyer, self.portal, self.halflife, status='failed')
+
+        self.build()
+        self.assertEqual(self.neighbours(self.portal), [self.doom.pk, self.halflife.pk])
+
+    def test_top_k_truncation(self):
+        self.own('a', self.portal, self.portal2, self.halflife, self.doom)
+        self.own('b', self.portal, self.portal2)
+
+        self.build('--k', '1')
+        self.assertEqual(self.neighbours(self.portal), [self.portal2.pk])
+        self.assertEqual(GameNeighbour.objects.filter(kind='also_bought', game=self.halflife).count(), 1)
+
+    def test_min_count_drops_rare_pairs(self):
+        self.own('a', self.portal, self.portal2, self.halflife)
+        self.own('b', self.portal, self.portal2)
+
+        self.build('--min-count', '2')
+        self.assertEqual(self.neighbours(self.portal), [self.portal2.pk])
+
+    def test_no_libraries_or_orders(self):
+        self.build()
+        self.assertFalse(GameNeighbour.objects.exists())
+
+    def test_endpoint_and_checkout_leave_out_owned_games(self):
+        self.own('a', self.portal, self.portal2, self.halflife)
+        self.own('b', self.portal, self.portal2)
+        self.own('c', self.halflife, self.doom)
+        self.build()
+        user = self.own('player', self.portal2)
+
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(f'/api/games/{self.portal.slug}/also-bought/')
+        self.assertEqual([game['id'] for game in response.json()['results']], [self.halflife.pk])
+
+        recommended = checkout_recommendations([self.portal.pk, self.doom.pk], {self.portal2.pk})
+        self.assertEqual(recommended, [self.halflife])
+
+
+class EmptyCatalogAlsoBoughtTests(StoreTestCase):
+    def test_empty_catalog(self):
+        out = StringIO()
+        call_command('build_also_bought', stdout=out)
+        self.assertIn('updated for 0 games', out.getvalue())
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+
+from django.db import connections
+from rest_framework.test import APIClient
+
+from gamestore.models import Game
+from gamestore.replicas import REPLICA, ReplicaRouter, is_pinned
+
+from .base import STORE_DIR, StoreTestCase
+
+
+class ReplicaRoutingTests(StoreTestCase):
+    """Catalog reads against a second SQLite database standing in for a lagging replica"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The replica starts as a copy of the migrated test database; each
+        # test then writes stale rows to it, rolled back like the primary's
+        path = os.path.join(STORE_DIR, 'replica.sqlite3')
+        if os.path.exists(path):
+            os.remove(path)
+        primary = connections['default']
+        primary.ensure_connection()
+        target = sqlite3.connect(path)
+        primary.connection.backup(target)
+        target.close()
+
+        # Registered here rather than in settings so the test runner doesn't
+        # create it; connections.settings is settings.DATABASES, so
+        # replica_configured() sees it too
+        connections.settings[REPLICA] = {**primary.settings_dict, 'NAME': path}
+        cls.databases = cls.databases | {REPLICA}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.databases = cls.databases - {REPLICA}
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.game = self.make_game('Portal')
+        stale = Game.objects.get(pk=self.game.pk)
+        stale.title = 'Portal (stale)'
+        stale.save(using=REPLICA, force_insert=True)
+
+    def title_seen_by(self, user=None):
+        self.client.force_authenticate(user)
+        response = self.client.get(f'/api/games/{self.game.slug}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['title']
+
+    def test_router_only_sends_catalog_reads_to_the_replica(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Game), 'default')
+        self.assertEqual(router.db_for_write(Game), 'default')
+        self.assertFalse(router.allow_migrate(REPLICA, 'gamestore'))
+
+    def test_safe_game_reads_go_to_the_replica(self):
+        self.assertEqual(self.title_seen_by(), 'Portal (stale)')
+        titles = [game['title'] for game in self.client.get('/api/games/').json()]
+        self.assertEqual(titles, ['Portal (stale)'])
+        # Outside a catalog view the primary is used
+        self.assertEqual(Game.objects.get(pk=self.game.pk).title, 'Portal')
+
+    def test_reads_stay_on_the_primary_after_a_write(self):
+        user, other = self.make_user(), self.make_user('other')
+        self.assertEqual(self.title_seen_by(user), 'Portal (stale)')
+
+        response = self.client.post('/api/wishlist/bulk_add/', {'game_ids': [self.game.pk]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(is_pinned(user.id))
+        self.assertEqual(self.title_seen_by(user), 'Portal')
+        self.assertEqual(self.title_seen_by(other), 'Portal (stale)')
+
+    def test_failed_writes_do_not_pin(self):
+        user = self.make_user()
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/wishlist/bulk_add/', {'game_ids': 'nope'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(is_pinned(user.id))
+        self.assertEqual(self.title_seen_by(user), 'Portal (stale)')
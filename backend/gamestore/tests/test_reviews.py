@@ -0,0 +1,91 @@
+from datetime import date
+
+from rest_framework.test import APIClient
+
+from gamestore.models import GameNeighbour, Review
+
+from .base import StoreTestCase
+
+
+class ReviewFeedTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.game = self.make_game('Portal')
+
+    def add_review(self, helpful_count, game=None):
+        user = self.make_user(f'reviewer{Review.objects.count()}')
+        return Review.objects.create(
+            user=user, game=game or self.game, rating='positive', review_text='Great',
+            hours_played=1, helpful_count=helpful_count,
+        )
+
+    def read_feed(self, url, limit):
+        ids, cursor = [], None
+        while True:
+            params = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [review['id'] for review in response.json()['results']]
+            cursor = response.json()['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_cursor_round_trip_covers_ties_once(self):
+        # Pages of two end inside the runs of equal helpful_count
+        reviews = [self.add_review(helpful) for helpful in (5, 3, 3, 3, 1, 5)]
+        self.add_review(9, game=self.make_game('Half-Life'))
+
+        ids = self.read_feed(f'/api/games/{self.game.slug}/reviews/', limit=2)
+        expected = sorted(reviews, key=lambda review: (-review.helpful_count, -review.id))
+        self.assertEqual(ids, [review.id for review in expected])
+
+    def test_recent_sort(self):
+        reviews = [self.add_review(0) for _ in range(3)]
+        ids = self.read_feed(f'/api/games/{self.game.pk}/reviews/?sort=recent', limit=2)
+        self.assertEqual(ids, [review.id for review in reversed(reviews)])
+
+    def test_slim_payload(self):
+        self.add_review(1)
+        (review,) = self.client.get(f'/api/games/{self.game.slug}/reviews/').json()['results']
+        self.assertEqual(review['username'], 'reviewer0')
+        self.assertNotIn('game', review)
+
+    def test_bad_cursor_and_sort_are_rejected(self):
+        url = f'/api/games/{self.game.slug}/reviews/'
+        for params in ({'cursor': 'garbage'}, {'cursor': 'WyJ4IiwxXQ'}, {'sort': 'worst'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_unknown_game(self):
+        self.assertEqual(self.client.get('/api/games/no-such-game/reviews/').status_code, 404)
+
+
+class NumericSlugLookupTests(StoreTestCase):
+    """A numeric slug that is also another game's id resolves like get_object: slug first"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.by_id = self.make_game('First Game')
+        self.by_slug = self.make_game('1942', slug=str(self.by_id.pk))
+        self.other = self.make_game('Other', release_date=date(2021, 1, 1))
+
+    def test_detail_and_feeds_pick_the_same_game(self):
+        Review.objects.create(
+            user=self.make_user(), game=self.by_id, rating='positive', review_text='Wrong game', hours_played=1
+        )
+        for kind in ('similar', 'also_bought'):
+            GameNeighbour.objects.create(game=self.by_id, neighbour=self.other, kind=kind, rank=1, score=1)
+            GameNeighbour.objects.create(game=self.by_slug, neighbour=self.by_id, kind=kind, rank=1, score=1)
+
+        key = self.by_slug.slug
+        self.assertEqual(self.client.get(f'/api/games/{key}/').json()['id'], self.by_slug.pk)
+        self.assertEqual(self.client.get(f'/api/games/{key}/reviews/').json()['results'], [])
+        for url in (f'/api/games/{key}/similar/', f'/api/games/{key}/also-bought/'):
+            with self.subTest(url=url):
+                self.assertEqual([game['id'] for game in self.client.get(url).json()['results']], [self.by_id.pk])
+
+    def test_id_still_works_when_no_slug_matches(self):
+        self.assertEqual(self.client.get(f'/api/games/{self.other.pk}/similar/').status_code, 200)
+        self.assertEqual(self.client.get('/api/games/987654/similar/').status_code, 404)
@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+
+from gamestore.models import GameNeighbour, Genre, PendingSimilarity, Tag
+
+from .base import StoreTestCase
+
+
+class SimilarGamesTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        action = Genre.objects.create(name='Action')
+        puzzle = Genre.objects.create(name='Puzzle')
+        shooter = Tag.objects.create(name='Shooter')
+        self.halflife = self.make_game('Half-Life', developer='Valve')
+        self.halflife2 = self.make_game('Half-Life 2', developer='Valve')
+        self.doom = self.make_game('Doom', developer='id Software')
+        self.portal = self.make_game('Portal', developer='Puzzle Studio')
+        self.loner = self.make_game('Loner', developer='')
+        for game in (self.halflife, self.halflife2, self.doom):
+            game.genres.add(action)
+        shooter.games.add(self.halflife, self.halflife2)
+        self.portal.genres.add(puzzle)
+
+    def build(self, *args):
+        call_command('build_similar_games', *args, stdout=StringIO())
+
+    def neighbours(self, game):
+        return list(
+            GameNeighbour.objects.filter(game=game, kind='similar').order_by('rank').values_list('neighbour_id', flat=True)
+        )
+
+    def test_neighbours_are_ranked_by_shared_features(self):
+        self.build()
+        # Genre, tag and developer in common beat the genre alone
+        self.assertEqual(self.neighbours(self.halflife), [self.halflife2.pk, self.doom.pk])
+        self.assertEqual(self.neighbours(self.doom), [self.halflife.pk, self.halflife2.pk])
+        # Nothing in common with anyone: no neighbours, not even itself
+        self.assertEqual(self.neighbours(self.portal), [])
+        self.assertEqual(self.neighbours(self.loner), [])
+
+        scores = list(GameNeighbour.objects.filter(game=self.halflife).order_by('rank').values_list('score', flat=True))
+        self.assertGreater(scores[0], scores[1])
+        self.assertLessEqual(scores[0], 1.0 + 1e-6)
+
+    def test_a_game_is_never_its_own_neighbour(self):
+        self.build()
+        self.assertFalse(GameNeighbour.objects.filter(game_id=F('neighbour_id')).exists())
+
+    def test_top_k_truncation(self):
+        self.build('--k', '1')
+        self.assertEqual(self.neighbours(self.halflife), [self.halflife2.pk])
+        self.assertEqual(self.neighbours(self.doom), [self.halflife.pk])
+
+    def test_rebuild_replaces_the_previous_lists(self):
+        self.build()
+        self.build('--k', '1')
+        self.assertEqual(GameNeighbour.objects.filter(game=self.halflife).count(), 1)
+
+    def test_incremental_run_picks_up_changed_games(self):
+        self.build()
+        PendingSimilarity.objects.all().delete()
+        Tag.objects.get(name='Shooter').games.add(self.doom)
+        self.assertTrue(PendingSimilarity.objects.filter(game=self.doom).exists())
+
+        self.build('--incremental')
+        self.assertEqual(self.neighbours(self.halflife)[0], self.halflife2.pk)
+        self.assertEqual(set(self.neighbours(self.doom)), {self.halflife.pk, self.halflife2.pk})
+        self.assertFalse(PendingSimilarity.objects.exists())
+
+
+class EmptyCatalogSimilarityTests(StoreTestCase):
+    def test_empty_catalog(self):
+        out = StringIO()
+        call_command('build_similar_games', stdout=out)
+        self.assertIn('updated for 0 games', out.getvalue())
+        call_command('build_similar_games', '--incremental', stdout=StringIO())
+        self.assertFalse(GameNeighbour.objects.exists())
+
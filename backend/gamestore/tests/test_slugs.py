@@ -0,0 +1,50 @@
+from importlib import import_module
+
+from django.apps import apps
+
+from gamestore.models import Game
+from gamestore.slugs import allocate_slug, allocate_slugs
+
+from .base import StoreTestCase
+
+
+class AllocateSlugTests(StoreTestCase):
+    def test_single_slug_takes_the_first_free_suffix(self):
+        for slug in ('portal', 'portal-1', 'portal-3'):
+            self.make_game(slug=slug)
+        self.assertEqual(allocate_slug(Game.objects.all(), 'portal'), 'portal-2')
+        self.assertEqual(allocate_slug(Game.objects.all(), 'doom'), 'doom')
+
+    def test_batch_slugs_are_unique_across_bases(self):
+        self.make_game(slug='portal')
+        slugs = allocate_slugs(Game.objects.all(), ['portal', 'portal', 'portal-2'])
+        self.assertEqual(slugs, ['portal-1', 'portal-2', 'portal-2-1'])
+
+    def test_batch_repeats_and_existing_suffixes(self):
+        self.make_game(slug='action-2')
+        slugs = allocate_slugs(Game.objects.all(), ['action', 'action', 'action', 'action-2'])
+        self.assertEqual(slugs, ['action', 'action-1', 'action-3', 'action-2-1'])
+        self.assertEqual(len(set(slugs)), len(slugs))
+
+    def test_games_with_the_same_title_get_unique_slugs(self):
+        games = [self.make_game(title='Portal') for _ in range(3)]
+        self.assertEqual([game.slug for game in games], ['portal', 'portal-1', 'portal-2'])
+
+
+class PopulateEmptySlugsMigrationTests(StoreTestCase):
+    migration = import_module('gamestore.migrations.0004_populate_empty_slugs')
+
+    def test_backfill_slugs_are_unique_across_bases(self):
+        slugs = self.migration.unique_slugs(['portal', 'portal-2'], ['portal', 'portal', 'portal-2'])
+        self.assertEqual(slugs, ['portal-1', 'portal-3', 'portal-2-1'])
+
+    def test_backfill_fills_an_empty_slug(self):
+        self.make_game(title='Portal', slug='portal')
+        Game.objects.bulk_create([
+            Game(title='Portal', slug='', description='d', short_description='d', price=1,
+                 release_date='2020-01-01', developer='x', publisher='y')
+        ])
+
+        self.migration.populate_empty_slugs(apps, None)
+
+        self.assertEqual(sorted(Game.objects.values_list('slug', flat=True)), ['portal', 'portal-1'])
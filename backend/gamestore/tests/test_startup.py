@@ -0,0 +1,25 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from gamestore.management.commands.benchmark_startup import Command
+
+
+class StartupSmokeTests(SimpleTestCase):
+    """Fresh interpreters serving one request, as the benchmark runs them"""
+
+    def test_first_request_after_warm_up(self):
+        for warm in (False, True):
+            with self.subTest(warm=warm):
+                result, _ = Command().run_once('/api/', warm=warm)
+                self.assertEqual(result['status'], '200 OK')
+                # Warming up must not pull in the SDKs that load on first use
+                self.assertEqual(result['lazy_loaded'], [])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_startup', runs=1, budget_ms=60000, warm=True, top=3, stdout=out)
+        output = out.getvalue()
+        self.assertIn('GET /api/ → 200 OK', output)
+        self.assertNotIn('Loaded before the first response', output)
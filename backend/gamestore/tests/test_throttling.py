@@ -0,0 +1,58 @@
+import os
+from unittest import mock
+
+from rest_framework.test import APIClient
+
+from gamestore.throttling import AuthBucketThrottle, TokenBucketStore, TokenBucketThrottle
+
+from .base import STORE_DIR, StoreTestCase
+
+
+class TokenBucketStoreTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.store = TokenBucketStore(os.path.join(STORE_DIR, 'throttle.sqlite3'))
+
+    def consume(self, now):
+        # 3 requests of burst, refilled at one every 2 seconds
+        return self.store.consume('key', capacity=3, rate=0.5, now=now)
+
+    def test_burst_then_refill(self):
+        self.assertEqual([self.consume(100)[0] for _ in range(3)], [True, True, True])
+        self.assertEqual(self.consume(100), (False, 2.0))
+
+        # Half a token back is not enough, and the wait shrinks accordingly
+        self.assertEqual(self.consume(101), (False, 1.0))
+        self.assertEqual(self.consume(102), (True, 0))
+        self.assertFalse(self.consume(102)[0])
+
+    def test_refill_is_capped_at_capacity(self):
+        self.consume(100)
+        allowed = [self.consume(1000)[0] for _ in range(4)]
+        self.assertEqual(allowed, [True, True, True, False])
+
+    def test_buckets_are_separate(self):
+        for _ in range(3):
+            self.consume(100)
+        self.assertTrue(self.store.consume('other', capacity=3, rate=0.5, now=100)[0])
+
+
+class ThrottledEndpointTests(StoreTestCase):
+    def test_login_is_throttled_then_refilled(self):
+        client = APIClient()
+        throttle = AuthBucketThrottle()
+        credentials = {'username': 'player', 'password': 'wrong'}
+        now = 1_000_000.0
+
+        with mock.patch.object(TokenBucketThrottle, 'timer', side_effect=lambda: now):
+            for _ in range(throttle.num_requests):
+                self.assertEqual(client.post('/api/auth/login/', credentials, format='json').status_code, 401)
+
+            response = client.post('/api/auth/login/', credentials, format='json')
+            self.assertEqual(response.status_code, 429)
+            interval = throttle.duration / throttle.num_requests
+            self.assertEqual(int(response['Retry-After']), round(interval))
+
+            now += interval
+            self.assertEqual(client.post('/api/auth/login/', credentials, format='json').status_code, 401)
+            self.assertEqual(client.post('/api/auth/login/', credentials, format='json').status_code, 429)
@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from rest_framework.test import APIClient
+
+from gamestore.models import Wishlist
+from gamestore.views import MAX_WISHLIST_BATCH
+
+from .base import StoreTestCase
+
+
+class BulkWishlistTests(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = self.make_user()
+        self.client.force_authenticate(self.user)
+        self.portal = self.make_game('Portal', price='9.99', discount_percentage=50)
+        self.halflife = self.make_game('Half-Life', price='7.99')
+
+    def test_bulk_add_stores_the_price_when_added(self):
+        response = self.client.post(
+            '/api/wishlist/bulk_add/', {'game_ids': [self.portal.pk, str(self.halflife.pk)]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['wishlist_game_ids']), sorted([self.portal.pk, self.halflife.pk]))
+        self.assertEqual(Wishlist.objects.get(game=self.portal).price_when_added, Decimal('5.00'))
+
+        # Adding again is a no-op
+        response = self.client.post('/api/wishlist/bulk_add/', {'game_ids': [self.portal.pk]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Wishlist.objects.count(), 2)
+
+    def test_bulk_remove(self):
+        for game in (self.portal, self.halflife):
+            Wishlist.objects.create(user=self.user, game=game)
+        response = self.client.post('/api/wishlist/bulk_remove/', {'game_ids': [self.portal.pk, 999]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'removed': 1, 'wishlist_game_ids': [self.halflife.pk]})
+
+    def test_malformed_game_ids_are_rejected(self):
+        for url in ('/api/wishlist/bulk_add/', '/api/wishlist/bulk_remove/'):
+            for game_ids in ('abc', ['x'], 5, [True], [None]):
+                with self.subTest(url=url, game_ids=game_ids):
+                    response = self.client.post(url, {'game_ids': game_ids}, format='json')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {'error': 'game_ids must be a list of game ids'})
+
+    def test_batch_size_is_capped(self):
+        game_ids = list(range(1, MAX_WISHLIST_BATCH + 2))
+        for url in ('/api/wishlist/bulk_add/', '/api/wishlist/bulk_remove/'):
+            with self.subTest(url=url):
+                response = self.client.post(url, {'game_ids': game_ids}, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Wishlist.objects.exists())
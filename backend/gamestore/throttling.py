@@ -0,0 +1,157 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketStore:
+    """
+    Token buckets kept in a local SQLite file.
+
+    Every gunicorn worker on the host opens the same file, so limits are
+    shared across processes without running a cache server. Each check is a
+    single atomic UPSERT, so concurrent workers never lose an update.
+    """
+
+    # Refill the bucket, take one token if available and report whether the
+    # request was allowed, all in one statement
+    CONSUME_SQL = """
+        INSERT INTO buckets (key, tokens, updated, allowed)
+        VALUES (:key, :capacity - 1, :now, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            allowed = min(:capacity, tokens + (:now - updated) * :rate) >= 1,
+            tokens = min(:capacity, tokens + (:now - updated) * :rate)
+                     - (min(:capacity, tokens + (:now - updated) * :rate) >= 1),
+            updated = :now
+        RETURNING allowed, tokens
+    """
+
+    # Fraction of requests that also prune idle buckets
+    PRUNE_PROBABILITY = 0.001
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                'updated REAL NOT NULL, allowed INTEGER NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key, capacity, rate, now):
+        """
+        Take one token from the bucket at `key`.
+
+        Returns `(allowed, wait)` where `wait` is the number of seconds until
+        the next token is available (0 when allowed).
+        """
+        conn = self._connection()
+        allowed, tokens = conn.execute(self.CONSUME_SQL, {
+            'key': key, 'capacity': capacity, 'rate': rate, 'now': now,
+        }).fetchone()
+
+        if random.random() < self.PRUNE_PROBABILITY:
+            # A bucket idle for a full refill period is back at capacity
+            conn.execute('DELETE FROM buckets WHERE updated < ?', (now - capacity / rate,))
+
+        if allowed:
+            return True, 0
+        return False, (1 - tokens) / rate
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    """Return the process-wide bucket store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                path = getattr(settings, 'THROTTLE_DB_PATH', None) or os.path.join(
+                    tempfile.gettempdir(), 'notsteam-throttle.sqlite3'
+                )
+                _store = TokenBucketStore(path)
+    return _store
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket version of DRF's SimpleRateThrottle.
+
+    A rate of "10/min" allows bursts of 10 requests, refilled at 10 per
+    minute. `wait()` feeds DRF's `Retry-After` header.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        allowed, self._wait = get_bucket_store().consume(
+            self.key,
+            capacity=self.num_requests,
+            rate=self.num_requests / self.duration,
+            now=self.timer(),
+        )
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class AnonBucketThrottle(TokenBucketThrottle):
+    """Per-IP limit for anonymous requests"""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    """Per-user limit for authenticated requests, per-IP otherwise"""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class AuthBucketThrottle(TokenBucketThrottle):
+    """Strict per-IP limit for login and registration"""
+    scope = 'auth'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class PaymentBucketThrottle(UserBucketThrottle):
+    """Strict per-user limit for payment routes"""
+    scope = 'payment'
+
+
+class HeartbeatBucketThrottle(UserBucketThrottle):
+    """Per-user limit for playtime heartbeats (clients send about one a minute)"""
+    scope = 'heartbeat'
@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenRefreshView
 from . import views
+from .throttling import AnonBucketThrottle, AuthBucketThrottle
 
 # Create router for viewsets
 router = DefaultRouter()
@@ -9,29 +11,61 @@ router.register(r'profiles', views.UserProfileViewSet, basename='profile')
 router.register(r'library', views.GameLibraryViewSet, basename='library')
 router.register(r'wishlist', views.WishlistViewSet, basename='wishlist')
 router.register(r'reviews', views.ReviewViewSet, basename='review')
+router.register(r'notifications', views.NotificationViewSet, basename='notification')
 
 urlpatterns = [
     # Include router URLs
     path('', include(router.urls)),
     
+    # Owned/wishlisted game ids for store badges
+    path('membership/', views.game_membership, name='game-membership'),
+
     # Authentication endpoints
     path('auth/register/', views.register_user, name='register'),
     path('auth/login/', views.login_user, name='login'),
     path('auth/logout/', views.logout_user, name='logout'),
     path('auth/me/', views.get_current_user, name='current-user'),
+    path('auth/bootstrap/', views.session_bootstrap, name='session-bootstrap'),
+    path('auth/token/refresh/', TokenRefreshView.as_view(
+        throttle_classes=[AnonBucketThrottle, AuthBucketThrottle]
+    ), name='token-refresh'),
     
+    # Live catalog changes (Server-Sent Events)
+    path('catalog/events/', views.catalog_events, name='catalog-events'),
+    path('catalog/events/metrics/', views.catalog_events_metrics, name='catalog-events-metrics'),
+
+    # Playtime heartbeats from game clients
+    path('playtime/heartbeat/', views.playtime_heartbeat, name='playtime-heartbeat'),
+    path('playtime/metrics/', views.playtime_metrics, name='playtime-metrics'),
+
+    # Achievements reported by game clients
+    path('achievements/unlock/', views.unlock_achievements, name='unlock-achievements'),
+
+    # Leaderboards (precomputed snapshots)
+    path('leaderboards/global/', views.leaderboard, name='leaderboard-global'),
+    path('leaderboards/global/me/', views.my_leaderboard_rank, name='leaderboard-global-me'),
+    path('leaderboards/games/<int:game_id>/', views.leaderboard, name='leaderboard-game'),
+    path('leaderboards/games/<int:game_id>/me/', views.my_leaderboard_rank, name='leaderboard-game-me'),
+
     # Payment endpoints - Stripe
     path('payment/create-intent/', views.create_payment_intent, name='create-payment'),
     path('payment/confirm/', views.confirm_payment, name='confirm-payment'),
     path('payment/orders/', views.order_history, name='order-history'),
+    path('payment/orders/history/', views.order_history_page, name='order-history-page'),
+    path('payment/orders/export/', views.export_orders, name='export-orders'),
 
     # Payment endpoints - 2Checkout (Works in Pakistan)
     path('payment/2checkout/create/', views.create_twocheckout_order, name='create-twocheckout-order'),
     path('payment/2checkout/verify/', views.verify_twocheckout_payment, name='verify-twocheckout-payment'),
     path('payment/2checkout/details/', views.get_twocheckout_payment_details, name='twocheckout-payment-details'),
+    path('payment/gateways/metrics/', views.payment_gateway_metrics, name='payment-gateway-metrics'),
+
+    # Analytics (admin only)
+    path('analytics/sales/', views.sales_analytics, name='sales-analytics'),
 
     # Cart endpoints
     path('cart/add/', views.add_to_cart, name='add-to-cart'),
     path('cart/', views.get_cart, name='get-cart'),
     path('cart/clear/', views.clear_cart, name='clear-cart'),
+    path('cart/recommendations/', views.cart_recommendations, name='cart-recommendations'),
 ]
\ No newline at end of file
@@ -1,34 +1,60 @@
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.exceptions import TokenError
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.db.models import Q
-import stripe
-import requests
+from django.db.models import Case, Count, F, Max, OuterRef, Prefetch, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce, Greatest, TruncWeek
+from django.utils.dateparse import parse_date
 import hashlib
 import hmac
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from django.conf import settings
 
 from .models import (
     Game, UserProfile, GameLibrary, Wishlist,
-    Review, Achievement, UserAchievement, Order, OrderItem, Tag
+    Review, Achievement, UserAchievement, Order, OrderItem, Tag, Notification,
+    GameDailyStats, GameNeighbour, LeaderboardSnapshot
 )
 from .serializers import (
     GameSerializer, UserProfileSerializer, GameLibrarySerializer,
     WishlistSerializer, ReviewSerializer, AchievementSerializer,
     UserAchievementSerializer, OrderSerializer, UserRegistrationSerializer,
-    UserSerializer
+    UserSerializer, GameSummarySerializer, NotificationSerializer, ReviewFeedSerializer,
+    OrderSummarySerializer, LeaderboardEntrySerializer
+)
+from .achievements import MAX_UNLOCK_BATCH, grant_achievements
+from .async_api import async_api_view
+from .authentication import StoreRefreshToken, issue_tokens
+from .entitlements import (
+    ENCODINGS, encode_ids, get_entitlements, get_owned_game_ids, invalidate_entitlements, owned_among
+)
+from .events import catalog_event_metrics, ensure_change_watcher, stream_catalog_events
+from .exports import EXPORT_FORMATS, stream_orders
+from .gateways import (
+    GatewayUnavailable, create_stripe_payment_intent, fetch_twocheckout_order, gateway_metrics,
+    retrieve_stripe_payment_intent
+)
+from .heartbeats import get_heartbeat_buffer, record_heartbeat
+from .leaderboards import GLOBAL_BOARD, game_board, global_bucket, standing, top_entries
+from .pagination import get_page_size, keyset_page
+from .recommendations import checkout_recommendations
+from .replicas import CatalogReplicaMixin
+from .rollups import record_order_sales
+from .throttling import (
+    AnonBucketThrottle, UserBucketThrottle, AuthBucketThrottle, PaymentBucketThrottle,
+    HeartbeatBucketThrottle,
 )
-
-# Configure Stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
-# 2Checkout API Configuration (Works in Pakistan)
-TWOCHECKOUT_API_URL = "https://api.2checkout.com/rest/6.0/"
-
 
 # ============================================
 # AUTHENTICATION VIEWS (Module 1: Auth)
@@ -36,6 +62,7 @@ TWOCHECKOUT_API_URL = "https://api.2checkout.com/rest/6.0/"
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([AnonBucketThrottle, AuthBucketThrottle])
 def register_user(request):
     """Register a new user"""
     serializer = UserRegistrationSerializer(data=request.data)
@@ -43,7 +70,8 @@ def register_user(request):
         user = serializer.save()
         token, _ = Token.objects.get_or_create(user=user)
         return Response({
-            'token': token.key,
+            **issue_tokens(user),
+            'token': token.key,  # Legacy token for old clients
             'user': UserSerializer(user).data
         }, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -51,16 +79,21 @@ def register_user(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([AnonBucketThrottle, AuthBucketThrottle])
 def login_user(request):
-    """Login user and return token"""
+    """Login user and return JWT access/refresh tokens plus the legacy token"""
     username = request.data.get('username')
     password = request.data.get('password')
     
     user = authenticate(username=username, password=password)
     if user:
         token, _ = Token.objects.get_or_create(user=user)
+        # Accounts made outside registration (e.g. createsuperuser) get their
+        # profile here, so the read-only endpoints never have to create it
+        UserProfile.objects.get_or_create(user=user)
         return Response({
-            'token': token.key,
+            **issue_tokens(user),
+            'token': token.key,  # Legacy token for old clients
             'user': UserSerializer(user).data
         })
     return Response(
@@ -70,10 +103,23 @@ def login_user(request):
 
 
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.AllowAny])
 def logout_user(request):
-    """Logout user by deleting token"""
-    request.user.auth_token.delete()
+    """
+    Logout user by revoking the refresh token and deleting the legacy token.
+
+    The refresh token is enough, so a client whose access token has
+    expired can still log out.
+    """
+    refresh = request.data.get('refresh')
+    if refresh:
+        try:
+            StoreRefreshToken(refresh).blacklist()
+        except TokenError:
+            pass  # Already expired or revoked
+
+    if request.user.is_authenticated:
+        Token.objects.filter(user_id=request.user.id).delete()
     return Response({'message': 'Logged out successfully'})
 
 
@@ -95,11 +141,69 @@ def get_current_user(request):
         })
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def session_bootstrap(request):
+    """
+    Everything the frontend needs after login in one call: user, profile,
+    owned and wishlisted game ids, cart and order count.
+
+    Runs a fixed number of queries regardless of library size. The ETag
+    comes from the profile, order count, cached entitlements and a cart
+    version, so a 304 is sent before the cart games are loaded.
+    """
+    user = request.user
+    order_count = Order.objects.filter(user=OuterRef('user')).order_by().values('user').annotate(
+        count=Count('id')
+    ).values('count')
+    profile = UserProfile.objects.filter(user=user).annotate(
+        order_count=Coalesce(Subquery(order_count), 0)
+    ).first()
+    if profile is None:
+        # Not created until the next login; show the defaults meanwhile
+        profile = UserProfile(user=user)
+        profile.order_count = Order.objects.filter(user=user).count()
+    profile.user = user  # Avoid re-fetching the user for the nested serializer
+
+    cart_ids = request.session.get('cart', [])
+    cart_games = Game.objects.filter(id__in=cart_ids)
+    # Any change to a cart game's fields or price (sale campaigns included)
+    cart_version = cart_games.aggregate(changed=Max('updated_at'), total=Sum('effective_price')) if cart_ids else {}
+
+    entitlements = get_entitlements(user.id)
+    payload = {
+        'user': UserSerializer(user).data,
+        'profile': UserProfileSerializer(profile).data,
+        'owned_game_ids': entitlements['owned'],
+        'wishlist_game_ids': entitlements['wishlist'],
+        'order_count': profile.order_count,
+    }
+
+    etag = '"%s"' % hashlib.md5(
+        json.dumps([payload, cart_ids, cart_version], sort_keys=True, cls=DjangoJSONEncoder).encode()
+    ).hexdigest()
+    if request.headers.get('If-None-Match') == etag:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        games = cart_games.only(
+            'id', 'title', 'slug', 'image', 'price', 'discount_percentage', 'campaign_discount'
+        ) if cart_ids else []
+        response = Response({**payload, 'cart': GameSummarySerializer(games, many=True).data})
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 # ============================================
 # GAME VIEWS (Module 2: Major Functionality - CRUD)
 # ============================================
 
-class GameViewSet(viewsets.ModelViewSet):
+def games_for_serializer():
+    """Games with what GameSerializer reads per row (tags, review count) loaded up front"""
+    return Game.objects.annotate(_review_count=Count('reviews')).prefetch_related('tags')
+
+
+class GameViewSet(CatalogReplicaMixin, viewsets.ModelViewSet):
     """
     CRUD operations for games
     - List all games
@@ -117,23 +221,86 @@ class GameViewSet(viewsets.ModelViewSet):
 
         # Try to get by slug first
         try:
-            return Game.objects.get(slug=lookup_value)
+            return self.get_queryset().get(slug=lookup_value)
         except (Game.DoesNotExist, ValueError):
             # If not found by slug, try by ID
             try:
-                return Game.objects.get(id=int(lookup_value))
+                return self.get_queryset().get(id=int(lookup_value))
             except (Game.DoesNotExist, ValueError):
                 raise Game.DoesNotExist
     
+    def get_game_id(self, lookup_value):
+        """
+        Id of the game get_object would return, without loading it: a slug
+        match wins over an id match (a numeric slug like "1942" can also be
+        another game's id). None if neither matches.
+        """
+        lookup = Q(slug=lookup_value)
+        if lookup_value.isdigit():
+            lookup |= Q(id=int(lookup_value))
+        return (
+            self.get_queryset()
+            .filter(lookup)
+            .order_by(Case(When(slug=lookup_value, then=0), default=1))
+            .values_list('id', flat=True)
+            .first()
+        )
+
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             return [permissions.IsAdminUser()]
         return [permissions.AllowAny()]
     
+    # ?ordering= values accepted by the catalog list; effective_price is
+    # the price users pay, sale campaigns included
+    CATALOG_ORDERINGS = {
+        'effective_price', '-effective_price', 'price', '-price',
+        'release_date', '-release_date', 'title', '-title',
+        'positive_reviews', '-positive_reviews',
+    }
+
+    def list(self, request, *args, **kwargs):
+        """
+        Catalog list.
+
+        `?ordering=` (e.g. `effective_price`, `-release_date`), and
+        `?min_price=` / `?max_price=` on the price after discount.
+        """
+        games = self.get_queryset()
+
+        ordering = request.query_params.get('ordering')
+        if ordering:
+            if ordering not in self.CATALOG_ORDERINGS:
+                return Response(
+                    {'error': f'ordering must be one of: {", ".join(sorted(self.CATALOG_ORDERINGS))}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            games = games.order_by(ordering, 'id')
+
+        for param, lookup in (('min_price', 'effective_price__gte'), ('max_price', 'effective_price__lte')):
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                price = Decimal(value)
+            except InvalidOperation:
+                price = None
+            if price is None or not price.is_finite():
+                return Response({'error': f'{param} must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+            games = games.filter(**{lookup: price})
+
+        serializer = self.get_serializer(games, many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured games with discounts"""
-        games = Game.objects.filter(discount_percentage__gt=0).order_by('-discount_percentage')[:10]
+        sale_discount = Greatest('discount_percentage', 'campaign_discount')
+        games = (
+            self.get_queryset()
+            .filter(Q(discount_percentage__gt=0) | Q(campaign_discount__gt=0))
+            .order_by(sale_discount.desc(), 'id')[:10]
+        )
         serializer = self.get_serializer(games, many=True)
         return Response(serializer.data)
     
@@ -142,17 +309,95 @@ class GameViewSet(viewsets.ModelViewSet):
         """Search games by title or description"""
         query = request.query_params.get('q', '')
         if query:
-            games = Game.objects.filter(
+            games = self.get_queryset().filter(
                 Q(title__icontains=query) | 
                 Q(description__icontains=query) |
                 Q(tags__name__icontains=query)
             ).distinct()
         else:
-            games = Game.objects.all()
+            games = self.get_queryset()
         
         serializer = self.get_serializer(games, many=True)
         return Response(serializer.data)
 
+    # Review feed sort options -> keyset column
+    REVIEW_SORTS = {
+        'helpful': 'helpful_count',
+        'recent': 'created_at',
+    }
+
+    @action(detail=True, methods=['get'])
+    def reviews(self, request, pk=None):
+        """
+        Paginated review feed for a game.
+
+        `?sort=helpful|recent`, `?limit=`, and `?cursor=` from the previous
+        page's `next_cursor`.
+        """
+        sort = request.query_params.get('sort', 'helpful')
+        if sort not in self.REVIEW_SORTS:
+            return Response(
+                {'error': 'sort must be one of: helpful, recent'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        game_id = self.get_game_id(pk)
+        if game_id is None:
+            return Response({'error': 'Game not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        reviews, next_cursor = keyset_page(
+            Review.objects.filter(game_id=game_id).select_related('user').only(
+                'id', 'user__username', 'rating', 'review_text', 'hours_played',
+                'helpful_count', 'created_at', 'updated_at'
+            ),
+            self.REVIEW_SORTS[sort],
+            cursor=request.query_params.get('cursor'),
+            page_size=get_page_size(request)
+        )
+        return Response({
+            'results': ReviewFeedSerializer(reviews, many=True).data,
+            'next_cursor': next_cursor
+        })
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Similar games, precomputed by `manage.py build_similar_games`.
+
+        """
+        game_id = self.get_game_id(pk)
+        if game_id is None:
+            return Response({'error': 'Game not found'}, status=status.HTTP_404_NOT_FOUND)
+        neighbours = (
+            GameNeighbour.objects
+            .filter(game_id=game_id, kind='similar')
+            .select_related('neighbour')
+            .order_by('rank')[:get_page_size(request)]
+        )
+        games = [entry.neighbour for entry in neighbours]
+        return Response({'results': GameSummarySerializer(games, many=True).data})
+
+    @action(detail=True, methods=['get'], url_path='also-bought')
+    def also_bought(self, request, pk=None):
+        """
+        "Customers also bought", precomputed by `manage.py build_also_bought`.
+
+        Games the user already owns are left out.
+        """
+        game_id = self.get_game_id(pk)
+        if game_id is None:
+            return Response({'error': 'Game not found'}, status=status.HTTP_404_NOT_FOUND)
+        owned = get_owned_game_ids(request.user.id) if request.user.is_authenticated else set()
+        limit = get_page_size(request)
+        neighbours = (
+            GameNeighbour.objects
+            .filter(game_id=game_id, kind='also_bought')
+            .select_related('neighbour')
+            .order_by('rank')
+        )
+        games = [entry.neighbour for entry in neighbours if entry.neighbour_id not in owned][:limit]
+        return Response({'results': GameSummarySerializer(games, many=True).data})
+
 
 class UserProfileViewSet(viewsets.ModelViewSet):
     """User profile CRUD operations"""
@@ -180,13 +425,35 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def game_membership(request):
+    """
+    Owned and wishlisted game ids for store badges.
+
+    `?encoding=` selects list, delta (default) or bitmap encoding.
+    """
+    encoding = request.query_params.get('encoding', 'delta')
+    if encoding not in ENCODINGS:
+        return Response(
+            {'error': f'encoding must be one of: {", ".join(ENCODINGS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    entitlements = get_entitlements(request.user.id)
+    return Response({
+        'owned': encode_ids(entitlements['owned'], encoding),
+        'wishlist': encode_ids(entitlements['wishlist'], encoding),
+    })
+
+
 class GameLibraryViewSet(viewsets.ModelViewSet):
     """User's game library CRUD"""
     serializer_class = GameLibrarySerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return GameLibrary.objects.filter(user=self.request.user)
+        return GameLibrary.objects.filter(user=self.request.user).select_related('game')
     
     @action(detail=False, methods=['get'])
     def recent(self, request):
@@ -196,64 +463,309 @@ class GameLibraryViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+# Games per bulk wishlist add/remove
+MAX_WISHLIST_BATCH = 500
+
+
 class WishlistViewSet(viewsets.ModelViewSet):
     """Wishlist CRUD operations"""
     serializer_class = WishlistSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user)
+        return Wishlist.objects.filter(user=self.request.user).select_related('game')
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(
+            user=self.request.user,
+            price_when_added=serializer.validated_data['game'].discounted_price
+        )
     
     @action(detail=False, methods=['delete'])
     def remove_game(self, request):
         """Remove game from wishlist"""
         game_id = request.data.get('game_id')
-        try:
-            wishlist_item = Wishlist.objects.get(user=request.user, game_id=game_id)
-            wishlist_item.delete()
+        deleted, _ = Wishlist.objects.filter(user=request.user, game_id=game_id).delete()
+        if deleted:
             return Response({'message': 'Removed from wishlist'})
-        except Wishlist.DoesNotExist:
-            return Response(
-                {'error': 'Game not in wishlist'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
+        return Response(
+            {'error': 'Game not in wishlist'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    def parse_batch(self, request):
+        """(game ids, None) from the request body, or (None, a 400 response)"""
+        game_ids = parse_game_ids(request.data.get('game_ids', []))
+        if game_ids is None:
+            error = 'game_ids must be a list of game ids'
+        elif len(game_ids) > MAX_WISHLIST_BATCH:
+            error = f'At most {MAX_WISHLIST_BATCH} games per request'
+        else:
+            return game_ids, None
+        return None, Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'])
+    def bulk_add(self, request):
+        """Add several games to the wishlist in one insert"""
+        game_ids, error = self.parse_batch(request)
+        if error:
+            return error
+        games = Game.objects.filter(id__in=game_ids).only('id', 'price', 'discount_percentage', 'campaign_discount')
+        Wishlist.objects.bulk_create(
+            [
+                Wishlist(user=request.user, game=game, price_when_added=game.discounted_price)
+                for game in games
+            ],
+            ignore_conflicts=True
+        )
+        # bulk_create sends no signals
+        invalidate_entitlements(request.user.id)
+        return Response({'wishlist_game_ids': get_entitlements(request.user.id)['wishlist']})
+
+    @action(detail=False, methods=['post'])
+    def bulk_remove(self, request):
+        """Remove several games from the wishlist in one delete"""
+        game_ids, error = self.parse_batch(request)
+        if error:
+            return error
+        deleted, _ = Wishlist.objects.filter(user=request.user, game_id__in=game_ids).delete()
+        return Response({
+            'removed': deleted,
+            'wishlist_game_ids': get_entitlements(request.user.id)['wishlist']
+        })
+
+
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    """User notifications (e.g. wishlist price drops)"""
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get('unread'):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        """Mark every notification as read"""
+        updated = self.get_queryset().filter(is_read=False).update(is_read=True)
+        return Response({'updated': updated})
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(CatalogReplicaMixin, viewsets.ModelViewSet):
     """Game review CRUD"""
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
     def get_queryset(self):
+        reviews = Review.objects.select_related('user').prefetch_related(
+            Prefetch('game', queryset=games_for_serializer())
+        )
         game_id = self.request.query_params.get('game_id')
         if game_id:
-            return Review.objects.filter(game_id=game_id)
-        return Review.objects.all()
+            return reviews.filter(game_id=game_id)
+        return reviews
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
+# ============================================
+# CATALOG EVENTS (live price and catalog changes over SSE)
+# ============================================
+
+@require_GET
+async def catalog_events(request):
+    """
+    Server-Sent Events stream of game changes (see events.py).
+
+    Resumes after the Last-Event-ID header or `?last_event_id=`. Under WSGI
+    a stream can't stay open, so it sends what is buffered and ends; the
+    client reconnects after the retry delay.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    max_age = None if isinstance(request, ASGIRequest) else 0
+    # Changes are made by other workers and processes too; poll the change log
+    ensure_change_watcher()
+    response = StreamingHttpResponse(
+        stream_catalog_events(last_event_id, max_age), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Keep proxies (nginx) from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def catalog_events_metrics(request):
+    """Open streams and buffered events of this worker"""
+    return Response(catalog_event_metrics())
+
+
+# ============================================
+# PLAYTIME VIEWS
+# ============================================
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([UserBucketThrottle, HeartbeatBucketThrottle])
+def playtime_heartbeat(request):
+    """
+    Record playtime reported by a running game client (about once a minute).
+
+    Body: `{"game_id": 1, "seconds": 60}`. Buffered and added to the
+    library's hours_played within HEARTBEAT_FLUSH_INTERVAL seconds; seconds
+    beyond the time since the previous heartbeat for the game aren't counted.
+    """
+    game_id = request.data.get('game_id')
+    seconds = request.data.get('seconds', 60)
+    if not isinstance(game_id, int) or not isinstance(seconds, (int, float)) or isinstance(seconds, bool) or seconds <= 0:
+        return Response(
+            {'error': 'game_id must be an integer and seconds a positive number'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if game_id not in get_owned_game_ids(request.user.id):
+        return Response({'error': 'Game not in your library'}, status=status.HTTP_403_FORBIDDEN)
+
+    record_heartbeat(request.user.id, game_id, seconds)
+    return Response({'accepted': True}, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def playtime_metrics(request):
+    """Heartbeat buffer backlog and flush latency (this host)"""
+    return Response(get_heartbeat_buffer().metrics(time.time()))
+
+
+# ============================================
+# ACHIEVEMENT VIEWS
+# ============================================
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def unlock_achievements(request):
+    """
+    Unlock a batch of achievements reported by a game client.
+
+    Body: `{"achievement_ids": [...]}`. Only achievements of owned games
+    count; XP is awarded once per achievement.
+    """
+    achievement_ids = request.data.get('achievement_ids')
+    if (
+        not isinstance(achievement_ids, list)
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in achievement_ids)
+    ):
+        return Response(
+            {'error': 'achievement_ids must be a list of integers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(achievement_ids) > MAX_UNLOCK_BATCH:
+        return Response(
+            {'error': f'At most {MAX_UNLOCK_BATCH} achievements per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    result = grant_achievements(request.user, achievement_ids, get_owned_game_ids(request.user.id))
+    return Response(result)
+
+
+# ============================================
+# LEADERBOARD VIEWS (served from the snapshot built by build_leaderboards)
+# ============================================
+
+def _board_for(game_id):
+    return GLOBAL_BOARD if game_id is None else game_board(game_id)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def leaderboard(request, game_id=None):
+    """Top of the global XP leaderboard, or of a game's by achievements unlocked (`?limit=`)"""
+    board = _board_for(game_id)
+    snapshot = LeaderboardSnapshot.objects.filter(board=board).first()
+    entries = top_entries(board, get_page_size(request))
+    return Response({
+        'board': board,
+        'total_users': snapshot.total_users if snapshot else 0,
+        'built_at': snapshot.built_at if snapshot else None,
+        'results': LeaderboardEntrySerializer(entries, many=True).data,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def my_leaderboard_rank(request, game_id=None):
+    """The user's snapshot rank and the percentile of their current score"""
+    if game_id is None:
+        score = UserProfile.objects.filter(user=request.user).values_list('xp', flat=True).first() or 0
+        bucket = global_bucket(score)
+    else:
+        score = bucket = UserAchievement.objects.filter(
+            user=request.user, achievement__game_id=game_id
+        ).count()
+
+    result = standing(_board_for(game_id), request.user.id, score, bucket)
+    if result is None:
+        return Response({'error': 'Leaderboard not available yet'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(result)
+
+
 # ============================================
 # PAYMENT VIEWS (Module 3: Payment Gateway)
 # ============================================
 
+def parse_game_ids(value):
+    """A list of game ids (ints or numeric strings) as ints, or None if malformed"""
+    if not isinstance(value, list):
+        return None
+    game_ids = []
+    for game_id in value:
+        if isinstance(game_id, bool) or not isinstance(game_id, (int, str)):
+            return None
+        try:
+            game_ids.append(int(game_id))
+        except ValueError:
+            return None
+    return game_ids
+
+
+def cart_total(games):
+    """Sum of what the games cost now (sale campaigns included), in one query"""
+    total = games.aggregate(total=Sum('effective_price'))['total'] or Decimal('0')
+    return total.quantize(Decimal('0.01'))
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([UserBucketThrottle, PaymentBucketThrottle])
 def create_payment_intent(request):
     """Create Stripe payment intent"""
     try:
-        game_ids = request.data.get('game_ids', [])
+        game_ids = parse_game_ids(request.data.get('game_ids', []))
+        if game_ids is None:
+            return Response(
+                {'error': 'game_ids must be a list of game ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Refuse to charge again for games already in the library
+        already_owned = sorted(owned_among(request.user.id, game_ids))
+        if already_owned:
+            return Response(
+                {'error': 'Some games are already in your library', 'owned_game_ids': already_owned},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         games = Game.objects.filter(id__in=game_ids)
         
         # Calculate total
-        total = sum(game.discounted_price for game in games)
+        total = cart_total(games)
         
         # Create payment intent
-        intent = stripe.PaymentIntent.create(
+        intent = create_stripe_payment_intent(
             amount=int(total * 100),  # Convert to cents
             currency='usd',
             metadata={
@@ -266,6 +778,8 @@ def create_payment_intent(request):
             'client_secret': intent.client_secret,
             'amount': total
         })
+    except GatewayUnavailable as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except Exception as e:
         return Response(
             {'error': str(e)}, 
@@ -275,19 +789,34 @@ def create_payment_intent(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([UserBucketThrottle, PaymentBucketThrottle])
 def confirm_payment(request):
     """Confirm payment and add games to library"""
     try:
         payment_intent_id = request.data.get('payment_intent_id')
-        game_ids = request.data.get('game_ids', [])
+        game_ids = parse_game_ids(request.data.get('game_ids', []))
+        if not game_ids:
+            return Response(
+                {'error': 'game_ids must be a list of game ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Games already in the library (e.g. a repeated confirmation) are
+        # not added to a second order
+        new_game_ids = set(game_ids) - owned_among(request.user.id, game_ids)
+        if not new_game_ids:
+            return Response(
+                {'error': 'Games are already in your library'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         # Verify payment with Stripe
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        intent = retrieve_stripe_payment_intent(payment_intent_id)
         
         if intent.status == 'succeeded':
             # Create order
-            games = Game.objects.filter(id__in=game_ids)
-            total = sum(game.discounted_price for game in games)
+            games = Game.objects.filter(id__in=new_game_ids)
+            total = cart_total(games)
             
             order = Order.objects.create(
                 user=request.user,
@@ -299,14 +828,15 @@ def confirm_payment(request):
             )
             
             # Add games to library
+            items = []
             for game in games:
                 # Create order item
-                OrderItem.objects.create(
+                items.append(OrderItem.objects.create(
                     order=order,
                     game=game,
                     price=game.price,
                     discount_applied=game.price - game.discounted_price
-                )
+                ))
                 
                 # Add to library
                 GameLibrary.objects.get_or_create(
@@ -316,6 +846,8 @@ def confirm_payment(request):
                 
                 # Remove from wishlist if exists
                 Wishlist.objects.filter(user=request.user, game=game).delete()
+
+            record_order_sales(order, items)
             
             return Response({
                 'message': 'Payment successful',
@@ -326,6 +858,8 @@ def confirm_payment(request):
                 {'error': 'Payment not completed'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+    except GatewayUnavailable as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -337,11 +871,85 @@ def confirm_payment(request):
 @permission_classes([permissions.IsAuthenticated])
 def order_history(request):
     """Get user's order history"""
-    orders = Order.objects.filter(user=request.user).order_by('-created_at')
+    orders = Order.objects.filter(user=request.user).select_related('user').prefetch_related(
+        Prefetch('items__game', queryset=games_for_serializer())
+    ).order_by('-created_at')
     serializer = OrderSerializer(orders, many=True)
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def order_history_page(request):
+    """
+    Paginated order history with slim items, newest first.
+
+    `?limit=`, and `?cursor=` from the previous page's `next_cursor`.
+    """
+    orders = Order.objects.filter(user=request.user).prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('game').only(
+            'id', 'order_id', 'price', 'discount_applied', 'game__id', 'game__title', 'game__slug'
+        ))
+    )
+    orders, next_cursor = keyset_page(
+        orders,
+        'created_at',
+        cursor=request.query_params.get('cursor'),
+        page_size=get_page_size(request)
+    )
+    return Response({
+        'results': OrderSummarySerializer(orders, many=True).data,
+        'next_cursor': next_cursor
+    })
+
+
+def query_date(request, name):
+    """A YYYY-MM-DD query param as a date, None if absent; ValueError if malformed"""
+    value = request.query_params.get(name, '')
+    if not value:
+        return None
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(f'{name} is not a date')
+    return parsed
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def export_orders(request):
+    """
+    Stream orders (one row per item) for accounting.
+
+    Query params: `output` (csv|ndjson), `start`, `end` (YYYY-MM-DD, on
+    created_at) and `status`.
+    """
+    export_format = request.query_params.get('output', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f'output must be one of: {", ".join(EXPORT_FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        start = query_date(request, 'start')
+        end = query_date(request, 'end')
+    except ValueError:
+        return Response(
+            {'error': 'start and end must be valid dates (YYYY-MM-DD)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    orders = Order.objects.all()
+    if start:
+        orders = orders.filter(created_at__date__gte=start)
+    if end:
+        orders = orders.filter(created_at__date__lte=end)
+    if request.query_params.get('status'):
+        orders = orders.filter(status=request.query_params['status'])
+
+    return stream_orders(orders, export_format)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def add_to_cart(request):
@@ -379,20 +987,56 @@ def clear_cart(request):
     return Response({'message': 'Cart cleared'})
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def cart_recommendations(request):
+    """
+    "Customers also bought" for the games at checkout.
+
+    `?game_ids=1,2,3` (defaults to the session cart). Games in the cart or
+    already owned are left out.
+    """
+    game_ids = request.query_params.get('game_ids')
+    try:
+        cart = [int(i) for i in game_ids.split(',') if i] if game_ids else [int(i) for i in request.session.get('cart', [])]
+    except (TypeError, ValueError):
+        return Response({'error': 'game_ids must be comma-separated ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+    games = checkout_recommendations(
+        cart, get_owned_game_ids(request.user.id), limit=get_page_size(request, default=10)
+    )
+    return Response({'results': GameSummarySerializer(games, many=True).data})
+
+
 # ============================================
 # 2CHECKOUT PAYMENT VIEWS (Module 3b: Second Payment Gateway - Works in Pakistan)
 # ============================================
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([UserBucketThrottle, PaymentBucketThrottle])
 def create_twocheckout_order(request):
     """Create 2Checkout payment order"""
     try:
-        game_ids = request.data.get('game_ids', [])
+        game_ids = parse_game_ids(request.data.get('game_ids', []))
+        if game_ids is None:
+            return Response(
+                {'error': 'game_ids must be a list of game ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Refuse to charge again for games already in the library
+        already_owned = sorted(owned_among(request.user.id, game_ids))
+        if already_owned:
+            return Response(
+                {'error': 'Some games are already in your library', 'owned_game_ids': already_owned},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         games = Game.objects.filter(id__in=game_ids)
 
         # Calculate total
-        total = sum(game.discounted_price for game in games)
+        total = cart_total(games)
 
         # Generate unique order reference
         order_reference = f"ORDER_{request.user.id}_{int(timezone.now().timestamp())}"
@@ -430,6 +1074,7 @@ def create_twocheckout_order(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([UserBucketThrottle, PaymentBucketThrottle])
 def verify_twocheckout_payment(request):
     """Verify 2Checkout payment and complete order"""
     try:
@@ -456,7 +1101,7 @@ def verify_twocheckout_payment(request):
 
         # Payment verified, create order
         games = Game.objects.filter(id__in=game_ids)
-        total = sum(game.discounted_price for game in games)
+        total = cart_total(games)
 
         order = Order.objects.create(
             user=request.user,
@@ -468,14 +1113,15 @@ def verify_twocheckout_payment(request):
         )
 
         # Add games to library
+        items = []
         for game in games:
             # Create order item
-            OrderItem.objects.create(
+            items.append(OrderItem.objects.create(
                 order=order,
                 game=game,
                 price=game.price,
                 discount_applied=game.price - game.discounted_price
-            )
+            ))
 
             # Add to library
             GameLibrary.objects.get_or_create(
@@ -486,6 +1132,8 @@ def verify_twocheckout_payment(request):
             # Remove from wishlist if exists
             Wishlist.objects.filter(user=request.user, game=game).delete()
 
+        record_order_sales(order, items)
+
         # Clear session
         request.session['twocheckout_game_ids'] = []
         request.session['twocheckout_order_ref'] = None
@@ -503,10 +1151,15 @@ def verify_twocheckout_payment(request):
         )
 
 
-@api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
-def get_twocheckout_payment_details(request):
-    """Get 2Checkout order details"""
+@async_api_view(['GET'], permission_classes=[permissions.IsAuthenticated],
+                throttle_classes=[UserBucketThrottle, PaymentBucketThrottle])
+async def get_twocheckout_payment_details(request):
+    """
+    Get 2Checkout order details.
+
+    Async: while 2Checkout is slow to answer, the worker keeps serving other
+    requests (run under the ASGI worker, see gunicorn.conf.py).
+    """
     try:
         refno = request.query_params.get('refno')
 
@@ -516,20 +1169,9 @@ def get_twocheckout_payment_details(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Build API request to 2Checkout
-        headers = {
-            'Content-Type': 'application/json',
-            'X-Avangate-Authentication': f'code="{settings.TWOCHECKOUT_MERCHANT_CODE}" date="{timezone.now().strftime("%Y-%m-%d %H:%M:%S")}" hash="{settings.TWOCHECKOUT_SECRET_KEY}"'
-        }
+        order_data = await fetch_twocheckout_order(refno)
 
-        response = requests.get(
-            f'{TWOCHECKOUT_API_URL}orders/{refno}/',
-            headers=headers,
-            timeout=10
-        )
-
-        if response.status_code == 200:
-            order_data = response.json()
+        if order_data is not None:
             return Response({
                 'refno': order_data.get('RefNo'),
                 'status': order_data.get('Status'),
@@ -543,8 +1185,79 @@ def get_twocheckout_payment_details(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    except GatewayUnavailable as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except Exception as e:
         return Response(
             {'error': str(e)},
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def payment_gateway_metrics(request):
+    """Call counts, latency and circuit state per gateway (this worker process only)"""
+    return Response(gateway_metrics())
+
+
+# ============================================
+# ANALYTICS VIEWS (served from the GameDailyStats rollup)
+# ============================================
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def sales_analytics(request):
+    """
+    Sales and review trends from the daily rollup.
+
+    Query params: `start`, `end` (YYYY-MM-DD, default last 30 days),
+    `interval` (day|week) and optional `game_id`.
+    """
+    try:
+        end = query_date(request, 'end') or timezone.localdate()
+        start = query_date(request, 'start') or end - timedelta(days=29)
+    except ValueError:
+        return Response(
+            {'error': 'start and end must be valid dates (YYYY-MM-DD)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    interval = request.query_params.get('interval', 'day')
+    if interval not in ('day', 'week'):
+        return Response(
+            {'error': 'interval must be day or week'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    stats = GameDailyStats.objects.filter(date__gte=start, date__lte=end)
+    game_id = request.query_params.get('game_id')
+    if game_id:
+        if not game_id.isdigit():
+            return Response(
+                {'error': 'game_id must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        stats = stats.filter(game_id=int(game_id))
+
+    if interval == 'week':
+        stats = stats.annotate(period=TruncWeek('date'))
+    else:
+        stats = stats.annotate(period=F('date'))
+
+    series = stats.values('period').annotate(
+        units_sold=Sum('units_sold'),
+        gross_revenue=Sum('gross_revenue'),
+        discount_given=Sum('discount_given'),
+        positive_reviews=Sum('positive_reviews'),
+        negative_reviews=Sum('negative_reviews'),
+    ).order_by('period')
+
+    return Response({
+        'start': start,
+        'end': end,
+        'interval': interval,
+        'series': [
+            {**row, 'net_revenue': row['gross_revenue'] - row['discount_given']}
+            for row in series
+        ],
+    })
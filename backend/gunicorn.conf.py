@@ -0,0 +1,32 @@
+"""
+Gunicorn settings, picked up automatically from this directory.
+
+Workers run the ASGI application (backend.asgi) under uvicorn, so async
+views that wait on payment gateways or hold event streams open don't tie
+up a worker; all other views run on the worker's WSGI thread pool
+(WSGI_THREADS threads, see backend/asgi.py). Set GUNICORN_WORKER_CLASS=sync
+together with backend.wsgi:application to go back to plain WSGI workers.
+
+The app is loaded once in the master and warmed up (backend/warmup.py)
+before workers are forked, so they start serving at once and share the
+preloaded code copy-on-write. GUNICORN_PRELOAD=0 turns this off.
+"""
+
+import os
+
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'uvicorn_worker.UvicornWorker')
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') != '0'
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, before the first fork"""
+    if preload_app:
+        from backend.warmup import warm_up
+
+        warm_up()
+        server.log.info('Preloaded hot code paths')
@@ -3,6 +3,7 @@ import { BrowserRouter as Router, Routes, Route, Navigate } from 'react-router-d
 import { HelmetProvider } from 'react-helmet-async';
 import axios from 'axios';
 import { getCart } from './services/api';
+import { clearTokens, getRefreshToken, installAuthRefresh, loadTokens, setTokens } from './services/auth';
 
 // Import your pages (create these files)
 import HomePage from './pages/HomePage';
@@ -28,14 +29,19 @@ function App() {
   const [cart, setCart] = useState([]);
 
   useEffect(() => {
+    // Expired access tokens are refreshed; a rejected refresh logs out
+    const uninstall = installAuthRefresh(() => {
+      setUser(null);
+      setCart([]);
+    });
+
     // Check if user is logged in
-    const token = localStorage.getItem('token');
-    if (token) {
-      axios.defaults.headers.common['Authorization'] = `Token ${token}`;
+    if (loadTokens()) {
       fetchCurrentUser();
     } else {
       setLoading(false);
     }
+    return uninstall;
   }, []);
 
   const fetchCurrentUser = async () => {
@@ -46,7 +52,7 @@ function App() {
       await loadCart();
     } catch (error) {
       console.error('Error fetching user:', error);
-      localStorage.removeItem('token');
+      clearTokens();
     } finally {
       setLoading(false);
     }
@@ -63,9 +69,9 @@ function App() {
 
   const login = async (username, password) => {
     try {
-      const response = await axios.post('auth/login/', { username, password });
-      localStorage.setItem('token', response.data.token);
-      axios.defaults.headers.common['Authorization'] = `Token ${response.data.token}`;
+      clearTokens();
+      const response = await axios.post('auth/login/', { username, password }, { skipAuthRefresh: true });
+      setTokens(response.data);
       setUser(response.data);
       // Load cart after login
       await loadCart();
@@ -80,9 +86,9 @@ function App() {
 
   const register = async (userData) => {
     try {
-      const response = await axios.post('auth/register/', userData);
-      localStorage.setItem('token', response.data.token);
-      axios.defaults.headers.common['Authorization'] = `Token ${response.data.token}`;
+      clearTokens();
+      const response = await axios.post('auth/register/', userData, { skipAuthRefresh: true });
+      setTokens(response.data);
       setUser(response.data);
       // Load cart after registration
       await loadCart();
@@ -97,12 +103,17 @@ function App() {
 
   const logout = async () => {
     try {
-      await axios.post('auth/logout/');
+      // Revoke the refresh token so it can't be used again; that needs no
+      // access token, which may have expired already
+      await axios.post(
+        'auth/logout/',
+        { refresh: getRefreshToken() },
+        { skipAuthRefresh: true, headers: { Authorization: '' } }
+      );
     } catch (error) {
       console.error('Logout error:', error);
     } finally {
-      localStorage.removeItem('token');
-      delete axios.defaults.headers.common['Authorization'];
+      clearTokens();
       setUser(null);
       setCart([]);
     }
@@ -225,11 +225,11 @@ function CheckoutPage() {
                       <p className="cart-item-desc">{game.short_description}</p>
                     </div>
                     <div className="cart-item-price">
-                      {game.discount_percentage > 0 && (
-                        <span className="cart-discount">-{game.discount_percentage}%</span>
+                      {game.sale_discount > 0 && (
+                        <span className="cart-discount">-{game.sale_discount}%</span>
                       )}
                       <div className="cart-prices">
-                        {game.discount_percentage > 0 && (
+                        {game.sale_discount > 0 && (
                           <span className="cart-price-old">${game.price}</span>
                         )}
                         <span className="cart-price-new">${game.discounted_price}</span>
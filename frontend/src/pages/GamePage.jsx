@@ -9,7 +9,7 @@ import './GamePage.css';
 function GamePage() {
   const { slug } = useParams();
   const navigate = useNavigate();
-  const { user, cart, setCart } = useContext(AuthContext);
+  const { user, cart, setCart, logout } = useContext(AuthContext);
   const [game, setGame] = useState(null);
   const [loading, setLoading] = useState(true);
   const [inWishlist, setInWishlist] = useState(false);
@@ -193,8 +193,8 @@ function GamePage() {
             <Link to="/">STORE</Link>
             <Link to="/library">LIBRARY</Link>
             <Link to="/profile">PROFILE</Link>
-            <button onClick={() => {
-              localStorage.removeItem('token');
+            <button onClick={async () => {
+              await logout();
               window.location.href = '/login';
             }} className="logout-link">LOGOUT</button>
           </nav>
@@ -255,11 +255,11 @@ function GamePage() {
 
             <div className="game-purchase-section">
               <div className="purchase-price">
-                {game.discount_percentage > 0 && (
-                  <span className="purchase-discount">-{game.discount_percentage}%</span>
+                {game.sale_discount > 0 && (
+                  <span className="purchase-discount">-{game.sale_discount}%</span>
                 )}
                 <span className="purchase-new">${game.discounted_price}</span>
-                {game.discount_percentage > 0 && (
+                {game.sale_discount > 0 && (
                   <span className="purchase-old">${game.price}</span>
                 )}
               </div>
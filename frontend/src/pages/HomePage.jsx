@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useContext } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
 import { AuthContext } from '../App';
-import { getFeaturedGames, getGames, getWishlist } from '../services/api';
+import { getFeaturedGames, getGameById, getGames, getWishlist, subscribeToCatalogEvents } from '../services/api';
 import LazyImage from '../components/LazyImage';
 import SEO from '../components/SEO';
 import './HomePage.css';
@@ -24,6 +24,41 @@ function HomePage() {
     }
   }, [user]);
 
+  // Keep prices and new releases current without re-polling the catalog
+  useEffect(() => {
+    return subscribeToCatalogEvents({
+      onGame: applyGameChange,
+      onRemoved: ({ id }) => {
+        setAllGames((games) => games.filter((game) => game.id !== id));
+        setFeaturedGames((games) => games.filter((game) => game.id !== id));
+      },
+      onReset: loadGames,
+    });
+  }, []);
+
+  const applyGameChange = async (change) => {
+    const replace = (updated) => (games) => games.map((game) => (game.id === change.id ? updated(game) : game));
+
+    // Sale changes carry everything the cards show; anything else needs the game itself
+    if (!change.created && change.fields.every((field) => field === 'sale_discount' || field === 'discount_percentage')) {
+      const updated = (game) => ({ ...game, discounted_price: change.effective_price, sale_discount: change.sale_discount });
+      setAllGames(replace(updated));
+      setFeaturedGames(replace(updated));
+      return;
+    }
+    try {
+      const fresh = await getGameById(change.id);
+      if (change.created) {
+        setAllGames((games) => [fresh, ...games.filter((game) => game.id !== fresh.id)]);
+      } else {
+        setAllGames(replace(() => fresh));
+        setFeaturedGames(replace(() => fresh));
+      }
+    } catch (error) {
+      console.error('Error loading changed game:', error);
+    }
+  };
+
   const loadGames = async () => {
     try {
       const [featured, all] = await Promise.all([
@@ -190,15 +225,15 @@ function HomePage() {
                   preset="CARD"
                   style={{ width: '100%', height: '180px' }}
                 />
-                {game.discount_percentage > 0 && (
-                  <div className="grid-discount-badge">-{game.discount_percentage}%</div>
+                {game.sale_discount > 0 && (
+                  <div className="grid-discount-badge">-{game.sale_discount}%</div>
                 )}
               </div>
               <div className="grid-item-info">
                 <div className="grid-item-title">{game.title}</div>
                 <div className="grid-price-box">
                   <div className="grid-prices">
-                    {game.discount_percentage > 0 && (
+                    {game.sale_discount > 0 && (
                       <span className="grid-price-old">${game.price}</span>
                     )}
                     <span className="grid-price-new">${game.discounted_price}</span>
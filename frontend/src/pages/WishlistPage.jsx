@@ -95,8 +95,8 @@ function WishlistPage() {
                       src={game.image || '/placeholder-game.jpg'}
                       alt={game.title}
                     />
-                    {game.discount_percentage > 0 && (
-                      <div className="wishlist-discount-badge">-{game.discount_percentage}%</div>
+                    {game.sale_discount > 0 && (
+                      <div className="wishlist-discount-badge">-{game.sale_discount}%</div>
                     )}
                   </div>
 
@@ -108,7 +108,7 @@ function WishlistPage() {
 
                     <div className="wishlist-item-footer">
                       <div className="wishlist-item-price">
-                        {game.discount_percentage > 0 && (
+                        {game.sale_discount > 0 && (
                           <span className="wishlist-price-old">${game.price}</span>
                         )}
                         <span className="wishlist-price-new">${game.discounted_price}</span>
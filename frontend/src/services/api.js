@@ -28,6 +28,17 @@ export const searchGames = async (query) => {
   return response.data;
 };
 
+// Live catalog changes (Server-Sent Events). EventSource reconnects by
+// itself and resumes from the last event id; `onReset` means events were
+// missed and the catalog should be reloaded. Returns an unsubscribe function.
+export const subscribeToCatalogEvents = ({ onGame, onRemoved, onReset }) => {
+  const source = new EventSource(`${API_URL}catalog/events/`);
+  source.addEventListener('game', (event) => onGame(JSON.parse(event.data)));
+  source.addEventListener('removed', (event) => onRemoved(JSON.parse(event.data)));
+  source.addEventListener('reset', () => onReset());
+  return () => source.close();
+};
+
 // ============================================
 // WISHLIST API CALLS
 // ============================================
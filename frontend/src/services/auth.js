@@ -0,0 +1,83 @@
+import axios from 'axios';
+
+// ============================================
+// JWT AUTH
+// ============================================
+
+// Requests carry a short-lived access token ("Bearer <access>"). When it
+// expires the API answers 401 and the refresh token is traded for a new
+// pair; the old refresh token is revoked, so it can only be used once.
+
+const ACCESS_KEY = 'access';
+const REFRESH_KEY = 'refresh';
+
+export const getRefreshToken = () => localStorage.getItem(REFRESH_KEY);
+
+export const setTokens = ({ access, refresh }) => {
+  localStorage.setItem(ACCESS_KEY, access);
+  localStorage.setItem(REFRESH_KEY, refresh);
+  axios.defaults.headers.common['Authorization'] = `Bearer ${access}`;
+};
+
+export const clearTokens = () => {
+  localStorage.removeItem(ACCESS_KEY);
+  localStorage.removeItem(REFRESH_KEY);
+  localStorage.removeItem('token'); // Legacy token of older builds
+  delete axios.defaults.headers.common['Authorization'];
+};
+
+// Restore the stored session; returns whether there is one
+export const loadTokens = () => {
+  const access = localStorage.getItem(ACCESS_KEY);
+  if (!access || !getRefreshToken()) {
+    clearTokens();
+    return false;
+  }
+  axios.defaults.headers.common['Authorization'] = `Bearer ${access}`;
+  return true;
+};
+
+// Requests failing with 401 at the same time share one refresh, since the
+// refresh token is rejected after its first use
+let refreshing = null;
+
+const refreshTokens = () => {
+  if (!refreshing) {
+    refreshing = axios
+      .post('auth/token/refresh/', { refresh: getRefreshToken() }, { skipAuthRefresh: true })
+      .then((response) => setTokens(response.data))
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+// Refresh the tokens on a 401 and retry the request once; if the refresh
+// fails too, the session is over and `onLoggedOut` is called
+export const installAuthRefresh = (onLoggedOut) => {
+  const interceptor = axios.interceptors.response.use(undefined, async (error) => {
+    const config = error.config;
+    if (
+      error.response?.status !== 401 ||
+      !config ||
+      config.skipAuthRefresh ||
+      config.authRetried ||
+      !getRefreshToken()
+    ) {
+      throw error;
+    }
+
+    try {
+      await refreshTokens();
+    } catch {
+      clearTokens();
+      onLoggedOut();
+      throw error;
+    }
+    config.authRetried = true;
+    config.headers['Authorization'] = axios.defaults.headers.common['Authorization'];
+    return axios(config);
+  });
+  return () => axios.interceptors.response.eject(interceptor);
+};